@@ -0,0 +1,74 @@
+import os
+import argparse
+import logging
+from datetime import datetime
+
+from config.Config import getServerConfig
+from backtest.BacktestEngine import BacktestEngine
+from backtest.CsvTickSource import CsvTickSource
+from backtest.RecordedTickSource import RecordedTickSource
+from backtest.SyntheticTickSource import SyntheticTickSource
+from ordermgmt.LatencyModel import LatencyModel
+from ordermgmt.SlippageModel import SlippageModel
+from utils.Clock import Clock
+from utils.Utils import Utils
+
+from strategies.SampleStrategy import SampleStrategy
+from strategies.BNFORB30Min import BNFORB30Min
+from strategies.OptionSelling import OptionSelling
+from strategies.ShortStraddleBNF import ShortStraddleBNF
+
+# Runs a backtest of one trading day. Run from src directory like the app.
+# Ex: python RunBacktest.py --date 2023-01-05 --strategies ShortStraddleBNF OptionSelling
+#     python RunBacktest.py --date 2023-01-05 --ticks ticks.csv
+#     python RunBacktest.py --date 2023-01-05 --recorded
+strategyClasses = {
+  'SampleStrategy': SampleStrategy,
+  'BNFORB30Min': BNFORB30Min,
+  'OptionSelling': OptionSelling,
+  'ShortStraddleBNF': ShortStraddleBNF
+}
+
+parser = argparse.ArgumentParser(description='Backtest strategies on one trading day')
+parser.add_argument('--date', required=True, help='Trading date in ' + Utils.dateFormat.replace('%', '%%') + ' format')
+parser.add_argument('--strategies', nargs='+', default=['ShortStraddleBNF'], choices=list(strategyClasses))
+parser.add_argument('--ticks', help='Csv file of recorded ticks. Synthetic ticks are generated when not passed')
+parser.add_argument('--recorded', action='store_true', help='Replay the ticks recorded by the app on the date (deployDir/recordings/<date>)')
+parser.add_argument('--seed', type=int, default=1, help='Seed of the synthetic ticks')
+parser.add_argument('--slippageBps', type=float, default=0, help='Slippage of market fills in basis points')
+parser.add_argument('--latencyMillis', type=float, default=0, help='Order latency in milli seconds')
+parser.add_argument('--participationRate', type=float, default=1.0, help='Max share of each tick quantity filled for the orders. 0 means unlimited')
+parser.add_argument('--outputDir', help='Directory for backtest results. Default is deployDir/backtests/<date>')
+args = parser.parse_args()
+
+tradingDate = datetime.strptime(args.date, Utils.dateFormat)
+outputDir = args.outputDir
+if outputDir == None:
+  outputDir = os.path.join(getServerConfig()['deployDir'], 'backtests', args.date)
+if os.path.exists(outputDir) == False:
+  os.makedirs(outputDir)
+
+format = "%(asctime)s: %(message)s"
+logging.basicConfig(filename=os.path.join(outputDir, 'backtest.log'), format=format, level=logging.INFO, datefmt="%Y-%m-%d %H:%M:%S")
+# Log records carry the simulated time
+logging.Formatter.converter = lambda *args: Clock.now().timetuple()
+
+if args.ticks != None:
+  tickSource = CsvTickSource(args.ticks)
+elif args.recorded == True:
+  tickSource = RecordedTickSource(os.path.join(getServerConfig()['deployDir'], 'recordings', args.date))
+else:
+  tickSource = SyntheticTickSource(tradingDate, seed=args.seed)
+
+orderSimulationParams = {
+  'slippageModel': SlippageModel(args.slippageBps),
+  'latencyModel': LatencyModel(args.latencyMillis / 1000),
+  'participationRate': args.participationRate
+}
+engine = BacktestEngine(tradingDate, tickSource, [strategyClasses[name] for name in args.strategies], outputDir, orderSimulationParams)
+results = engine.run()
+print('Backtest of ' + results['date'] + ' done in ' + str(results['wallClockSeconds']) + ' seconds')
+for strategy in results['strategies']:
+  print(strategy + ' => ' + str(results['strategies'][strategy]))
+print('Total pnl = ' + str(results['totalPnl']))
+print('Results saved to ' + os.path.join(outputDir, 'results.json'))
@@ -0,0 +1,90 @@
+import os
+import json
+import argparse
+import logging
+from datetime import datetime, timedelta
+
+from config.Config import getServerConfig
+from backtest.ParameterSweep import ParameterSweep
+from ordermgmt.LatencyModel import LatencyModel
+from ordermgmt.SlippageModel import SlippageModel
+from utils.Utils import Utils
+
+from strategies.SampleStrategy import SampleStrategy
+from strategies.BNFORB30Min import BNFORB30Min
+from strategies.OptionSelling import OptionSelling
+from strategies.ShortStraddleBNF import ShortStraddleBNF
+
+# Runs a parameter sweep of one strategy over a range of trading days. Run from src directory like the app.
+# Ticks of each day are read from dataDir/<date>/ticks.bin (see backtest.TickFile). Missing days are first written from
+# the ticks recorded by the app (deployDir/recordings/<date>) and with --synthetic the rest of them are generated.
+# Ex: python RunParameterSweep.py --strategy ShortStraddleBNF --startDate 2023-01-02 --endDate 2023-12-29 --synthetic \
+#       --grid '{"slPercentage": [20, 30, 40], "trailingSLStep": [5, 10], "startTimestamp": ["10:00:00", "11:00:00"]}'
+strategyClasses = {
+  'SampleStrategy': SampleStrategy,
+  'BNFORB30Min': BNFORB30Min,
+  'OptionSelling': OptionSelling,
+  'ShortStraddleBNF': ShortStraddleBNF
+}
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='Parameter sweep of a strategy over many trading days')
+  parser.add_argument('--strategy', required=True, choices=list(strategyClasses))
+  parser.add_argument('--grid', required=True, help='Parameter grid as json (or a json file) of parameter name => list of values')
+  parser.add_argument('--startDate', required=True, help='First trading date in ' + Utils.dateFormat.replace('%', '%%') + ' format')
+  parser.add_argument('--endDate', required=True, help='Last trading date in ' + Utils.dateFormat.replace('%', '%%') + ' format')
+  parser.add_argument('--dataDir', help='Directory of the tick files of the days. Default is deployDir/ticks')
+  parser.add_argument('--synthetic', action='store_true', help='Generate synthetic ticks of the days without a tick file')
+  parser.add_argument('--seed', type=int, default=1, help='Seed of the synthetic ticks')
+  parser.add_argument('--processes', type=int, help='Number of worker processes. Default is number of cpus')
+  parser.add_argument('--slippageBps', type=float, default=0, help='Slippage of market fills in basis points')
+  parser.add_argument('--latencyMillis', type=float, default=0, help='Order latency in milli seconds')
+  parser.add_argument('--participationRate', type=float, default=1.0, help='Max share of each tick quantity filled for the orders. 0 means unlimited')
+  parser.add_argument('--keepRunOutputs', action='store_true', help='Keep trades and results of every backtest')
+  parser.add_argument('--outputDir', help='Directory for sweep results. Default is deployDir/sweeps/<strategy>')
+  args = parser.parse_args()
+
+  deployDir = getServerConfig()['deployDir']
+  dataDir = args.dataDir if args.dataDir != None else os.path.join(deployDir, 'ticks')
+  outputDir = args.outputDir if args.outputDir != None else os.path.join(deployDir, 'sweeps', args.strategy)
+  if os.path.exists(outputDir) == False:
+    os.makedirs(outputDir)
+
+  format = "%(asctime)s: %(message)s"
+  logging.basicConfig(filename=os.path.join(outputDir, 'sweep.log'), format=format, level=logging.INFO, datefmt="%Y-%m-%d %H:%M:%S")
+
+  if os.path.exists(args.grid):
+    with open(args.grid, 'r') as gFile:
+      parameterGrid = json.load(gFile)
+  else:
+    parameterGrid = json.loads(args.grid)
+
+  dates = []
+  date = datetime.strptime(args.startDate, Utils.dateFormat)
+  endDate = datetime.strptime(args.endDate, Utils.dateFormat)
+  while date <= endDate:
+    if Utils.isHoliday(date) == False:
+      dates.append(Utils.convertToDateStr(date))
+    date += timedelta(days=1)
+
+  orderSimulationParams = {
+    'slippageModel': SlippageModel(args.slippageBps),
+    'latencyModel': LatencyModel(args.latencyMillis / 1000),
+    'participationRate': args.participationRate
+  }
+  sweep = ParameterSweep(strategyClasses[args.strategy], parameterGrid, dataDir, dates, outputDir, args.processes, \
+    orderSimulationParams, args.keepRunOutputs)
+  sweep.prepareRecordedDays(os.path.join(deployDir, 'recordings'))
+  if args.synthetic == True:
+    sweep.prepareSyntheticDays(args.seed)
+  else:
+    missingDates = [date for date in dates if os.path.exists(ParameterSweep.getDayDir(dataDir, date)) == False]
+    if len(missingDates) > 0:
+      parser.error('No tick files of ' + ', '.join(missingDates) + ' in ' + dataDir + '. Use --synthetic to generate them.')
+
+  results = sweep.run()
+  print('Sweep of ' + str(len(sweep.combinations)) + ' combinations over ' + str(len(dates)) + ' days done')
+  for result in results[:10]:
+    print(str(result['pnlRank']) + '. ' + json.dumps(result['parameters']) + ' => pnl ' + str(result['totalPnl']) + \
+      ', max drawdown ' + str(result['maxDrawdown']) + ', hit rate ' + str(result['hitRate']))
+  print('Results saved to ' + os.path.join(outputDir, ParameterSweep.resultsFilename))
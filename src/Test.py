@@ -24,7 +24,7 @@ class Test:
     ticker.stopTicker()
 
   def tickerListener(tick):
-    logging.info('tickerLister: onNewTick %s', vars(tick));
+    logging.info('tickerLister: onNewTick %s', vars(tick.toTickData()));
 
   def testOrders():
     orderManager = ZerodhaOrderManager()
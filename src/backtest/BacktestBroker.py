@@ -0,0 +1,62 @@
+import threading
+
+class BacktestBroker:
+  # Simulated broker of a backtest. Keeps the latest market data of each instrument from the replayed ticks and serves
+  # quotes and ticks in the same format as zerodha. Orders are filled by the matching engine (ordermgmt.MatchingEngine).
+  def __init__(self):
+    self.symbolToQuoteMap = {} # tradingSymbol => latest quote
+    self.symbolToTurnoverMap = {} # tradingSymbol => traded value of the day. Used for average traded price
+    self.tickListener = None
+    self.lock = threading.RLock()
+
+  def connect(self, tickListener):
+    # Ticker connects to receive the ticks
+    self.tickListener = tickListener
+
+  def disconnect(self):
+    self.tickListener = None
+
+  def updateMarketData(self, ticks):
+    # ticks is a list of (tradingSymbol, lastTradedPrice, lastTradedQuantity) traded at the current simulated time
+    updatedQuotes = []
+    with self.lock:
+      for (tradingSymbol, lastTradedPrice, lastTradedQuantity) in ticks:
+        quote = self.symbolToQuoteMap.get(tradingSymbol)
+        if quote == None:
+          quote = {
+            'tradingsymbol': tradingSymbol, 'last_price': 0, 'last_quantity': 0, 'average_price': 0, 'volume': 0,
+            'buy_quantity': 0, 'sell_quantity': 0, 'net_change': 0, 'change': 0, 'oi_day_high': 0, 'oi_day_low': 0,
+            'lower_circuit_limit': 0, 'upper_circuit_limit': 0,
+            'ohlc': {'open': lastTradedPrice, 'high': lastTradedPrice, 'low': lastTradedPrice, 'close': 0}
+          }
+          self.symbolToQuoteMap[tradingSymbol] = quote
+          self.symbolToTurnoverMap[tradingSymbol] = 0
+        ohlc = quote['ohlc']
+        ohlc['high'] = max(ohlc['high'], lastTradedPrice)
+        ohlc['low'] = min(ohlc['low'], lastTradedPrice)
+        quote['last_price'] = lastTradedPrice
+        quote['last_quantity'] = lastTradedQuantity
+        quote['volume'] += lastTradedQuantity
+        self.symbolToTurnoverMap[tradingSymbol] += lastTradedPrice * lastTradedQuantity
+        if quote['volume'] > 0:
+          quote['average_price'] = round(self.symbolToTurnoverMap[tradingSymbol] / quote['volume'], 2)
+        quote['net_change'] = round(lastTradedPrice - ohlc['open'], 2)
+        quote['change'] = round(quote['net_change'] * 100 / ohlc['open'], 2) if ohlc['open'] > 0 else 0
+        updatedQuotes.append(quote)
+
+    if self.tickListener != None and len(updatedQuotes) > 0:
+      self.tickListener(updatedQuotes)
+
+  def quote(self, keys):
+    # keys are in the zerodha format exchange:tradingSymbol
+    quotes = {}
+    with self.lock:
+      for key in keys:
+        quote = self.symbolToQuoteMap.get(key.split(':', 1)[-1])
+        if quote != None:
+          quotes[key] = dict(quote, ohlc=dict(quote['ohlc']))
+    return quotes
+
+  def getLastTradedPrice(self, tradingSymbol):
+    quote = self.symbolToQuoteMap.get(tradingSymbol)
+    return quote['last_price'] if quote != None else 0
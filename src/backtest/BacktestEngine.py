@@ -0,0 +1,147 @@
+import os
+import json
+import logging
+import shutil
+import time
+
+from backtest.BacktestBroker import BacktestBroker
+from backtest.SimulatedClock import SimulatedClock
+from core.Controller import Controller
+from core.LatencyTracker import LatencyTracker
+from core.RateLimiter import RateLimiter
+from instruments.Instruments import Instruments
+from instruments.InstrumentsCache import InstrumentsCache
+from trademgmt.TradeManager import TradeManager
+from trademgmt.TradeState import TradeState
+from utils.Clock import Clock
+from utils.Utils import Utils
+
+class BacktestEngine:
+  # Replays one trading day of ticks through the real TradeManager and strategies.
+  # The app runs exactly like live (same threads, same scheduled jobs) but on a simulated clock with the simulated broker and
+  # the orders filled by the matching engine.
+  # The engine is a discrete event loop: when all the app threads are sleeping it either replays the next ticks frame
+  # or wakes up the next sleeping thread, whichever is earlier in simulated time.
+  # NOTE: TradeManager and strategies keep their state in static variables so run one backtest per process.
+  def __init__(self, tradingDate, tickSource, strategyClasses, outputDir, orderSimulationParams = {}, strategyParameters = {}):
+    self.tradingDate = Utils.getTimeOfDay(0, 0, 0, tradingDate)
+    self.tickSource = tickSource
+    self.strategyClasses = strategyClasses
+    self.outputDir = outputDir
+    self.orderSimulationParams = orderSimulationParams # slippageModel, latencyModel and participationRate of the matching engine
+    self.strategyParameters = strategyParameters # strategy name => parameters to override (see BaseStrategy.setParameters())
+    self.clock = None
+    self.broker = None
+    self.numTickFrames = 0
+    self.numTicks = 0
+    self.wallClockSeconds = 0
+
+  def run(self):
+    # Start a bit before market open so that the app goes through its usual start up
+    self.clock = SimulatedClock(Utils.getTimeOfDay(9, 0, 0, self.tradingDate))
+    Clock.setSimulatedClock(self.clock)
+    RateLimiter.enabled = False
+    self.broker = BacktestBroker()
+    Controller.handleBacktestLogin(self.broker)
+    self.loadInstruments()
+
+    TradeManager.tradesRootDir = os.path.join(self.outputDir, 'trades')
+    intradayTradesDir = os.path.join(TradeManager.tradesRootDir, Utils.convertToDateStr(self.tradingDate))
+    if os.path.exists(intradayTradesDir):
+      logging.info('BacktestEngine: Removing trades of the previous run in %s', intradayTradesDir)
+      shutil.rmtree(intradayTradesDir)
+    # Entry orders are placed inline so that fills happen at the simulated time of the triggering tick
+    TradeManager.numOrderExecutionWorkers = 0
+    TradeManager.simulateOrders = True
+    TradeManager.orderSimulationParams = self.orderSimulationParams
+
+    logging.info('BacktestEngine: Starting backtest for %s', Utils.convertToDateStr(self.tradingDate))
+    startTime = time.perf_counter()
+    self.clock.startThread(self.startAlgo, 'BacktestAlgo')
+    tickFrames = iter(self.tickSource.getTickFrames())
+    tickFrame = next(tickFrames, None)
+    while True:
+      self.clock.waitTillIdle()
+      nextWakeUpTime = self.clock.getNextWakeUpTime()
+      if nextWakeUpTime == None:
+        # All the app threads are done
+        break
+      if tickFrame != None and tickFrame[0] <= nextWakeUpTime:
+        (frameTime, ticks) = tickFrame
+        self.clock.advanceTo(frameTime)
+        self.broker.updateMarketData(ticks)
+        self.numTickFrames += 1
+        self.numTicks += len(ticks)
+        tickFrame = next(tickFrames, None)
+      else:
+        self.clock.wakeUpNext()
+
+    self.wallClockSeconds = time.perf_counter() - startTime
+    results = self.getResults()
+    self.saveResults(results)
+    logging.info('BacktestEngine: Backtest done in %.2f seconds. Replayed %d ticks in %d frames. Total pnl = %f', \
+      self.wallClockSeconds, self.numTicks, self.numTickFrames, results['totalPnl'])
+    return results
+
+  def startAlgo(self):
+    # Same sequence as core.Algo.startAlgo()
+    self.clock.startThread(TradeManager.run, 'TradeManager')
+    Clock.sleep(2)
+    for strategyClass in self.strategyClasses:
+      strategy = strategyClass.getInstance()
+      strategy.setParameters(self.strategyParameters.get(strategy.getName(), {}))
+      strategy.run()
+
+  def loadInstruments(self):
+    instruments = self.tickSource.getInstruments()
+    if instruments == None:
+      # Use the instruments saved by the live app
+      Instruments.instrumentsList = Instruments.loadInstruments()
+    elif isinstance(instruments, InstrumentsCache):
+      Instruments.instrumentsList = instruments
+    else:
+      if os.path.exists(self.outputDir) == False:
+        os.makedirs(self.outputDir)
+      instrumentsCacheFilepath = os.path.join(self.outputDir, 'instruments.cache')
+      InstrumentsCache.build(instruments, instrumentsCacheFilepath)
+      Instruments.instrumentsList = InstrumentsCache(instrumentsCacheFilepath)
+    if len(Instruments.instrumentsList) == 0:
+      raise Exception('No instruments available for backtest')
+
+  def getResults(self):
+    strategyResults = {}
+    trades = []
+    totalPnl = 0
+    for trade in TradeManager.trades:
+      if trade.tradeState != TradeState.COMPLETED and trade.tradeState != TradeState.ACTIVE:
+        continue
+      result = strategyResults.setdefault(trade.strategy, {'trades': 0, 'pnl': 0, 'winners': 0, 'losers': 0})
+      result['trades'] += 1
+      result['pnl'] = Utils.roundOff(result['pnl'] + trade.pnl)
+      if trade.pnl > 0:
+        result['winners'] += 1
+      elif trade.pnl < 0:
+        result['losers'] += 1
+      totalPnl += trade.pnl
+      trades.append({'tradeID': trade.tradeID, 'strategy': trade.strategy, 'tradingSymbol': trade.tradingSymbol, \
+        'direction': trade.direction, 'state': trade.tradeState, 'qty': trade.filledQty, 'entry': trade.entry, \
+        'exit': trade.exit, 'pnl': trade.pnl, 'exitReason': trade.exitReason, \
+        'startTimestamp': trade.startTimestamp, 'endTimestamp': trade.endTimestamp})
+    return {
+      'date': Utils.convertToDateStr(self.tradingDate),
+      'wallClockSeconds': round(self.wallClockSeconds, 3),
+      'numTickFrames': self.numTickFrames,
+      'numTicks': self.numTicks,
+      'orders': TradeManager.matchingEngine.getStats() if TradeManager.matchingEngine != None else {},
+      'squareOffs': TradeManager.getSquareOffStats(),
+      'latency': LatencyTracker.getStats(),
+      'totalPnl': Utils.roundOff(totalPnl),
+      'strategies': strategyResults,
+      'trades': trades
+    }
+
+  def saveResults(self, results):
+    resultsFilepath = os.path.join(self.outputDir, 'results.json')
+    with open(resultsFilepath, 'w') as rFile:
+      json.dump(results, rFile, indent=2)
+    logging.info('BacktestEngine: Saved results to %s', resultsFilepath)
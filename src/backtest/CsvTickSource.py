@@ -0,0 +1,42 @@
+import csv
+import logging
+from datetime import datetime
+
+from utils.Utils import Utils
+
+class CsvTickSource:
+  # Recorded ticks from a csv file with the header row
+  #   timestamp,tradingSymbol,lastTradedPrice,lastTradedQuantity
+  # timestamp is either epoch seconds or in Utils.dateTimeFormat. lastTradedQuantity is optional.
+  # Rows must be in timestamp order. Instruments are taken from the saved instruments of the live app.
+  def __init__(self, filepath):
+    self.filepath = filepath
+
+  def getInstruments(self):
+    return None
+
+  def getTickFrames(self):
+    # yields (epochSeconds, list of (tradingSymbol, lastTradedPrice, lastTradedQuantity)) with all the ticks of a timestamp
+    frameTime = None
+    frameTicks = []
+    numRows = 0
+    with open(self.filepath, 'r', newline='') as ticksFile:
+      for row in csv.DictReader(ticksFile):
+        timestamp = CsvTickSource.parseTimestamp(row['timestamp'])
+        if frameTime != None and timestamp != frameTime:
+          yield (frameTime, frameTicks)
+          frameTicks = []
+        frameTime = timestamp
+        quantity = row.get('lastTradedQuantity')
+        frameTicks.append((row['tradingSymbol'], float(row['lastTradedPrice']), int(quantity) if quantity else 0))
+        numRows += 1
+    if len(frameTicks) > 0:
+      yield (frameTime, frameTicks)
+    logging.info('CsvTickSource: Replayed %d ticks from %s', numRows, self.filepath)
+
+  @staticmethod
+  def parseTimestamp(value):
+    try:
+      return float(value)
+    except ValueError:
+      return datetime.timestamp(datetime.strptime(value, Utils.dateTimeFormat))
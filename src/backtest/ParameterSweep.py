@@ -0,0 +1,214 @@
+import os
+import json
+import logging
+import itertools
+import multiprocessing
+import shutil
+import tempfile
+from datetime import datetime
+
+from backtest.BacktestEngine import BacktestEngine
+from backtest.RecordedTickSource import RecordedTickSource
+from backtest.SimulatedClock import SimulatedClock
+from backtest.SyntheticTickSource import SyntheticTickSource
+from backtest.TickFile import TickFile
+from backtest.TickFileSource import TickFileSource
+from utils.Clock import Clock
+from utils.Utils import Utils
+
+class ParameterSweep:
+  # Backtests one strategy for every combination of a parameter grid on many trading days and ranks the combinations.
+  # Ex: parameterGrid = {'slPercentage': [20, 30, 40], 'trailingSLStep': [5, 10], 'startTimestamp': ['09:30:00', '11:00:00']}
+  # Each (combination, day) backtest runs in a worker process of a process pool and each worker runs exactly one
+  # backtest because TradeManager and the strategies keep their state in static variables.
+  # Ticks of a day are read from the memory mapped tick file of the day (dataDir/<date>/ticks.bin, see TickFile) so
+  # all the workers replaying the same day share one copy of the ticks. Workers return only the day summary.
+  # Finished backtests are appended to runs.jsonl in the output dir and are not run again when the sweep is restarted.
+  runsFilename = 'runs.jsonl'
+  resultsFilename = 'sweep_results.json'
+
+  def __init__(self, strategyClass, parameterGrid, dataDir, dates, outputDir, numProcesses = None, \
+    orderSimulationParams = {}, keepRunOutputs = False):
+    self.strategyClass = strategyClass
+    self.parameterGrid = parameterGrid
+    self.dataDir = dataDir
+    self.dates = sorted(dates) # trading dates in Utils.dateFormat
+    self.outputDir = outputDir
+    self.numProcesses = numProcesses if numProcesses != None else os.cpu_count()
+    self.orderSimulationParams = orderSimulationParams
+    self.keepRunOutputs = keepRunOutputs # keep trades and results of each backtest in outputDir/runs/<combination>/<date>
+    self.combinations = ParameterSweep.expandGrid(parameterGrid)
+
+  @staticmethod
+  def expandGrid(parameterGrid):
+    names = sorted(parameterGrid)
+    return [dict(zip(names, values)) for values in itertools.product(*[parameterGrid[name] for name in names])]
+
+  @staticmethod
+  def getDayDir(dataDir, date):
+    return os.path.join(dataDir, date)
+
+  def prepareSyntheticDays(self, seed = 1):
+    # Writes the synthetic ticks of the days which do not have a tick file yet
+    tasks = []
+    for date in self.dates:
+      dayDir = ParameterSweep.getDayDir(self.dataDir, date)
+      if os.path.exists(os.path.join(dayDir, TickFile.ticksFilename)) == False:
+        tasks.append((date, dayDir, seed))
+    if len(tasks) == 0:
+      return
+    logging.info('ParameterSweep: Generating synthetic ticks of %d days', len(tasks))
+    with multiprocessing.Pool(self.numProcesses, maxtasksperchild=1) as pool:
+      for date in pool.imap_unordered(ParameterSweep.writeSyntheticDay, tasks):
+        logging.info('ParameterSweep: Generated synthetic ticks of %s', date)
+
+  def prepareRecordedDays(self, recordingsDir):
+    # Writes the tick files of the days which are recorded by the app (see ticker.TickRecorder) and do not have a tick file yet
+    tasks = []
+    for date in self.dates:
+      dayDir = ParameterSweep.getDayDir(self.dataDir, date)
+      recordedDayDir = os.path.join(recordingsDir, date)
+      if os.path.exists(os.path.join(dayDir, TickFile.ticksFilename)) == False and os.path.exists(recordedDayDir):
+        tasks.append((date, dayDir, recordedDayDir))
+    if len(tasks) == 0:
+      return
+    logging.info('ParameterSweep: Writing tick files of %d recorded days', len(tasks))
+    with multiprocessing.Pool(self.numProcesses, maxtasksperchild=1) as pool:
+      for date in pool.imap_unordered(ParameterSweep.writeRecordedDay, tasks):
+        logging.info('ParameterSweep: Wrote tick file of recorded day %s', date)
+
+  @staticmethod
+  def writeRecordedDay(task):
+    (date, dayDir, recordedDayDir) = task
+    TickFile.writeDay(RecordedTickSource(recordedDayDir), dayDir)
+    return date
+
+  @staticmethod
+  def writeSyntheticDay(task):
+    (date, dayDir, seed) = task
+    tradingDate = datetime.strptime(date, Utils.dateFormat)
+    # Symbols of the synthetic source are prepared for the trading date
+    Clock.setSimulatedClock(SimulatedClock(Utils.getTimeOfDay(9, 0, 0, tradingDate)))
+    TickFile.writeDay(SyntheticTickSource(tradingDate, seed=seed + tradingDate.toordinal()), dayDir)
+    return date
+
+  def run(self):
+    if os.path.exists(self.outputDir) == False:
+      os.makedirs(self.outputDir)
+    runsFilepath = os.path.join(self.outputDir, ParameterSweep.runsFilename)
+    combinationToDayResultsMap = self.loadRuns(runsFilepath)
+
+    tasks = []
+    for (combinationNum, parameters) in enumerate(self.combinations):
+      dayResults = combinationToDayResultsMap.setdefault(combinationNum, {})
+      for date in self.dates:
+        if date not in dayResults:
+          tasks.append((self.strategyClass, combinationNum, parameters, date, \
+            ParameterSweep.getDayDir(self.dataDir, date), self.getRunOutputDir(combinationNum, date), self.orderSimulationParams))
+    numTasks = len(self.combinations) * len(self.dates)
+    logging.info('ParameterSweep: %d combinations x %d days. %d backtests to run on %d processes, %d done earlier', \
+      len(self.combinations), len(self.dates), len(tasks), self.numProcesses, numTasks - len(tasks))
+
+    if len(tasks) > 0:
+      numDone = 0
+      with open(runsFilepath, 'a') as runsFile, multiprocessing.Pool(self.numProcesses, maxtasksperchild=1) as pool:
+        for run in pool.imap_unordered(ParameterSweep.runBacktest, tasks):
+          runsFile.write(json.dumps(run) + '\n')
+          runsFile.flush()
+          combinationToDayResultsMap[run['combination']][run['date']] = run
+          numDone += 1
+          if numDone % 100 == 0 or numDone == len(tasks):
+            logging.info('ParameterSweep: Done %d of %d backtests', numDone, len(tasks))
+
+    results = self.rank(combinationToDayResultsMap)
+    resultsFilepath = os.path.join(self.outputDir, ParameterSweep.resultsFilename)
+    with open(resultsFilepath, 'w') as rFile:
+      json.dump({'strategy': self.strategyClass.__name__, 'parameterGrid': self.parameterGrid, 'dates': self.dates, \
+        'results': results}, rFile, indent=2)
+    logging.info('ParameterSweep: Saved results to %s', resultsFilepath)
+    return results
+
+  def getRunOutputDir(self, combinationNum, date):
+    if self.keepRunOutputs == True:
+      return os.path.join(self.outputDir, 'runs', str(combinationNum), date)
+    return None
+
+  def loadRuns(self, runsFilepath):
+    # Runs of an earlier (interrupted) sweep are reused only when the parameters of the combination are the same
+    combinationToDayResultsMap = {}
+    if os.path.exists(runsFilepath) == False:
+      return combinationToDayResultsMap
+    with open(runsFilepath, 'r') as runsFile:
+      for line in runsFile:
+        try:
+          run = json.loads(line)
+        except ValueError:
+          continue # last line of a killed sweep can be partially written
+        combinationNum = run['combination']
+        if combinationNum < len(self.combinations) and self.combinations[combinationNum] == run['parameters']:
+          combinationToDayResultsMap.setdefault(combinationNum, {})[run['date']] = run
+    return combinationToDayResultsMap
+
+  @staticmethod
+  def runBacktest(task):
+    # Runs in a worker process
+    (strategyClass, combinationNum, parameters, date, dayDir, runOutputDir, orderSimulationParams) = task
+    logging.getLogger().setLevel(logging.ERROR) # app logs of thousands of backtests are not useful
+    outputDir = runOutputDir if runOutputDir != None else tempfile.mkdtemp(prefix='sweep')
+    try:
+      engine = BacktestEngine(datetime.strptime(date, Utils.dateFormat), TickFileSource(dayDir), [strategyClass], \
+        outputDir, orderSimulationParams, {strategyClass.__name__: parameters})
+      results = engine.run()
+    finally:
+      if runOutputDir == None:
+        shutil.rmtree(outputDir, ignore_errors=True)
+    strategyResult = results['strategies'].get(strategyClass.__name__, {'trades': 0, 'pnl': 0, 'winners': 0, 'losers': 0})
+    return {
+      'combination': combinationNum,
+      'parameters': parameters,
+      'date': date,
+      'pnl': strategyResult['pnl'],
+      'trades': strategyResult['trades'],
+      'winners': strategyResult['winners'],
+      'losers': strategyResult['losers'],
+      'wallClockSeconds': results['wallClockSeconds']
+    }
+
+  def rank(self, combinationToDayResultsMap):
+    results = []
+    for (combinationNum, parameters) in enumerate(self.combinations):
+      dayResults = combinationToDayResultsMap.get(combinationNum, {})
+      totalPnl = 0
+      peakPnl = 0
+      maxDrawdown = 0
+      trades = 0
+      winners = 0
+      for date in self.dates: # drawdown is on the equity curve of the days in date order
+        run = dayResults.get(date)
+        if run == None:
+          continue
+        totalPnl += run['pnl']
+        peakPnl = max(peakPnl, totalPnl)
+        maxDrawdown = max(maxDrawdown, peakPnl - totalPnl)
+        trades += run['trades']
+        winners += run['winners']
+      results.append({
+        'combination': combinationNum,
+        'parameters': parameters,
+        'days': len(dayResults),
+        'totalPnl': Utils.roundOff(totalPnl),
+        'maxDrawdown': Utils.roundOff(maxDrawdown),
+        'trades': trades,
+        'hitRate': round(winners / trades, 4) if trades > 0 else 0
+      })
+    # Rank 1 is the best of each metric. Results are ordered by pnl rank.
+    ParameterSweep.addRanks(results, 'pnlRank', lambda result: -result['totalPnl'])
+    ParameterSweep.addRanks(results, 'drawdownRank', lambda result: result['maxDrawdown'])
+    ParameterSweep.addRanks(results, 'hitRateRank', lambda result: -result['hitRate'])
+    results.sort(key=lambda result: result['pnlRank'])
+    return results
+
+  @staticmethod
+  def addRanks(results, rankName, key):
+    for (rank, result) in enumerate(sorted(results, key=key)):
+      result[rankName] = rank + 1
@@ -0,0 +1,57 @@
+import os
+import heapq
+import logging
+import mmap
+from datetime import datetime
+
+from instruments.InstrumentsCache import InstrumentsCache
+from ticker.TickRecorder import TickRecorder
+from utils.Utils import Utils
+
+class RecordedTickSource:
+  # Replays a day recorded by the live ticker.TickRecorder. The per instrument files are memory mapped and merged in
+  # timestamp order. Write the day into a tick file (TickFile.writeDay()) to replay it many times (Ex: parameter sweeps).
+  def __init__(self, dayDir):
+    self.dayDir = dayDir
+    self.dayStartEpoch = Utils.getEpoch(datetime.strptime(os.path.basename(os.path.normpath(dayDir)), Utils.dateFormat))
+
+  def getInstruments(self):
+    instrumentsCacheFilepath = os.path.join(self.dayDir, TickRecorder.instrumentsFilename)
+    if os.path.exists(instrumentsCacheFilepath) == False:
+      return None
+    return InstrumentsCache(instrumentsCacheFilepath)
+
+  def getTickFrames(self):
+    # yields (epochSeconds, list of (tradingSymbol, lastTradedPrice, lastTradedQuantity)) with all the ticks of a timestamp
+    recordIterators = []
+    recordSize = TickRecorder.recordStruct.size
+    for filename in sorted(os.listdir(self.dayDir)):
+      if filename.endswith(TickRecorder.fileExtension) == False:
+        continue
+      with open(os.path.join(self.dayDir, filename), 'rb') as rFile:
+        # A crash while recording can leave a partial record at the end of the file which is ignored
+        numRecords = os.fstat(rFile.fileno()).st_size // recordSize
+        if numRecords == 0:
+          continue
+        # The map stays valid after the file is closed and is released along with its records iterator
+        mm = mmap.mmap(rFile.fileno(), numRecords * recordSize, access=mmap.ACCESS_READ)
+      recordIterators.append(RecordedTickSource.readRecords(mm, filename[:-len(TickRecorder.fileExtension)]))
+
+    numTicks = 0
+    frameMillis = None
+    frameTicks = []
+    for (millis, tradingSymbol, paise, quantity) in heapq.merge(*recordIterators, key=lambda record: record[0]):
+      if frameMillis != None and millis != frameMillis:
+        yield (self.dayStartEpoch + frameMillis / 1000, frameTicks)
+        frameTicks = []
+      frameMillis = millis
+      frameTicks.append((tradingSymbol, paise / 100, quantity))
+      numTicks += 1
+    if len(frameTicks) > 0:
+      yield (self.dayStartEpoch + frameMillis / 1000, frameTicks)
+    logging.info('RecordedTickSource: Replayed %d ticks of %d instruments from %s', numTicks, len(recordIterators), self.dayDir)
+
+  @staticmethod
+  def readRecords(mm, tradingSymbol):
+    for (millis, paise, quantity) in TickRecorder.recordStruct.iter_unpack(mm):
+      yield (millis, tradingSymbol, paise, quantity)
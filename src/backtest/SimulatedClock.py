@@ -0,0 +1,113 @@
+import heapq
+import itertools
+import logging
+import threading
+from datetime import datetime
+
+class SimulatedClock:
+  # Clock of a backtest. Time moves only when the backtest engine advances it, so a full trading day is replayed as
+  # fast as the code runs. The app threads (TradeManager, strategies) are started through startThread() and their
+  # sleeps become timers: a sleeping thread is woken up by the engine once the simulated time reaches its wake up time.
+  # The engine advances the time only when all the app threads are sleeping, which keeps every run deterministic.
+  def __init__(self, startDatetime):
+    self.currentTime = datetime.timestamp(startDatetime) # epoch seconds
+    self.condition = threading.Condition()
+    self.timers = [] # heap of (wake up time, sequence number, event of the sleeping thread)
+    self.sequence = itertools.count()
+    self.numRunningThreads = 0
+    self.eventToTimerMap = {} # event a thread is waiting on (see wait()) => (sequence number, timer event) of its timer
+    self.timerToEventMap = {} # sequence number of the timer => event waited on
+    self.cancelledTimers = set() # sequence numbers of the timers replaced by notify()
+
+  def now(self):
+    return datetime.fromtimestamp(self.currentTime)
+
+  def time(self):
+    return self.currentTime
+
+  def sleep(self, seconds):
+    # NOTE: Only the threads started with startThread() can sleep on the simulated clock
+    event = threading.Event()
+    with self.condition:
+      heapq.heappush(self.timers, (self.currentTime + max(0, seconds), next(self.sequence), event))
+      self.numRunningThreads -= 1
+      self.condition.notify_all()
+    event.wait()
+
+  def wait(self, event, seconds):
+    # Same as sleep() but notify(event) wakes up the thread right away at the current simulated time.
+    # Returns True if the event is set.
+    with self.condition:
+      if event.is_set():
+        return True
+      timerEvent = threading.Event()
+      sequence = next(self.sequence)
+      heapq.heappush(self.timers, (self.currentTime + max(0, seconds), sequence, timerEvent))
+      self.eventToTimerMap[event] = (sequence, timerEvent)
+      self.timerToEventMap[sequence] = event
+      self.numRunningThreads -= 1
+      self.condition.notify_all()
+    timerEvent.wait()
+    return event.is_set()
+
+  def notify(self, event):
+    with self.condition:
+      event.set()
+      timer = self.eventToTimerMap.pop(event, None)
+      if timer == None:
+        return
+      # Replace the timer of the waiting thread with one at the current time
+      (sequence, timerEvent) = timer
+      del self.timerToEventMap[sequence]
+      self.cancelledTimers.add(sequence)
+      newSequence = next(self.sequence)
+      heapq.heappush(self.timers, (self.currentTime, newSequence, timerEvent))
+
+  def removeCancelledTimers(self):
+    while len(self.timers) > 0 and self.timers[0][1] in self.cancelledTimers:
+      self.cancelledTimers.discard(heapq.heappop(self.timers)[1])
+
+  def startThread(self, target, name = None):
+    with self.condition:
+      self.numRunningThreads += 1
+
+    def runThread():
+      try:
+        target()
+      except Exception as e:
+        logging.exception('SimulatedClock: Exception in thread %s', name)
+      finally:
+        with self.condition:
+          self.numRunningThreads -= 1
+          self.condition.notify_all()
+
+    thread = threading.Thread(target=runThread, name=name, daemon=True)
+    thread.start()
+    return thread
+
+  def waitTillIdle(self):
+    # Blocks till all the app threads are either sleeping or done
+    with self.condition:
+      while self.numRunningThreads > 0:
+        self.condition.wait()
+
+  def getNextWakeUpTime(self):
+    with self.condition:
+      self.removeCancelledTimers()
+      return self.timers[0][0] if len(self.timers) > 0 else None
+
+  def advanceTo(self, epochSeconds):
+    with self.condition:
+      self.currentTime = max(self.currentTime, epochSeconds)
+
+  def wakeUpNext(self):
+    # Moves the time to the earliest timer and wakes up the thread sleeping on it
+    with self.condition:
+      self.removeCancelledTimers()
+      (wakeUpTime, sequence, event) = heapq.heappop(self.timers)
+      waitedEvent = self.timerToEventMap.pop(sequence, None)
+      if waitedEvent != None:
+        del self.eventToTimerMap[waitedEvent]
+      self.currentTime = max(self.currentTime, wakeUpTime)
+      self.numRunningThreads += 1
+    event.set()
@@ -0,0 +1,115 @@
+import math
+import random
+from datetime import timedelta
+
+from utils.Utils import Utils
+
+class SyntheticTickSource:
+  # Generates a trading day of ticks for the monthly future and the weekly options (strikes around the opening price)
+  # of the given underlyings. Future prices are a seeded random walk and option prices follow the future with the
+  # Bachelier model, so the same seed always replays the same day.
+  # NOTE: Symbols are prepared with Utils hence the clock must already be set to the trading date.
+  defaultUnderlyings = {
+    # name => (opening price, strike gap, lot size)
+    'BANKNIFTY': (44000, 100, 25),
+    'NIFTY': (19500, 50, 50)
+  }
+
+  def __init__(self, tradingDate, underlyings = None, seed = 1, annualVolatility = 0.15, numStrikesEachSide = 10, \
+    futureTickIntervalSeconds = 1, optionTickIntervalSeconds = 5):
+    self.tradingDate = tradingDate
+    self.underlyings = underlyings if underlyings != None else SyntheticTickSource.defaultUnderlyings
+    self.seed = seed
+    self.annualVolatility = annualVolatility
+    self.numStrikesEachSide = numStrikesEachSide
+    self.futureTickIntervalSeconds = futureTickIntervalSeconds
+    self.optionTickIntervalSeconds = optionTickIntervalSeconds
+    self.instruments = None
+    self.underlyingToFutureMap = {} # underlying => future trading symbol
+    self.underlyingToOptionsMap = {} # underlying => list of (trading symbol, strike, option type)
+    self.weeklyExpiry = None
+
+  def getInstruments(self):
+    if self.instruments != None:
+      return self.instruments
+    # Same expiries as the ones used by Utils to prepare the symbols
+    monthlyExpiry = Utils.getMonthlyExpiryDayDate(self.tradingDate)
+    if self.tradingDate > Utils.getMarketEndTime(monthlyExpiry):
+      monthlyExpiry = Utils.getMonthlyExpiryDayDate(self.tradingDate + timedelta(days=20))
+    weeklyExpiry = Utils.getWeeklyExpiryDayDate(self.tradingDate)
+    if Utils.getMarketStartTime(self.tradingDate) > Utils.getMarketEndTime(weeklyExpiry):
+      weeklyExpiry = Utils.getWeeklyExpiryDayDate(weeklyExpiry + timedelta(days=6))
+    self.weeklyExpiry = weeklyExpiry
+
+    instruments = []
+    def addInstrument(tradingSymbol, name, expiry, strike, instrumentType, lotSize):
+      token = len(instruments) + 1
+      instruments.append({'instrument_token': token, 'exchange_token': token, 'tradingsymbol': tradingSymbol, 'name': name, \
+        'last_price': 0, 'expiry': expiry.date(), 'strike': strike, 'tick_size': 0.05, 'lot_size': lotSize, \
+        'instrument_type': instrumentType, 'segment': 'NFO-FUT' if instrumentType == 'FUT' else 'NFO-OPT', 'exchange': 'NFO'})
+
+    for underlying in self.underlyings:
+      (openingPrice, strikeGap, lotSize) = self.underlyings[underlying]
+      futureSymbol = Utils.prepareMonthlyExpiryFuturesSymbol(underlying)
+      addInstrument(futureSymbol, underlying, monthlyExpiry, 0, 'FUT', lotSize)
+      self.underlyingToFutureMap[underlying] = futureSymbol
+      options = []
+      atmStrike = Utils.getNearestStrikePrice(openingPrice, strikeGap)
+      for i in range(-self.numStrikesEachSide, self.numStrikesEachSide + 1):
+        strike = atmStrike + i * strikeGap
+        for optionType in ['CE', 'PE']:
+          optionSymbol = Utils.prepareWeeklyOptionsSymbol(underlying, strike, optionType)
+          addInstrument(optionSymbol, underlying, weeklyExpiry, strike, optionType, lotSize)
+          options.append((optionSymbol, strike, optionType))
+      self.underlyingToOptionsMap[underlying] = options
+    self.instruments = instruments
+    return instruments
+
+  def getTickFrames(self):
+    # yields (epochSeconds, list of (tradingSymbol, lastTradedPrice, lastTradedQuantity))
+    self.getInstruments()
+    rand = random.Random(self.seed)
+    startEpoch = Utils.getEpoch(Utils.getMarketStartTime(self.tradingDate))
+    endEpoch = Utils.getEpoch(Utils.getMarketEndTime(self.tradingDate))
+    expiryEpoch = Utils.getEpoch(Utils.getMarketEndTime(self.weeklyExpiry))
+    tradingSecondsPerYear = 252 * (endEpoch - startEpoch)
+    volatilityPerTick = self.annualVolatility * math.sqrt(self.futureTickIntervalSeconds / tradingSecondsPerYear)
+    prices = {}
+    for underlying in self.underlyings:
+      prices[underlying] = float(self.underlyings[underlying][0])
+
+    for epochSeconds in range(startEpoch, endEpoch + 1, self.futureTickIntervalSeconds):
+      ticks = []
+      for underlying in self.underlyings:
+        lotSize = self.underlyings[underlying][2]
+        prices[underlying] *= math.exp(volatilityPerTick * rand.gauss(0, 1))
+        futurePrice = SyntheticTickSource.roundToTick(prices[underlying])
+        ticks.append((self.underlyingToFutureMap[underlying], futurePrice, lotSize * rand.randint(1, 10)))
+        if (epochSeconds - startEpoch) % self.optionTickIntervalSeconds != 0:
+          continue
+        # Time to expiry is at least an hour so that option prices do not collapse to intrinsic value on expiry day
+        yearsToExpiry = max(expiryEpoch - epochSeconds, 3600) / tradingSecondsPerYear
+        for (optionSymbol, strike, optionType) in self.underlyingToOptionsMap[underlying]:
+          optionPrice = SyntheticTickSource.getOptionPrice(futurePrice, strike, optionType, self.annualVolatility, yearsToExpiry)
+          ticks.append((optionSymbol, optionPrice, lotSize * rand.randint(1, 20)))
+      yield (epochSeconds, ticks)
+
+  @staticmethod
+  def getOptionPrice(underlyingPrice, strike, optionType, annualVolatility, yearsToExpiry):
+    # Bachelier (normal) model price
+    stdDev = underlyingPrice * annualVolatility * math.sqrt(yearsToExpiry)
+    d = (underlyingPrice - strike) / stdDev
+    pdf = math.exp(-d * d / 2) / math.sqrt(2 * math.pi)
+    if optionType == 'CE':
+      price = (underlyingPrice - strike) * SyntheticTickSource.normalCdf(d) + stdDev * pdf
+    else:
+      price = (strike - underlyingPrice) * SyntheticTickSource.normalCdf(-d) + stdDev * pdf
+    return max(0.05, SyntheticTickSource.roundToTick(price))
+
+  @staticmethod
+  def normalCdf(x):
+    return (1 + math.erf(x / math.sqrt(2))) / 2
+
+  @staticmethod
+  def roundToTick(price):
+    return round(round(price * 20) / 20, 2)
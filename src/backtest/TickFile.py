@@ -0,0 +1,125 @@
+import os
+import logging
+import mmap
+import struct
+from array import array
+
+from instruments.InstrumentsCache import InstrumentsCache
+
+class TickFile:
+  # Memory mapped binary file of one trading day of ticks. Written once (Ex: from the csv or synthetic ticks) and then
+  # replayed by any number of backtests. Processes replaying the same day share the pages of the file through the OS
+  # page cache instead of each one parsing (or being sent) its own copy of the ticks.
+  # File layout:
+  #   header
+  #   symbols table: (uint16 length, utf-8 bytes) of each trading symbol
+  #   columns (8 byte aligned, numTicks values each, in timestamp order):
+  #     timestamps (float64 epoch seconds), symbol numbers (uint32), prices (float64), quantities (int64)
+  # A day directory has the ticks in ticks.bin and the instruments of the day (if any) in instruments.cache.
+  magic = b'SDTK'
+  version = 1
+  headerFormat = '<4sHHIQQ' # magic, version, reserved, numSymbols, numTicks, columnsOffset
+  ticksFilename = 'ticks.bin'
+  instrumentsFilename = 'instruments.cache'
+
+  @staticmethod
+  def write(tickFrames, filepath):
+    # tickFrames is an iterable of (epochSeconds, list of (tradingSymbol, lastTradedPrice, lastTradedQuantity))
+    symbolToNumberMap = {}
+    timestamps = array('d')
+    symbolNumbers = array('I')
+    prices = array('d')
+    quantities = array('q')
+    for (frameTime, ticks) in tickFrames:
+      for (tradingSymbol, lastTradedPrice, lastTradedQuantity) in ticks:
+        symbolNumber = symbolToNumberMap.get(tradingSymbol)
+        if symbolNumber == None:
+          symbolNumber = len(symbolToNumberMap)
+          symbolToNumberMap[tradingSymbol] = symbolNumber
+        timestamps.append(frameTime)
+        symbolNumbers.append(symbolNumber)
+        prices.append(lastTradedPrice)
+        quantities.append(lastTradedQuantity)
+
+    symbolsTable = bytearray()
+    for tradingSymbol in symbolToNumberMap: # dict keeps the insertion order which is the symbol number order
+      encoded = tradingSymbol.encode('utf-8')
+      symbolsTable += struct.pack('<H', len(encoded)) + encoded
+    columnsOffset = TickFile.align(struct.calcsize(TickFile.headerFormat) + len(symbolsTable))
+
+    tmpFilepath = filepath + '.tmp'
+    with open(tmpFilepath, 'wb') as tFile:
+      tFile.write(struct.pack(TickFile.headerFormat, TickFile.magic, TickFile.version, 0, len(symbolToNumberMap), \
+        len(timestamps), columnsOffset))
+      tFile.write(symbolsTable)
+      for column in [timestamps, symbolNumbers, prices, quantities]:
+        tFile.write(b'\0' * (TickFile.align(tFile.tell()) - tFile.tell()))
+        tFile.write(column.tobytes())
+    # Readers never see a partially written file
+    os.replace(tmpFilepath, filepath)
+    logging.info('TickFile: Wrote %d ticks of %d symbols to %s', len(timestamps), len(symbolToNumberMap), filepath)
+    return len(timestamps)
+
+  @staticmethod
+  def writeDay(tickSource, dayDir):
+    # Saves the ticks (and the instruments if the source has them) of a tick source into the day directory
+    if os.path.exists(dayDir) == False:
+      os.makedirs(dayDir)
+    instruments = tickSource.getInstruments()
+    if instruments != None:
+      InstrumentsCache.build(instruments, os.path.join(dayDir, TickFile.instrumentsFilename))
+    return TickFile.write(tickSource.getTickFrames(), os.path.join(dayDir, TickFile.ticksFilename))
+
+  @staticmethod
+  def align(offset):
+    return (offset + 7) // 8 * 8
+
+  def __init__(self, filepath):
+    self.filepath = filepath
+    self.file = open(filepath, 'rb')
+    self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+    (magic, version, _, numSymbols, self.numTicks, columnsOffset) = struct.unpack_from(TickFile.headerFormat, self.mm, 0)
+    if magic != TickFile.magic or version != TickFile.version:
+      self.close()
+      raise Exception('Invalid tick file ' + filepath)
+    self.symbols = []
+    offset = struct.calcsize(TickFile.headerFormat)
+    for i in range(numSymbols):
+      (length,) = struct.unpack_from('<H', self.mm, offset)
+      self.symbols.append(self.mm[offset + 2:offset + 2 + length].decode('utf-8'))
+      offset += 2 + length
+
+    # Columns are views on the mapped file. Nothing is copied.
+    self.columns = []
+    with memoryview(self.mm) as mv:
+      offset = columnsOffset
+      for (typeCode, itemSize) in [('d', 8), ('I', 4), ('d', 8), ('q', 8)]:
+        offset = TickFile.align(offset)
+        self.columns.append(mv[offset:offset + itemSize * self.numTicks].cast(typeCode))
+        offset += itemSize * self.numTicks
+    (self.timestamps, self.symbolNumbers, self.prices, self.quantities) = self.columns
+
+  def close(self):
+    if self.mm != None:
+      for column in getattr(self, 'columns', []):
+        column.release()
+      self.columns = []
+      self.mm.close()
+      self.mm = None
+    self.file.close()
+
+  def getTickFrames(self):
+    # yields (epochSeconds, list of (tradingSymbol, lastTradedPrice, lastTradedQuantity)) with all the ticks of a timestamp
+    symbols = self.symbols
+    timestamps = self.timestamps
+    symbolNumbers = self.symbolNumbers
+    prices = self.prices
+    quantities = self.quantities
+    start = 0
+    while start < self.numTicks:
+      frameTime = timestamps[start]
+      end = start + 1
+      while end < self.numTicks and timestamps[end] == frameTime:
+        end += 1
+      yield (frameTime, [(symbols[symbolNumbers[i]], prices[i], quantities[i]) for i in range(start, end)])
+      start = end
@@ -0,0 +1,23 @@
+import os
+
+from backtest.TickFile import TickFile
+from instruments.InstrumentsCache import InstrumentsCache
+
+class TickFileSource:
+  # Tick source of a day directory written by TickFile.writeDay()
+  def __init__(self, dayDir):
+    self.dayDir = dayDir
+
+  def getInstruments(self):
+    # Instruments cache of the day if saved along with the ticks, else the saved instruments of the live app are used
+    instrumentsCacheFilepath = os.path.join(self.dayDir, TickFile.instrumentsFilename)
+    if os.path.exists(instrumentsCacheFilepath) == False:
+      return None
+    return InstrumentsCache(instrumentsCacheFilepath)
+
+  def getTickFrames(self):
+    tickFile = TickFile(os.path.join(self.dayDir, TickFile.ticksFilename))
+    try:
+      yield from tickFile.getTickFrames()
+    finally:
+      tickFile.close()
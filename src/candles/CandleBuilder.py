@@ -0,0 +1,118 @@
+import logging
+import threading
+
+from candles.CandleSeries import CandleSeries
+from core.MetricsRegistry import MetricsRegistry
+from utils.Clock import Clock
+from utils.Utils import Utils
+
+class CandleBuilder:
+  # Builds the candles of all the timeframes of the subscribed symbols from the ticker ticks.
+  # Candles are aligned to the market start time (Ex: 30 min candles start at 09:15, 09:45 ..). Each tick updates the
+  # candle being formed of every timeframe of its symbol in constant time. A candle closes on the first tick of the
+  # symbol after the candle end time or on the first ticks frame (of any symbol) after it, whichever is earlier, so the
+  # candles of illiquid symbols also close on time. Listeners of the symbol are called on every candle close.
+  timeframes = [1, 3, 5, 15, 30] # minutes
+  capacity = 375 # candles kept per timeframe. A trading day of 1 min candles
+  symbolToSeriesMap = {} # tradingSymbol => {timeframe => CandleSeries}
+  symbolToListenersMap = {} # tradingSymbol => list of listener(tradingSymbol, timeframe, candleSeries)
+  symbolToVolumeMap = {} # tradingSymbol => volume of the day as of the last tick. Used to get traded volume of each tick
+  marketStartEpoch = 0
+  nextCloseTime = None # earliest end time of the candles being formed
+  lock = threading.Lock() # Guards subscriptions. Ticks are processed only on the ticker thread
+
+  @staticmethod
+  def start(ticker):
+    # Called by TradeManager once the ticker is started
+    CandleBuilder.marketStartEpoch = Utils.getEpoch(Utils.getMarketStartTime())
+    ticker.registerBatchListener(CandleBuilder.onTicks)
+    logging.info('CandleBuilder: Started with timeframes %s', CandleBuilder.timeframes)
+
+  @staticmethod
+  def subscribe(tradingSymbol, listener = None):
+    # Starts building the candles of the symbol. Returns the map of timeframe => CandleSeries of the symbol.
+    # NOTE: The symbol must also be registered with ticker (see TradeManager.registerSymbols()) to get its ticks.
+    with CandleBuilder.lock:
+      timeframeToSeriesMap = CandleBuilder.symbolToSeriesMap.get(tradingSymbol)
+      if timeframeToSeriesMap == None:
+        timeframeToSeriesMap = {}
+        for timeframe in CandleBuilder.timeframes:
+          timeframeToSeriesMap[timeframe] = CandleSeries(tradingSymbol, timeframe, CandleBuilder.capacity)
+        # Copy on write so that the ticker thread never sees a map being changed
+        symbolToSeriesMap = dict(CandleBuilder.symbolToSeriesMap)
+        symbolToSeriesMap[tradingSymbol] = timeframeToSeriesMap
+        CandleBuilder.symbolToSeriesMap = symbolToSeriesMap
+        logging.info('CandleBuilder: Subscribed %s', tradingSymbol)
+      if listener != None:
+        listeners = list(CandleBuilder.symbolToListenersMap.get(tradingSymbol, []))
+        if listener not in listeners:
+          listeners.append(listener)
+          symbolToListenersMap = dict(CandleBuilder.symbolToListenersMap)
+          symbolToListenersMap[tradingSymbol] = listeners
+          CandleBuilder.symbolToListenersMap = symbolToListenersMap
+    return timeframeToSeriesMap
+
+  @staticmethod
+  def getSeries(tradingSymbol, timeframe):
+    timeframeToSeriesMap = CandleBuilder.symbolToSeriesMap.get(tradingSymbol)
+    if timeframeToSeriesMap == None:
+      return None
+    return timeframeToSeriesMap.get(timeframe)
+
+  @staticmethod
+  def onTicks(ticks):
+    # Called on the ticker thread with the ticks of a frame
+    symbolToSeriesMap = CandleBuilder.symbolToSeriesMap
+    if len(symbolToSeriesMap) == 0:
+      return
+    marketStartEpoch = CandleBuilder.marketStartEpoch
+    now = Clock.time()
+    if CandleBuilder.nextCloseTime != None and now >= CandleBuilder.nextCloseTime:
+      CandleBuilder.closeCandles(now)
+
+    for tick in ticks:
+      timeframeToSeriesMap = symbolToSeriesMap.get(tick.tradingSymbol)
+      if timeframeToSeriesMap == None:
+        continue
+      timestamp = tick.timestamp
+      if timestamp < marketStartEpoch:
+        continue
+      price = tick.lastTradedPrice
+      # volume of the day is cumulative. Traded volume of this tick is the change since the last tick
+      dayVolume = tick.volume
+      lastDayVolume = CandleBuilder.symbolToVolumeMap.get(tick.tradingSymbol)
+      volume = dayVolume - lastDayVolume if lastDayVolume != None and dayVolume >= lastDayVolume else tick.lastTradedQuantity
+      CandleBuilder.symbolToVolumeMap[tick.tradingSymbol] = dayVolume
+      for series in timeframeToSeriesMap.values():
+        timeframeSeconds = series.timeframeSeconds
+        barTimestamp = marketStartEpoch + (timestamp - marketStartEpoch) // timeframeSeconds * timeframeSeconds
+        if series.barTimestamp != barTimestamp:
+          endTime = barTimestamp + timeframeSeconds
+          if CandleBuilder.nextCloseTime == None or endTime < CandleBuilder.nextCloseTime:
+            CandleBuilder.nextCloseTime = endTime
+        if series.update(barTimestamp, price, volume) == True:
+          CandleBuilder.notifyListeners(series)
+
+  @staticmethod
+  def closeCandles(now):
+    # Closes all the candles which ended before now and finds the next candle end time
+    nextCloseTime = None
+    for timeframeToSeriesMap in CandleBuilder.symbolToSeriesMap.values():
+      for series in timeframeToSeriesMap.values():
+        if series.barTimestamp == None:
+          continue
+        if series.getBarEndTime() <= now:
+          series.closeBar()
+          CandleBuilder.notifyListeners(series)
+        elif nextCloseTime == None or series.getBarEndTime() < nextCloseTime:
+          nextCloseTime = series.getBarEndTime()
+    CandleBuilder.nextCloseTime = nextCloseTime
+
+  @staticmethod
+  def notifyListeners(series):
+    for listener in CandleBuilder.symbolToListenersMap.get(series.tradingSymbol, []):
+      try:
+        listener(series.tradingSymbol, series.timeframe, series)
+      except Exception as e:
+        MetricsRegistry.inc('algo_listener_exceptions_total', ('candle',))
+        logging.error('CandleBuilder: Exception from candle listener of %s. Error => %s', series.tradingSymbol, str(e))
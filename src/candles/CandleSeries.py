@@ -0,0 +1,90 @@
+from array import array
+
+class CandleSeries:
+  # OHLCV candles of one symbol and timeframe built from ticks by candles.CandleBuilder.
+  # Completed candles are kept in fixed size ring buffers, one typed array per field, so closing a candle only writes
+  # one slot of each array and no object is created per candle. When the buffer is full the oldest candle is overwritten.
+  # The candle being formed is kept in the bar* attributes till it closes.
+  # NOTE: Candles are updated only on the ticker thread. Other threads only read them.
+  fields = ['timestamps', 'opens', 'highs', 'lows', 'closes', 'volumes'] # timestamp is the epoch seconds of candle start
+
+  def __init__(self, tradingSymbol, timeframe, capacity):
+    self.tradingSymbol = tradingSymbol
+    self.timeframe = timeframe # minutes
+    self.timeframeSeconds = timeframe * 60
+    self.capacity = capacity
+    self.numCandles = 0 # completed candles since start including the ones overwritten in the buffer
+    for field in CandleSeries.fields:
+      setattr(self, field, array('q' if field == 'volumes' else 'd', bytes(8 * capacity)))
+    self.barTimestamp = None # start of the candle being formed. None till the first tick
+    self.barOpen = 0
+    self.barHigh = 0
+    self.barLow = 0
+    self.barClose = 0
+    self.barVolume = 0
+
+  def __len__(self):
+    # number of completed candles available in the buffer
+    return min(self.numCandles, self.capacity)
+
+  def getBarEndTime(self):
+    return self.barTimestamp + self.timeframeSeconds
+
+  def update(self, barTimestamp, price, volume):
+    # Adds a tick to the candle starting at barTimestamp. Returns True if the previous candle got closed by this tick.
+    closed = False
+    if self.barTimestamp != None and barTimestamp != self.barTimestamp:
+      self.closeBar()
+      closed = True
+    if self.barTimestamp == None:
+      self.barTimestamp = barTimestamp
+      self.barOpen = price
+      self.barHigh = price
+      self.barLow = price
+      self.barVolume = 0
+    elif price > self.barHigh:
+      self.barHigh = price
+    elif price < self.barLow:
+      self.barLow = price
+    self.barClose = price
+    self.barVolume += volume
+    return closed
+
+  def closeBar(self):
+    slot = self.numCandles % self.capacity
+    self.timestamps[slot] = self.barTimestamp
+    self.opens[slot] = self.barOpen
+    self.highs[slot] = self.barHigh
+    self.lows[slot] = self.barLow
+    self.closes[slot] = self.barClose
+    self.volumes[slot] = self.barVolume
+    self.numCandles += 1
+    self.barTimestamp = None
+
+  def getValue(self, field, ago = 0):
+    # field of a completed candle. ago = 0 is the latest completed candle, 1 is the one before it and so on.
+    # Returns None if that candle is not available
+    if ago < 0 or ago >= len(self):
+      return None
+    return getattr(self, field)[(self.numCandles - 1 - ago) % self.capacity]
+
+  def getValues(self, field, count = None):
+    # array of the field of the latest `count` completed candles (all available if None) from the oldest to the latest.
+    # NOTE: Returns a copy (the candles can wrap around the end of the ring buffer so there is no single view of them).
+    # Meant for warming up indicators. Use getValue() in tick and candle close paths.
+    available = len(self)
+    count = available if count == None else min(count, available)
+    values = getattr(self, field)
+    end = self.numCandles % self.capacity
+    start = (self.numCandles - count) % self.capacity
+    if count == 0:
+      return values[0:0]
+    if start < end:
+      return values[start:end]
+    return values[start:] + values[:end]
+
+  def getCandle(self, ago = 0):
+    # Latest completed candle as a dict. Meant for logging and debugging, use getValue() in tick paths.
+    if ago < 0 or ago >= len(self):
+      return None
+    return {field: self.getValue(field, ago) for field in CandleSeries.fields}
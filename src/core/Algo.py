@@ -31,11 +31,11 @@ class Algo:
     # sleep for 2 seconds for TradeManager to get initialized
     time.sleep(2)
 
-    # start running strategies: Run each strategy in a separate thread
-    #threading.Thread(target=SampleStrategy.getInstance().run).start()
-    #threading.Thread(target=BNFORB30Min.getInstance().run).start()
-    #threading.Thread(target=OptionSelling.getInstance().run).start()
-    threading.Thread(target=ShortStraddleBNF.getInstance().run).start()
+    # start running strategies: process() of each strategy is scheduled as a job on the Scheduler
+    #SampleStrategy.getInstance().run()
+    #BNFORB30Min.getInstance().run()
+    #OptionSelling.getInstance().run()
+    ShortStraddleBNF.getInstance().run()
     
     Algo.isAlgoRunning = True
     logging.info("Algo started.")
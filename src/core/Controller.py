@@ -3,6 +3,7 @@ import logging
 from config.Config import getBrokerAppConfig
 from models.BrokerAppDetails import BrokerAppDetails
 from loginmgmt.ZerodhaLogin import ZerodhaLogin
+from loginmgmt.BacktestLogin import BacktestLogin
 
 class Controller:
   brokerLogin = None # static variable
@@ -15,6 +16,10 @@ class Controller:
     brokerAppDetails.setClientID(brokerAppConfig['clientID'])
     brokerAppDetails.setAppKey(brokerAppConfig['appKey'])
     brokerAppDetails.setAppSecret(brokerAppConfig['appSecret'])
+    if 'httpPool' in brokerAppConfig:
+      httpPoolConfig = brokerAppConfig['httpPool']
+      brokerAppDetails.setHttpPoolConfig(httpPoolConfig.get('poolConnections', brokerAppDetails.httpPoolConnections), \
+        httpPoolConfig.get('poolMaxSize', brokerAppDetails.httpPoolMaxSize), httpPoolConfig.get('timeout', brokerAppDetails.httpTimeout))
 
     logging.info('handleBrokerLogin appKey %s', brokerAppDetails.appKey)
     Controller.brokerName = brokerAppDetails.broker
@@ -27,6 +32,12 @@ class Controller:
     redirectUrl = Controller.brokerLogin.login(args)
     return redirectUrl
 
+  def handleBacktestLogin(backtestBroker):
+    # Backtests trade with the simulated broker instead of the broker configured in brokerapp.json
+    Controller.brokerName = 'backtest'
+    Controller.brokerLogin = BacktestLogin(BrokerAppDetails('backtest'))
+    Controller.brokerLogin.login({'broker': backtestBroker})
+
   def getBrokerLogin():
     return Controller.brokerLogin
 
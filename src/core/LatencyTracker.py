@@ -0,0 +1,117 @@
+import logging
+import threading
+import time
+
+from utils.LatencyHistogram import LatencyHistogram
+
+class LatencyTracker:
+  # Tick to order latency of the trades, measured with the monotonic perf_counter_ns() clock in stages:
+  #   tickToDispatch   - ticks frame received by the ticker (on_ticks) => frame passed on to strategies by TradeManager
+  #                      (recorded once per frame, common to all the strategies)
+  #   decision         - time taken by shouldPlaceTrade() of the strategy (recorded for every call)
+  #   decisionToSubmit - trade triggered => entry order submitted to broker by executeTrade() (order execution queue wait)
+  #   submitToAck      - entry order submitted => broker acknowledged the order (placeOrder() returned order id)
+  #   tickToAck        - ticks frame received => broker acknowledged the entry order
+  # Each of the other stages of each strategy is kept in a LatencyHistogram. Enabled by latencyTracking flag in server.json.
+  # NOTE: The call sites check LatencyTracker.enabled before calling in so there is no cost when it is disabled.
+  # Decisions are timed by TradeManager itself with the decision histogram of the strategy looked up once per tick
+  # (see getDecisionHistogram()) so that a shouldPlaceTrade() call costs only a perf_counter_ns() and a record().
+  stages = ['decision', 'decisionToSubmit', 'submitToAck', 'tickToAck']
+  enabled = False
+  tickReceiveNanos = 0 # receive time of the ticks frame being processed. Frames are processed only on the ticker thread
+  tickToDispatchHistogram = LatencyHistogram('tickToDispatch')
+  strategyToHistogramsMap = {} # strategy => {stage => LatencyHistogram}
+  tradeIDToTraceMap = {} # tradeID => (strategy, tick receive nanos, decision nanos) of the triggered trades
+  lock = threading.Lock()
+
+  @staticmethod
+  def enable():
+    LatencyTracker.enabled = True
+    logging.info('LatencyTracker: Tick to order latency tracking enabled')
+
+  @staticmethod
+  def onTicksReceived():
+    LatencyTracker.tickReceiveNanos = time.perf_counter_ns()
+
+  @staticmethod
+  def onTicksDispatched():
+    # Called once per frame before its ticks are passed on to the strategies
+    tickReceiveNanos = LatencyTracker.tickReceiveNanos
+    if tickReceiveNanos > 0:
+      LatencyTracker.tickToDispatchHistogram.record(time.perf_counter_ns() - tickReceiveNanos)
+
+  @staticmethod
+  def getHistograms(strategy):
+    histograms = LatencyTracker.strategyToHistogramsMap.get(strategy)
+    if histograms == None:
+      with LatencyTracker.lock:
+        histograms = LatencyTracker.strategyToHistogramsMap.get(strategy)
+        if histograms == None:
+          histograms = {stage: LatencyHistogram(stage) for stage in LatencyTracker.stages}
+          LatencyTracker.strategyToHistogramsMap[strategy] = histograms
+    return histograms
+
+  @staticmethod
+  def getDecisionHistogram(strategy):
+    return LatencyTracker.getHistograms(strategy)['decision']
+
+  @staticmethod
+  def onTrigger(strategy, tradeID, decisionNanos):
+    # Called when shouldPlaceTrade() triggered the trade. Later stages of the trade are traced from here
+    LatencyTracker.tradeIDToTraceMap[tradeID] = (strategy, LatencyTracker.tickReceiveNanos, decisionNanos)
+
+  @staticmethod
+  def onSubmit(tradeID):
+    # Called just before the entry order is sent to broker. Returns the submit time to be passed to onAck()
+    submitNanos = time.perf_counter_ns()
+    trace = LatencyTracker.tradeIDToTraceMap.get(tradeID)
+    if trace != None:
+      LatencyTracker.getHistograms(trace[0])['decisionToSubmit'].record(submitNanos - trace[2])
+    return submitNanos
+
+  @staticmethod
+  def onAck(tradeID, submitNanos, isSuccess = True):
+    # Called once broker responded to the entry order. Only the acknowledged orders are recorded
+    ackNanos = time.perf_counter_ns()
+    trace = LatencyTracker.tradeIDToTraceMap.pop(tradeID, None)
+    if trace == None or isSuccess == False:
+      return
+    (strategy, tickReceiveNanos, decisionNanos) = trace
+    histograms = LatencyTracker.getHistograms(strategy)
+    histograms['submitToAck'].record(ackNanos - submitNanos)
+    if tickReceiveNanos > 0:
+      histograms['tickToAck'].record(ackNanos - tickReceiveNanos)
+
+  @staticmethod
+  def getStats():
+    # count, min, mean, p50, p90, p99 and max in micro seconds of tickToDispatch and of strategy => stage
+    strategyStats = {}
+    for strategy in list(LatencyTracker.strategyToHistogramsMap):
+      histograms = LatencyTracker.strategyToHistogramsMap[strategy]
+      strategyStats[strategy] = {stage: histograms[stage].getStats() for stage in LatencyTracker.stages}
+    return {
+      'tickToDispatch': LatencyTracker.tickToDispatchHistogram.getStats(),
+      'strategies': strategyStats
+    }
+
+  @staticmethod
+  def logStats():
+    stats = LatencyTracker.getStats()
+    s = stats['tickToDispatch']
+    if s['count'] > 0:
+      logging.info('LatencyTracker: tickToDispatch => count = %d, p50 = %.1f us, p99 = %.1f us, max = %.1f us', \
+        s['count'], s['p50Micros'], s['p99Micros'], s['maxMicros'])
+    for (strategy, stageStats) in stats['strategies'].items():
+      for stage in LatencyTracker.stages:
+        s = stageStats[stage]
+        if s['count'] == 0:
+          continue
+        logging.info('LatencyTracker: %s %s => count = %d, p50 = %.1f us, p99 = %.1f us, max = %.1f us', \
+          strategy, stage, s['count'], s['p50Micros'], s['p99Micros'], s['maxMicros'])
+
+  @staticmethod
+  def reset():
+    with LatencyTracker.lock:
+      LatencyTracker.strategyToHistogramsMap = {}
+      LatencyTracker.tradeIDToTraceMap = {}
+      LatencyTracker.tickToDispatchHistogram.reset()
@@ -0,0 +1,115 @@
+import logging
+import threading
+import time
+import tracemalloc
+
+class MemoryProfiler:
+  # On demand memory profiling of the running app with tracemalloc. Tracing is started only when asked for as it slows
+  # down every allocation (more with more frames per traceback), so keep numFrames low during market hours and stop it
+  # once done. A baseline snapshot is taken on start, snapshot() returns the top allocators as of now and diff() the
+  # top growth since the baseline (or since the previous diff). Only the stats are returned, snapshots are not kept
+  # other than the one to diff against.
+  isTracing = False
+  numFrames = 1
+  baselineSnapshot = None
+  baselineTime = None
+  lock = threading.Lock() # one snapshot at a time
+  snapshotFilters = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>')
+  ]
+
+  @staticmethod
+  def start(numFrames = 1):
+    with MemoryProfiler.lock:
+      if MemoryProfiler.isTracing == True:
+        return False
+      MemoryProfiler.numFrames = max(1, numFrames)
+      tracemalloc.start(MemoryProfiler.numFrames)
+      MemoryProfiler.isTracing = True
+      MemoryProfiler.baselineSnapshot = MemoryProfiler.takeSnapshot()
+      MemoryProfiler.baselineTime = time.time()
+    logging.info('MemoryProfiler: Started tracing with %d frames per traceback', MemoryProfiler.numFrames)
+    return True
+
+  @staticmethod
+  def stop():
+    with MemoryProfiler.lock:
+      if MemoryProfiler.isTracing == False:
+        return False
+      tracemalloc.stop()
+      MemoryProfiler.isTracing = False
+      MemoryProfiler.baselineSnapshot = None
+      MemoryProfiler.baselineTime = None
+    logging.info('MemoryProfiler: Stopped tracing')
+    return True
+
+  @staticmethod
+  def takeSnapshot():
+    return tracemalloc.take_snapshot().filter_traces(MemoryProfiler.snapshotFilters)
+
+  @staticmethod
+  def getKeyType():
+    return 'traceback' if MemoryProfiler.numFrames > 1 else 'lineno'
+
+  @staticmethod
+  def snapshot(limit = 25):
+    # Top allocators of the memory currently allocated. None if not tracing
+    with MemoryProfiler.lock:
+      if MemoryProfiler.isTracing == False:
+        return None
+      snapshot = MemoryProfiler.takeSnapshot()
+    stats = snapshot.statistics(MemoryProfiler.getKeyType())
+    return {
+      'tracedMemory': MemoryProfiler.getTracedMemory(),
+      'totalBytes': sum(stat.size for stat in stats),
+      'top': [MemoryProfiler.convertStat(stat) for stat in stats[:limit]]
+    }
+
+  @staticmethod
+  def diff(limit = 25, resetBaseline = True):
+    # Top growth in allocated memory since the baseline snapshot. None if not tracing
+    with MemoryProfiler.lock:
+      if MemoryProfiler.isTracing == False:
+        return None
+      snapshot = MemoryProfiler.takeSnapshot()
+      baselineSnapshot = MemoryProfiler.baselineSnapshot
+      baselineTime = MemoryProfiler.baselineTime
+      if resetBaseline == True:
+        MemoryProfiler.baselineSnapshot = snapshot
+        MemoryProfiler.baselineTime = time.time()
+    stats = snapshot.compare_to(baselineSnapshot, MemoryProfiler.getKeyType())
+    return {
+      'sinceTime': baselineTime,
+      'tracedMemory': MemoryProfiler.getTracedMemory(),
+      'totalSizeDiffBytes': sum(stat.size_diff for stat in stats),
+      'top': [MemoryProfiler.convertStat(stat) for stat in stats[:limit]]
+    }
+
+  @staticmethod
+  def convertStat(stat):
+    result = {
+      'traceback': [frame.filename + ':' + str(frame.lineno) for frame in stat.traceback],
+      'sizeBytes': stat.size,
+      'count': stat.count
+    }
+    if isinstance(stat, tracemalloc.StatisticDiff):
+      result['sizeDiffBytes'] = stat.size_diff
+      result['countDiff'] = stat.count_diff
+    return result
+
+  @staticmethod
+  def getTracedMemory():
+    (current, peak) = tracemalloc.get_traced_memory()
+    return {'currentBytes': current, 'peakBytes': peak}
+
+  @staticmethod
+  def getStatus():
+    return {
+      'tracing': MemoryProfiler.isTracing,
+      'numFrames': MemoryProfiler.numFrames,
+      'baselineTime': MemoryProfiler.baselineTime,
+      'tracedMemory': MemoryProfiler.getTracedMemory() if MemoryProfiler.isTracing == True else None
+    }
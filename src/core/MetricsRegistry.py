@@ -0,0 +1,183 @@
+import logging
+import threading
+import time
+
+from utils.LatencyHistogram import LatencyHistogram
+
+class MetricsRegistry:
+  # In process registry of the app health metrics served in Prometheus text format by restapis.MetricsAPI.
+  # Counters are updated on the hot paths (Ex: every tick) so each thread counts into its own dict and the dicts of all
+  # the threads are summed up only when the metrics are scraped. An update is a plain dict update on the thread's own
+  # dict with no lock and no contention between threads. Counts of finished threads are merged once into retiredCounts.
+  # Gauges are set as is (last value wins). Durations are kept as summaries with quantiles from a LatencyHistogram,
+  # they are recorded only on slow paths (Ex: once per TradeManager cycle) and hence use the registry lock.
+  # Rates (Ex: ticks per second) are worked out from the counters at every scrape.
+  # Collectors are functions called on every scrape to set the gauges whose values are owned by other modules.
+  metricToInfoMap = { # metric name => (type, help, label names)
+    'algo_ticks_total': ('counter', 'Ticks received per symbol', ('symbol',)),
+    'algo_tick_rate': ('gauge', 'Ticks per second per symbol since the previous scrape', ('symbol',)),
+    'algo_listener_exceptions_total': ('counter', 'Exceptions raised by tick, order update and candle listeners', ('listener',)),
+    'algo_orders_total': ('counter', 'Order calls acknowledged by broker', ('broker', 'action')),
+    'algo_broker_errors_total': ('counter', 'Failed broker calls by error type', ('broker', 'action', 'type')),
+    'algo_open_trades': ('gauge', 'Active trades per strategy', ('strategy',)),
+    'algo_trademanager_cycle_seconds': ('summary', 'Duration of TradeManager tracking cycle', ()),
+    'algo_trades_save_seconds': ('summary', 'Duration of saving the trades to trades journal', ()),
+    'algo_order_queue_depth': ('gauge', 'Jobs waiting in the order execution engine queues', ('engine',)),
+    'algo_order_jobs_total': ('counter', 'Order execution engine jobs by state (submitted, completed, failed)', ('engine', 'state')),
+    'algo_order_job_latency_seconds': ('gauge', 'Submit to completion latency of order execution engine jobs (avg, max, last)', ('engine', 'stat')),
+    'algo_broker_connections_total': ('counter', 'Http connections opened to broker by the order manager session', ('broker',)),
+    'algo_broker_requests_total': ('counter', 'Http requests sent to broker by the order manager session on new and reused connections', ('broker', 'connection')),
+    'algo_quote_cache_lookups_total': ('counter', 'Quote cache lookups by result (hits, misses, staleMisses)', ('result',)),
+    'algo_ratelimit_wait_seconds': ('summary', 'Wait for broker api rate limit per endpoint class and request priority (0 exit, 1 entry, 2 poll)', ('endpoint', 'priority')),
+    'algo_scheduler_job_runs_total': ('counter', 'Runs of the scheduled jobs by state (runs, skipped, failed)', ('job', 'state')),
+    'algo_scheduler_job_seconds': ('gauge', 'Run time and start delay of the scheduled jobs (avg_run, max_run, last_run, max_delay)', ('job', 'stat'))
+  }
+  rateMetrics = {'algo_ticks_total': 'algo_tick_rate'} # counter => gauge of its rate per second between scrapes
+  lastRateCounts = {} # (counter name, label values) => count at the previous scrape
+  lastRateTime = None
+  threadCounts = [] # list of (thread, counts dict of that thread)
+  retiredCounts = {} # (metric name, label values) => count of the threads already finished
+  gauges = {} # (metric name, label values) => value
+  summaries = {} # (metric name, label values) => [LatencyHistogram, sum of seconds]
+  collectors = []
+  threadLocal = threading.local()
+  lock = threading.Lock()
+  scrapeLock = threading.Lock() # one scrape at a time so that the rates are worked out between consecutive scrapes
+
+  @staticmethod
+  def registerMetric(name, metricType, helpText, labelNames = ()):
+    # metricType is counter, gauge or summary
+    MetricsRegistry.metricToInfoMap[name] = (metricType, helpText, tuple(labelNames))
+
+  @staticmethod
+  def registerCollector(collector):
+    with MetricsRegistry.lock:
+      if collector not in MetricsRegistry.collectors:
+        MetricsRegistry.collectors.append(collector)
+
+  @staticmethod
+  def getCounts():
+    # counts dict of the calling thread. Callers on hot paths can keep it and increment it directly
+    counts = getattr(MetricsRegistry.threadLocal, 'counts', None)
+    if counts == None:
+      counts = {}
+      MetricsRegistry.threadLocal.counts = counts
+      with MetricsRegistry.lock:
+        MetricsRegistry.threadCounts.append((threading.current_thread(), counts))
+    return counts
+
+  @staticmethod
+  def inc(name, labelValues = (), value = 1):
+    counts = MetricsRegistry.getCounts()
+    key = (name, labelValues)
+    counts[key] = counts.get(key, 0) + value
+
+  @staticmethod
+  def setGauge(name, labelValues = (), value = 0):
+    MetricsRegistry.gauges[(name, labelValues)] = value
+
+  @staticmethod
+  def clearGauge(name):
+    # Removes all the label values of the gauge. Used by collectors before setting the current values
+    for key in [key for key in list(MetricsRegistry.gauges) if key[0] == name]:
+      MetricsRegistry.gauges.pop(key, None)
+
+  @staticmethod
+  def observe(name, seconds, labelValues = ()):
+    key = (name, labelValues)
+    with MetricsRegistry.lock:
+      summary = MetricsRegistry.summaries.get(key)
+      if summary == None:
+        summary = [LatencyHistogram(name), 0]
+        MetricsRegistry.summaries[key] = summary
+      summary[0].record(int(seconds * 1000000000))
+      summary[1] += seconds
+
+  @staticmethod
+  def getCounterValues():
+    # (metric name, label values) => count summed over all the threads
+    values = {}
+    with MetricsRegistry.lock:
+      aliveThreadCounts = []
+      for (thread, counts) in MetricsRegistry.threadCounts:
+        if thread.is_alive() == False:
+          for (key, count) in counts.copy().items():
+            MetricsRegistry.retiredCounts[key] = MetricsRegistry.retiredCounts.get(key, 0) + count
+          continue
+        aliveThreadCounts.append((thread, counts))
+      MetricsRegistry.threadCounts = aliveThreadCounts
+      values.update(MetricsRegistry.retiredCounts)
+    for (thread, counts) in aliveThreadCounts:
+      # copy() of a dict is atomic, the owner thread may go on updating it meanwhile
+      for (key, count) in counts.copy().items():
+        values[key] = values.get(key, 0) + count
+    return values
+
+  @staticmethod
+  def updateRates(counterValues):
+    now = time.monotonic()
+    lastRateTime = MetricsRegistry.lastRateTime
+    for (counterName, gaugeName) in MetricsRegistry.rateMetrics.items():
+      MetricsRegistry.clearGauge(gaugeName)
+      if lastRateTime == None or now <= lastRateTime:
+        continue
+      for (key, count) in counterValues.items():
+        if key[0] != counterName:
+          continue
+        lastCount = MetricsRegistry.lastRateCounts.get(key, 0)
+        MetricsRegistry.setGauge(gaugeName, key[1], round((count - lastCount) / (now - lastRateTime), 3))
+    MetricsRegistry.lastRateCounts = {key: count for (key, count) in counterValues.items() if key[0] in MetricsRegistry.rateMetrics}
+    MetricsRegistry.lastRateTime = now
+
+  @staticmethod
+  def collect():
+    for collector in list(MetricsRegistry.collectors):
+      try:
+        collector()
+      except Exception as e:
+        logging.error('MetricsRegistry: Exception from metrics collector %s. Error => %s', collector, str(e))
+
+  @staticmethod
+  def formatLabels(labelNames, labelValues, extraLabels = ''):
+    labels = []
+    for (labelName, labelValue) in zip(labelNames, labelValues):
+      value = str(labelValue).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+      labels.append(labelName + '="' + value + '"')
+    if extraLabels != '':
+      labels.append(extraLabels)
+    return '{' + ','.join(labels) + '}' if len(labels) > 0 else ''
+
+  @staticmethod
+  def render():
+    # All the metrics in Prometheus text exposition format
+    with MetricsRegistry.scrapeLock:
+      MetricsRegistry.collect()
+      counterValues = MetricsRegistry.getCounterValues()
+      MetricsRegistry.updateRates(counterValues)
+    nameToSamplesMap = {}
+    for (key, value) in counterValues.items():
+      nameToSamplesMap.setdefault(key[0], []).append((key[1], value))
+    for (key, value) in list(MetricsRegistry.gauges.items()):
+      nameToSamplesMap.setdefault(key[0], []).append((key[1], value))
+    with MetricsRegistry.lock:
+      for (key, summary) in MetricsRegistry.summaries.items():
+        (histogram, totalSeconds) = summary
+        quantiles = [(quantile, histogram.getPercentile(quantile * 100) / 1000000000) for quantile in [0.5, 0.9, 0.99]]
+        quantiles.append((1.0, histogram.max / 1000000000))
+        nameToSamplesMap.setdefault(key[0], []).append((key[1], (quantiles, totalSeconds, histogram.count)))
+
+    lines = []
+    for name in sorted(nameToSamplesMap):
+      (metricType, helpText, labelNames) = MetricsRegistry.metricToInfoMap.get(name, ('untyped', name, ()))
+      lines.append('# HELP ' + name + ' ' + helpText)
+      lines.append('# TYPE ' + name + ' ' + metricType)
+      for (labelValues, value) in sorted(nameToSamplesMap[name], key=lambda sample: sample[0]):
+        if metricType != 'summary':
+          lines.append(name + MetricsRegistry.formatLabels(labelNames, labelValues) + ' ' + repr(float(value)))
+          continue
+        (quantiles, totalSeconds, count) = value
+        for (quantile, seconds) in quantiles:
+          lines.append(name + MetricsRegistry.formatLabels(labelNames, labelValues, 'quantile="' + str(quantile) + '"') + ' ' + repr(seconds))
+        lines.append(name + '_sum' + MetricsRegistry.formatLabels(labelNames, labelValues) + ' ' + repr(float(totalSeconds)))
+        lines.append(name + '_count' + MetricsRegistry.formatLabels(labelNames, labelValues) + ' ' + repr(float(count)))
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,91 @@
+import copy
+import threading
+
+from core.MetricsRegistry import MetricsRegistry
+from models.Quote import Quote
+from utils.Clock import Clock
+
+class QuoteCache:
+  # Latest quote of each symbol so that strategies need not call broker REST apis for prices the ticker already has.
+  # Tick fields are read from the ticker's TickStore (updated by ZerodhaTicker.on_ticks) and are as fresh as the latest
+  # tick of the symbol. Fields that do not come with ticks are kept from the last REST quote and are as fresh as that quote.
+  # Quotes are cached per (exchange, tradingSymbol) as the same symbol can be quoted on more than one exchange, ticks are
+  # used only for the exchange of the instrument subscribed with the ticker.
+  # NOTE: change of a tick is the percentage change from previous close whereas change of a Quote is the absolute change
+  # (broker net_change), so change of a quote served from ticks is worked out as lastTradedPrice - close.
+  tickFields = ['lastTradedPrice', 'lastTradedQuantity', 'avgTradedPrice', 'volume', 'totalBuyQuantity', 'totalSellQuantity', \
+    'open', 'high', 'low', 'close']
+  restOnlyFields = ['oiDayHigh', 'oiDayLow', 'lowerCiruitLimit', 'upperCircuitLimit']
+  defaultMaxAgeSeconds = 5
+  tickStore = None
+  symbolToRestQuoteMap = {} # (exchange, tradingSymbol) => (fetch timestamp, Quote)
+  lock = threading.Lock()
+  hits = 0
+  misses = 0 # nothing cached for the symbol
+  staleMisses = 0 # cached but older than the age asked for
+
+  @staticmethod
+  def setTickStore(tickStore):
+    QuoteCache.tickStore = tickStore
+
+  @staticmethod
+  def putQuote(exchange, quote):
+    # Called with every quote fetched over REST
+    QuoteCache.symbolToRestQuoteMap[(exchange, quote.tradingSymbol)] = (Clock.time(), quote)
+
+  @staticmethod
+  def getQuote(exchange, tradingSymbol, maxAgeSeconds = None, fields = None):
+    # Returns a copy of the cached quote if all the fields asked for are not older than maxAgeSeconds else None.
+    # fields = None means only the tick fields are needed (which is what strategies use).
+    if maxAgeSeconds == None:
+      maxAgeSeconds = QuoteCache.defaultMaxAgeSeconds
+    needsTickFields = fields == None
+    needsRestOnlyFields = False
+    if fields != None:
+      for field in fields:
+        if field in QuoteCache.restOnlyFields:
+          needsRestOnlyFields = True
+        else:
+          needsTickFields = True
+
+    restTimestamp, restQuote = QuoteCache.symbolToRestQuoteMap.get((exchange, tradingSymbol), (0, None))
+    tickView = QuoteCache.tickStore.getView(tradingSymbol, exchange) if QuoteCache.tickStore != None else None
+    tickTimestamp = tickView.timestamp if tickView != None else 0
+    if restQuote == None and tickTimestamp == 0:
+      QuoteCache.incrementStat('misses')
+      return None
+
+    now = Clock.time()
+    isFresh = True
+    if needsTickFields == True and now - max(tickTimestamp, restTimestamp) > maxAgeSeconds:
+      isFresh = False
+    if needsRestOnlyFields == True and now - restTimestamp > maxAgeSeconds:
+      isFresh = False
+    if isFresh == False:
+      QuoteCache.incrementStat('staleMisses')
+      return None
+
+    quote = copy.copy(restQuote) if restQuote != None else Quote(tradingSymbol)
+    if tickTimestamp > restTimestamp:
+      for field in QuoteCache.tickFields:
+        setattr(quote, field, getattr(tickView, field))
+      quote.change = round(quote.lastTradedPrice - quote.close, 2) if quote.close > 0 else 0
+    QuoteCache.incrementStat('hits')
+    return quote
+
+  @staticmethod
+  def incrementStat(name):
+    with QuoteCache.lock:
+      setattr(QuoteCache, name, getattr(QuoteCache, name) + 1)
+    MetricsRegistry.inc('algo_quote_cache_lookups_total', (name,))
+
+  @staticmethod
+  def getStats():
+    with QuoteCache.lock:
+      total = QuoteCache.hits + QuoteCache.misses + QuoteCache.staleMisses
+      return {
+        'hits': QuoteCache.hits,
+        'misses': QuoteCache.misses,
+        'staleMisses': QuoteCache.staleMisses,
+        'hitRatio': QuoteCache.hits / total if total > 0 else 0
+      }
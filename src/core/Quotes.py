@@ -1,40 +1,79 @@
 import logging
 
 from core.Controller import Controller
+from core.QuoteCache import QuoteCache
+from core.RateLimiter import RateLimiter
+from models.ApiEndpoint import ApiEndpoint
+from models.RequestPriority import RequestPriority
 from models.Quote import Quote
 
 class Quotes:
+  maxInstrumentsPerRequest = 500 # Max number of instruments broker allows in a single quote request
+
+  @staticmethod
+  def getQuote(tradingSymbol, isFnO = False, maxAgeSeconds = None, fields = None, priority = RequestPriority.POLL):
+    quotes = Quotes.getQuotes([tradingSymbol], isFnO, maxAgeSeconds, fields, priority)
+    return quotes.get(tradingSymbol)
+
   @staticmethod
-  def getQuote(tradingSymbol, isFnO = False):
+  def getQuotes(tradingSymbols, isFnO = False, maxAgeSeconds = None, fields = None, priority = RequestPriority.POLL):
+    # Quotes are served from QuoteCache when the fields asked for are not older than maxAgeSeconds (QuoteCache default
+    # when None, pass 0 to always fetch from broker). Rest of the quotes are fetched with as few broker requests as possible.
+    # Returns a dict of tradingSymbol => Quote. Symbols for which broker returned no quote are not present in the dict.
+    quotes = {}
+    missingSymbols = []
+    exchange = 'NFO' if isFnO == True else 'NSE'
+    for tradingSymbol in tradingSymbols:
+      quote = QuoteCache.getQuote(exchange, tradingSymbol, maxAgeSeconds, fields)
+      if quote != None:
+        quotes[tradingSymbol] = quote
+      else:
+        missingSymbols.append(tradingSymbol)
+    if len(missingSymbols) == 0:
+      return quotes
+
     broker = Controller.getBrokerName()
     brokerHandle = Controller.getBrokerLogin().getBrokerHandle()
-    quote = None
-    if broker == "zerodha":
-      key = ('NFO:' + tradingSymbol) if isFnO == True else ('NSE:' + tradingSymbol)
-      bQuoteResp = brokerHandle.quote(key) 
-      bQuote = bQuoteResp[key]
-      # convert broker quote to our system quote
-      quote = Quote(tradingSymbol)
-      quote.tradingSymbol = tradingSymbol
-      quote.lastTradedPrice = bQuote['last_price']
-      quote.lastTradedQuantity = bQuote['last_quantity']
-      quote.avgTradedPrice = bQuote['average_price']
-      quote.volume = bQuote['volume']
-      quote.totalBuyQuantity = bQuote['buy_quantity']
-      quote.totalSellQuantity = bQuote['sell_quantity']
-      ohlc = bQuote['ohlc']
-      quote.open = ohlc['open']
-      quote.high = ohlc['high']
-      quote.low = ohlc['low']
-      quote.close = ohlc['close']
-      quote.change = bQuote['net_change']
-      quote.oiDayHigh = bQuote['oi_day_high']
-      quote.oiDayLow = bQuote['oi_day_low']
-      quote.lowerCiruitLimit = bQuote['lower_circuit_limit']
-      quote.upperCircuitLimit = bQuote['upper_circuit_limit']
+    if broker == "zerodha" or broker == "backtest":
+      # Backtest broker serves quotes in the same format as zerodha
+      for start in range(0, len(missingSymbols), Quotes.maxInstrumentsPerRequest):
+        symbols = missingSymbols[start:start + Quotes.maxInstrumentsPerRequest]
+        keys = [exchange + ':' + tradingSymbol for tradingSymbol in symbols]
+        RateLimiter.acquire(ApiEndpoint.QUOTES, priority)
+        bQuoteResp = brokerHandle.quote(keys)
+        for tradingSymbol in symbols:
+          bQuote = bQuoteResp.get(exchange + ':' + tradingSymbol)
+          if bQuote == None:
+            logging.error('Quotes: No quote received from broker for %s', exchange + ':' + tradingSymbol)
+            continue
+          quotes[tradingSymbol] = Quotes.convertToQuote(tradingSymbol, bQuote)
+          QuoteCache.putQuote(exchange, quotes[tradingSymbol])
     else:
       # The logic may be different for other brokers
-      quote = None
+      pass
+    return quotes
+
+  @staticmethod
+  def convertToQuote(tradingSymbol, bQuote):
+    # convert broker quote to our system quote
+    quote = Quote(tradingSymbol)
+    quote.tradingSymbol = tradingSymbol
+    quote.lastTradedPrice = bQuote['last_price']
+    quote.lastTradedQuantity = bQuote['last_quantity']
+    quote.avgTradedPrice = bQuote['average_price']
+    quote.volume = bQuote['volume']
+    quote.totalBuyQuantity = bQuote['buy_quantity']
+    quote.totalSellQuantity = bQuote['sell_quantity']
+    ohlc = bQuote['ohlc']
+    quote.open = ohlc['open']
+    quote.high = ohlc['high']
+    quote.low = ohlc['low']
+    quote.close = ohlc['close']
+    quote.change = bQuote['net_change']
+    quote.oiDayHigh = bQuote['oi_day_high']
+    quote.oiDayLow = bQuote['oi_day_low']
+    quote.lowerCiruitLimit = bQuote['lower_circuit_limit']
+    quote.upperCircuitLimit = bQuote['upper_circuit_limit']
     return quote
 
   @staticmethod
@@ -0,0 +1,75 @@
+import logging
+import threading
+
+from core.MetricsRegistry import MetricsRegistry
+from core.TokenBucket import TokenBucket
+from models.ApiEndpoint import ApiEndpoint
+from models.RequestPriority import RequestPriority
+
+class RateLimiter:
+  # Central throttle for all broker api calls. Every call acquires a token from the bucket of its endpoint class before
+  # hitting the broker so that bursts (Ex: many strategies triggering together) are spread out instead of getting rejected
+  # by the broker. When requests have to wait, exits go first, then entries and then polling.
+  # Default limits are as per Zerodha kite connect api limits (requests per second).
+  endpointToLimitsMap = {
+    ApiEndpoint.ORDERS: (10, 10), # (ratePerSecond, burst)
+    ApiEndpoint.QUOTES: (1, 1),
+    ApiEndpoint.ORDER_BOOK: (10, 10),
+    ApiEndpoint.PORTFOLIO: (10, 10),
+    ApiEndpoint.OTHER: (10, 10)
+  }
+  enabled = True # Disabled in backtests as there is no broker to protect
+  slowWaitSeconds = 1 # Waits longer than this are logged
+  endpointToBucketMap = {}
+  waitStats = {} # (endpoint, priority) => [number of requests, total wait seconds, max wait seconds]
+  lock = threading.Lock()
+
+  @staticmethod
+  def setLimit(endpoint, ratePerSecond, burst):
+    with RateLimiter.lock:
+      RateLimiter.endpointToLimitsMap[endpoint] = (ratePerSecond, burst)
+      RateLimiter.endpointToBucketMap.pop(endpoint, None)
+
+  @staticmethod
+  def getBucket(endpoint):
+    bucket = RateLimiter.endpointToBucketMap.get(endpoint)
+    if bucket == None:
+      with RateLimiter.lock:
+        bucket = RateLimiter.endpointToBucketMap.get(endpoint)
+        if bucket == None:
+          (ratePerSecond, burst) = RateLimiter.endpointToLimitsMap.get(endpoint, RateLimiter.endpointToLimitsMap[ApiEndpoint.OTHER])
+          bucket = TokenBucket(endpoint, ratePerSecond, burst)
+          RateLimiter.endpointToBucketMap[endpoint] = bucket
+    return bucket
+
+  @staticmethod
+  def acquire(endpoint, priority = RequestPriority.POLL):
+    # Call this just before making the broker api call
+    if RateLimiter.enabled == False:
+      return 0
+    waitTime = RateLimiter.getBucket(endpoint).acquire(priority)
+    with RateLimiter.lock:
+      stats = RateLimiter.waitStats.get((endpoint, priority))
+      if stats == None:
+        stats = [0, 0, 0]
+        RateLimiter.waitStats[(endpoint, priority)] = stats
+      stats[0] += 1
+      stats[1] += waitTime
+      stats[2] = max(stats[2], waitTime)
+    MetricsRegistry.observe('algo_ratelimit_wait_seconds', waitTime, (endpoint, str(priority)))
+    if waitTime > RateLimiter.slowWaitSeconds:
+      logging.warn('RateLimiter: %s request with priority %d waited %.3f seconds for rate limit', endpoint, priority, waitTime)
+    return waitTime
+
+  @staticmethod
+  def getStats():
+    # endpoint => priority => wait stats
+    allStats = {}
+    with RateLimiter.lock:
+      for (endpoint, priority), stats in RateLimiter.waitStats.items():
+        allStats.setdefault(endpoint, {})[priority] = {
+          'requests': stats[0],
+          'avgWaitMillis': stats[1] * 1000 / stats[0],
+          'maxWaitMillis': stats[2] * 1000
+        }
+    return allStats
@@ -0,0 +1,108 @@
+import logging
+import os
+import sys
+import threading
+import time
+
+class SamplingProfiler:
+  # On demand CPU profiler of the running app. A sampler thread takes the stacks of all the threads (ticker,
+  # TradeManager, scheduler, order workers, flask ..) from sys._current_frames() every intervalMillis and counts each
+  # distinct stack. Nothing is hooked into the profiled code so the overhead is only the sampler thread waking up
+  # (~1% at the default 10 ms interval) and it is safe to run during market hours. The profiler stops on its own after
+  # maxSeconds in case it is not stopped. Stacks are returned in collapsed format (thread;frame;frame count) which can be
+  # fed as is to flamegraph.pl or speedscope.
+  minIntervalMillis = 1
+  maxStacks = 20000 # distinct stacks kept. Samples of new stacks beyond this are counted under a single [truncated] stack
+  stackToCountMap = {}
+  isRunning = False
+  samplerThread = None
+  stopEvent = None
+  intervalMillis = 10
+  numSamples = 0
+  startTime = None
+  stopTime = None
+  lock = threading.Lock()
+
+  @staticmethod
+  def start(intervalMillis = 10, maxSeconds = 300):
+    with SamplingProfiler.lock:
+      if SamplingProfiler.isRunning == True:
+        return False
+      SamplingProfiler.intervalMillis = max(SamplingProfiler.minIntervalMillis, intervalMillis)
+      SamplingProfiler.stackToCountMap = {}
+      SamplingProfiler.numSamples = 0
+      SamplingProfiler.startTime = time.time()
+      SamplingProfiler.stopTime = None
+      SamplingProfiler.stopEvent = threading.Event()
+      SamplingProfiler.isRunning = True
+      # NOTE: Plain thread and not Clock.startThread() as the profiler samples wall clock time even in backtests
+      SamplingProfiler.samplerThread = threading.Thread(target=SamplingProfiler.run, args=(SamplingProfiler.stopEvent, maxSeconds), \
+        name='SamplingProfiler', daemon=True)
+      SamplingProfiler.samplerThread.start()
+    logging.info('SamplingProfiler: Started with interval %d ms for max %d seconds', SamplingProfiler.intervalMillis, maxSeconds)
+    return True
+
+  @staticmethod
+  def stop():
+    with SamplingProfiler.lock:
+      if SamplingProfiler.isRunning == False:
+        return False
+      SamplingProfiler.stopEvent.set()
+      samplerThread = SamplingProfiler.samplerThread
+    samplerThread.join()
+    logging.info('SamplingProfiler: Stopped after %d samples', SamplingProfiler.numSamples)
+    return True
+
+  @staticmethod
+  def run(stopEvent, maxSeconds):
+    intervalSeconds = SamplingProfiler.intervalMillis / 1000
+    endTime = time.monotonic() + maxSeconds
+    ownThreadId = threading.get_ident()
+    threadIdToNameMap = {}
+    frameToLabelMap = {} # code object => frame label
+    while stopEvent.wait(intervalSeconds) == False and time.monotonic() < endTime:
+      frames = sys._current_frames()
+      if any(threadId not in threadIdToNameMap for threadId in frames):
+        threadIdToNameMap = {thread.ident: thread.name for thread in threading.enumerate()}
+      for (threadId, frame) in frames.items():
+        if threadId == ownThreadId:
+          continue
+        labels = []
+        while frame != None:
+          code = frame.f_code
+          label = frameToLabelMap.get(code)
+          if label == None:
+            label = os.path.basename(code.co_filename) + ':' + code.co_name
+            frameToLabelMap[code] = label
+          labels.append(label)
+          frame = frame.f_back
+        labels.append(threadIdToNameMap.get(threadId, str(threadId)).replace(';', '_').replace(' ', '_'))
+        labels.reverse()
+        stack = ';'.join(labels)
+        stackToCountMap = SamplingProfiler.stackToCountMap
+        if stack not in stackToCountMap and len(stackToCountMap) >= SamplingProfiler.maxStacks:
+          stack = labels[0] + ';[truncated]'
+        stackToCountMap[stack] = stackToCountMap.get(stack, 0) + 1
+      SamplingProfiler.numSamples += 1
+      del frames
+    with SamplingProfiler.lock:
+      SamplingProfiler.isRunning = False
+      SamplingProfiler.stopTime = time.time()
+
+  @staticmethod
+  def getCollapsedStacks():
+    # One line per distinct stack: thread;outermost frame;..;innermost frame count
+    stackToCountMap = SamplingProfiler.stackToCountMap.copy()
+    lines = [stack + ' ' + str(count) for (stack, count) in sorted(stackToCountMap.items())]
+    return '\n'.join(lines) + '\n' if len(lines) > 0 else ''
+
+  @staticmethod
+  def getStatus():
+    return {
+      'running': SamplingProfiler.isRunning,
+      'intervalMillis': SamplingProfiler.intervalMillis,
+      'samples': SamplingProfiler.numSamples,
+      'stacks': len(SamplingProfiler.stackToCountMap),
+      'startTime': SamplingProfiler.startTime,
+      'stopTime': SamplingProfiler.stopTime
+    }
@@ -0,0 +1,76 @@
+import math
+import threading
+
+from models.JobPriority import JobPriority
+
+class ScheduledJob:
+  # A job of the core.Scheduler. target is called without arguments at startTime and then every intervalSeconds
+  # (once if intervalSeconds is None) till endTime. Times are epoch seconds.
+  # alignToInterval = True runs the job on the multiples of the interval (Ex: every 30th second of the clock).
+  # skipIfOverrunning = True skips the runs missed while the previous run was still going on, else the job is run
+  # once right away to catch up.
+  # runOnThread = True runs the job on its own thread so that a slow job (Ex: broker api calls) does not hold up the
+  # other jobs. A run is always skipped if the previous run of the job is still going on.
+  # onEnd (optional) is called once after the last run.
+  def __init__(self, name, target, intervalSeconds = None, startTime = None, endTime = None, priority = JobPriority.NORMAL, \
+    alignToInterval = False, skipIfOverrunning = True, runOnThread = False, onEnd = None):
+    self.name = name
+    self.target = target
+    self.intervalSeconds = intervalSeconds
+    self.startTime = startTime
+    self.endTime = endTime
+    self.priority = priority
+    self.alignToInterval = alignToInterval
+    self.skipIfOverrunning = skipIfOverrunning
+    self.runOnThread = runOnThread
+    self.onEnd = onEnd
+    self.nextRunTime = None
+    self.isRunning = False
+    self.isCancelled = False
+    self.lock = threading.Lock()
+    # metrics
+    self.numRuns = 0
+    self.numSkipped = 0
+    self.numFailed = 0
+    self.totalRunSeconds = 0
+    self.maxRunSeconds = 0
+    self.lastRunSeconds = 0
+    self.maxDelaySeconds = 0 # how late a run started after its scheduled time
+
+  def getNextRunTime(self, fromTime):
+    # Next run time after a run scheduled at fromTime. None if the job does not repeat
+    if self.intervalSeconds == None:
+      return None
+    if self.alignToInterval == True:
+      return (math.floor(fromTime / self.intervalSeconds) + 1) * self.intervalSeconds
+    return fromTime + self.intervalSeconds
+
+  def recordRun(self, delaySeconds, runSeconds, failed):
+    with self.lock:
+      self.numRuns += 1
+      if failed == True:
+        self.numFailed += 1
+      self.totalRunSeconds += runSeconds
+      self.lastRunSeconds = runSeconds
+      self.maxRunSeconds = max(self.maxRunSeconds, runSeconds)
+      self.maxDelaySeconds = max(self.maxDelaySeconds, delaySeconds)
+
+  def recordSkipped(self, numSkipped):
+    with self.lock:
+      self.numSkipped += numSkipped
+
+  def getStats(self):
+    with self.lock:
+      return {
+        'intervalSeconds': self.intervalSeconds,
+        'priority': self.priority,
+        'nextRunTime': self.nextRunTime,
+        'running': self.isRunning,
+        'runs': self.numRuns,
+        'skipped': self.numSkipped,
+        'failed': self.numFailed,
+        'avgRunMillis': (self.totalRunSeconds * 1000 / self.numRuns) if self.numRuns > 0 else 0,
+        'maxRunMillis': self.maxRunSeconds * 1000,
+        'lastRunMillis': self.lastRunSeconds * 1000,
+        'maxDelayMillis': self.maxDelaySeconds * 1000
+      }
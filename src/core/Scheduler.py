@@ -0,0 +1,181 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from core.MetricsRegistry import MetricsRegistry
+from core.ScheduledJob import ScheduledJob
+from models.JobPriority import JobPriority
+from utils.Clock import Clock
+
+class Scheduler:
+  # Single event loop which runs the periodic work of the app (TradeManager tracking cycles, strategy process() calls,
+  # square off deadlines) as scheduled jobs instead of one thread sleeping in a loop for each of them.
+  # Jobs are kept in a heap ordered by (next run time, priority). The loop thread sleeps till the earliest job is due
+  # and is woken up early when a job due before that is added. The loop thread is started when a job is added and
+  # exits once all the jobs are over. It runs on the Clock so backtests run the same schedule on the simulated time.
+  jobsHeap = [] # (next run time, priority, sequence number, job)
+  nameToJobMap = {}
+  condition = threading.Condition()
+  wakeUpEvent = threading.Event()
+  sequence = itertools.count()
+  isRunning = False
+
+  @staticmethod
+  def addJob(name, target, intervalSeconds = None, startTime = None, endTime = None, priority = JobPriority.NORMAL, \
+    alignToInterval = False, skipIfOverrunning = True, runOnThread = False, onEnd = None):
+    # See ScheduledJob for the arguments. startTime None means right away.
+    job = ScheduledJob(name, target, intervalSeconds, startTime, endTime, priority, alignToInterval, skipIfOverrunning, \
+      runOnThread, onEnd)
+    startLoop = False
+    with Scheduler.condition:
+      if name in Scheduler.nameToJobMap:
+        raise Exception('Scheduler: Job ' + name + ' already exists')
+      Scheduler.nameToJobMap[name] = job
+      firstRunTime = startTime if startTime != None else Clock.time()
+      if endTime != None and firstRunTime > endTime:
+        logging.warn('Scheduler: Job %s starts after its end time. Hence it will not run.', name)
+      Scheduler.pushJob(job, firstRunTime)
+      isEarliest = Scheduler.jobsHeap[0][3] is job
+      if Scheduler.isRunning == False:
+        Scheduler.isRunning = True
+        startLoop = True
+    logging.info('Scheduler: Added job %s with interval %s seconds and priority %d', name, intervalSeconds, priority)
+    if startLoop == True:
+      MetricsRegistry.registerCollector(Scheduler.collectMetrics)
+      Clock.startThread(Scheduler.run, 'Scheduler')
+    elif isEarliest == True:
+      Clock.notify(Scheduler.wakeUpEvent)
+    return job
+
+  @staticmethod
+  def cancelJob(name):
+    # Job is removed without calling its onEnd. A run already going on is not interrupted.
+    with Scheduler.condition:
+      job = Scheduler.nameToJobMap.pop(name, None)
+      if job == None:
+        return False
+      job.isCancelled = True
+    logging.info('Scheduler: Cancelled job %s', name)
+    return True
+
+  @staticmethod
+  def getJob(name):
+    return Scheduler.nameToJobMap.get(name)
+
+  @staticmethod
+  def pushJob(job, runTime):
+    # Jobs past their end time get one last entry at the end time to call their onEnd
+    job.isEnding = False
+    if job.endTime != None and (runTime == None or runTime > job.endTime):
+      runTime = job.endTime
+      job.isEnding = True
+    job.nextRunTime = runTime
+    heapq.heappush(Scheduler.jobsHeap, (runTime, job.priority, next(Scheduler.sequence), job))
+
+  @staticmethod
+  def run():
+    logging.info('Scheduler: Started')
+    while True:
+      job = None
+      with Scheduler.condition:
+        while len(Scheduler.jobsHeap) > 0 and Scheduler.jobsHeap[0][3].isCancelled == True:
+          heapq.heappop(Scheduler.jobsHeap)
+        if len(Scheduler.jobsHeap) == 0:
+          Scheduler.isRunning = False
+          break
+        (runTime, _, _, nextJob) = Scheduler.jobsHeap[0]
+        now = Clock.time()
+        if runTime <= now:
+          heapq.heappop(Scheduler.jobsHeap)
+          job = nextJob
+        else:
+          Scheduler.wakeUpEvent.clear()
+      if job == None:
+        Clock.wait(Scheduler.wakeUpEvent, runTime - now)
+        continue
+      if job.isEnding == True:
+        Scheduler.endJob(job)
+      else:
+        Scheduler.runJob(job, runTime)
+    logging.info('Scheduler: Stopped as there are no more jobs')
+
+  @staticmethod
+  def runJob(job, runTime):
+    if job.runOnThread == True:
+      if job.isRunning == True:
+        logging.warn('Scheduler: Skipping run of job %s as its previous run is still going on', job.name)
+        job.recordSkipped(1)
+      else:
+        job.isRunning = True
+        Clock.startThread(lambda: Scheduler.executeJob(job, runTime), job.name)
+    else:
+      Scheduler.executeJob(job, runTime)
+    Scheduler.scheduleNextRun(job, runTime)
+
+  @staticmethod
+  def executeJob(job, runTime):
+    job.isRunning = True
+    delaySeconds = Clock.time() - runTime
+    startTime = time.perf_counter()
+    failed = False
+    try:
+      job.target()
+    except Exception as e:
+      failed = True
+      logging.exception('Scheduler: Exception in job %s', job.name)
+    job.recordRun(delaySeconds, time.perf_counter() - startTime, failed)
+    job.isRunning = False
+
+  @staticmethod
+  def scheduleNextRun(job, runTime):
+    now = Clock.time()
+    nextRunTime = job.getNextRunTime(runTime)
+    if nextRunTime != None and nextRunTime <= now:
+      # The run took longer than the interval
+      if job.skipIfOverrunning == True:
+        followingRunTime = job.getNextRunTime(now)
+        job.recordSkipped(max(1, round((followingRunTime - nextRunTime) / job.intervalSeconds)))
+        nextRunTime = followingRunTime
+      else:
+        nextRunTime = now
+    if nextRunTime == None and job.endTime == None:
+      # One time job is over
+      Scheduler.endJob(job)
+      return
+    with Scheduler.condition:
+      if job.isCancelled == True:
+        return
+      Scheduler.pushJob(job, nextRunTime)
+
+  @staticmethod
+  def endJob(job):
+    with Scheduler.condition:
+      if Scheduler.nameToJobMap.get(job.name) is job:
+        del Scheduler.nameToJobMap[job.name]
+    stats = job.getStats()
+    logging.info('Scheduler: Job %s ended after %d runs (%d skipped, %d failed). Avg run = %.2f ms, max run = %.2f ms, max delay = %.2f ms', \
+      job.name, stats['runs'], stats['skipped'], stats['failed'], stats['avgRunMillis'], stats['maxRunMillis'], stats['maxDelayMillis'])
+    if job.onEnd != None:
+      try:
+        job.onEnd()
+      except Exception as e:
+        logging.exception('Scheduler: Exception in onEnd of job %s', job.name)
+
+  @staticmethod
+  def getStats():
+    with Scheduler.condition:
+      jobs = list(Scheduler.nameToJobMap.values())
+    return {job.name: job.getStats() for job in jobs}
+
+  @staticmethod
+  def collectMetrics():
+    # Metrics collector. Gauges are cleared first so that the jobs already ended are dropped
+    MetricsRegistry.clearGauge('algo_scheduler_job_runs_total')
+    MetricsRegistry.clearGauge('algo_scheduler_job_seconds')
+    for name, stats in Scheduler.getStats().items():
+      for state in ['runs', 'skipped', 'failed']:
+        MetricsRegistry.setGauge('algo_scheduler_job_runs_total', (name, state), stats[state])
+      for stat, key in [('avg_run', 'avgRunMillis'), ('max_run', 'maxRunMillis'), ('last_run', 'lastRunMillis'), ('max_delay', 'maxDelayMillis')]:
+        MetricsRegistry.setGauge('algo_scheduler_job_seconds', (name, stat), stats[key] / 1000)
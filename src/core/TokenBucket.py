@@ -0,0 +1,51 @@
+import heapq
+import itertools
+import threading
+import time
+
+class TokenBucket:
+  # Token bucket allowing ratePerSecond requests on average and bursts of up to burst requests.
+  # Waiting requests are served in priority order (lower value first) and in arrival order within the same priority.
+  def __init__(self, name, ratePerSecond, burst):
+    self.name = name
+    self.ratePerSecond = ratePerSecond
+    self.burst = burst
+    self.tokens = burst
+    self.lastRefillTime = time.monotonic()
+    self.condition = threading.Condition()
+    self.waiters = [] # heap of (priority, sequence number)
+    self.sequence = itertools.count()
+
+  def refill(self):
+    now = time.monotonic()
+    self.tokens = min(self.burst, self.tokens + (now - self.lastRefillTime) * self.ratePerSecond)
+    self.lastRefillTime = now
+
+  def acquire(self, priority):
+    # Blocks till a token is available for this request. Returns the time waited in seconds
+    startTime = time.monotonic()
+    with self.condition:
+      waiter = (priority, next(self.sequence))
+      heapq.heappush(self.waiters, waiter)
+      acquired = False
+      try:
+        while True:
+          self.refill()
+          if self.waiters[0] == waiter and self.tokens >= 1:
+            break
+          timeout = None
+          if self.waiters[0] == waiter:
+            # Next in line, wait till the next token gets added
+            timeout = (1 - self.tokens) / self.ratePerSecond
+          self.condition.wait(timeout)
+        heapq.heappop(self.waiters)
+        self.tokens -= 1
+        acquired = True
+      finally:
+        if acquired == False:
+          # Left the line without a token (Ex: interrupted by an exception). Remove it so that it does not block the rest
+          self.waiters.remove(waiter)
+          heapq.heapify(self.waiters)
+        # Wake up the rest so that the new head of the line starts waiting for its token
+        self.condition.notify_all()
+    return time.monotonic() - startTime
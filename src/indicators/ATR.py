@@ -0,0 +1,21 @@
+from indicators.BaseIndicator import BaseIndicator
+
+class ATR(BaseIndicator):
+  # Average true range with Wilder smoothing seeded with the simple average of the first `period` true ranges
+  def __init__(self, period = 14):
+    super().__init__(period)
+    self.lastClose = None
+    self.seedSum = 0
+
+  def update(self, high, low, close, volume = 0):
+    trueRange = high - low
+    if self.lastClose != None:
+      trueRange = max(trueRange, abs(high - self.lastClose), abs(low - self.lastClose))
+    self.lastClose = close
+    self.count += 1
+    if self.value != None:
+      self.value = (self.value * (self.period - 1) + trueRange) / self.period
+      return
+    self.seedSum += trueRange
+    if self.count == self.period:
+      self.value = self.seedSum / self.period
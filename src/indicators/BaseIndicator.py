@@ -0,0 +1,32 @@
+class BaseIndicator:
+  # Streaming indicator. Keeps only the state needed for its next value so each new candle (update()) or tick
+  # (updatePrice()) is constant time work. value is None till enough candles are seen.
+  # Indicators are warmed up from history with initialize() (arrays of highs, lows, closes and volumes from the oldest
+  # to the latest) or initializeFromCandles() (a candles.CandleSeries).
+  def __init__(self, period):
+    self.period = period
+    self.count = 0 # number of updates so far
+    self.value = None
+
+  def isReady(self):
+    return self.value != None
+
+  def update(self, high, low, close, volume = 0):
+    # Called with every completed candle. Price based indicators use only the close
+    self.updatePrice(close)
+
+  def updatePrice(self, price):
+    raise Exception(self.__class__.__name__ + ' can not be updated with only price')
+
+  def onCandle(self, candles):
+    # Updates the indicator with the latest completed candle of the CandleSeries
+    self.update(candles.getValue('highs'), candles.getValue('lows'), candles.getValue('closes'), candles.getValue('volumes'))
+
+  def initialize(self, highs, lows, closes, volumes = None):
+    # Derived classes override this when the value can be computed from only the latest part of the history
+    for i in range(len(closes)):
+      self.update(highs[i], lows[i], closes[i], volumes[i] if volumes != None else 0)
+
+  def initializeFromCandles(self, candles, count = None):
+    self.initialize(candles.getValues('highs', count), candles.getValues('lows', count), \
+      candles.getValues('closes', count), candles.getValues('volumes', count))
@@ -0,0 +1,36 @@
+import math
+from array import array
+
+from indicators.BaseIndicator import BaseIndicator
+
+class BollingerBands(BaseIndicator):
+  # value is the middle band (simple moving average). upper and lower bands are numStdDevs standard deviations away.
+  # Running sum and sum of squares of the prices in the ring buffer give the mean and the deviation in constant time.
+  def __init__(self, period = 20, numStdDevs = 2):
+    super().__init__(period)
+    self.numStdDevs = numStdDevs
+    self.window = array('d', bytes(8 * period))
+    self.sum = 0
+    self.sumOfSquares = 0
+    self.upper = None
+    self.lower = None
+
+  def updatePrice(self, price):
+    slot = self.count % self.period
+    oldPrice = self.window[slot]
+    self.sum += price - oldPrice
+    self.sumOfSquares += price * price - oldPrice * oldPrice
+    self.window[slot] = price
+    self.count += 1
+    if self.count < self.period:
+      return
+    mean = self.sum / self.period
+    # max() guards against tiny negative variance from floating point rounding
+    deviation = math.sqrt(max(self.sumOfSquares / self.period - mean * mean, 0))
+    self.value = mean
+    self.upper = mean + self.numStdDevs * deviation
+    self.lower = mean - self.numStdDevs * deviation
+
+  def initialize(self, highs, lows, closes, volumes = None):
+    for price in closes[-self.period:]:
+      self.updatePrice(price)
@@ -0,0 +1,17 @@
+from indicators.BaseIndicator import BaseIndicator
+
+class EMA(BaseIndicator):
+  # Exponential moving average seeded with the simple average of the first `period` prices
+  def __init__(self, period):
+    super().__init__(period)
+    self.alpha = 2 / (period + 1)
+    self.seedSum = 0
+
+  def updatePrice(self, price):
+    self.count += 1
+    if self.value != None:
+      self.value += self.alpha * (price - self.value)
+      return
+    self.seedSum += price
+    if self.count == self.period:
+      self.value = self.seedSum / self.period
@@ -0,0 +1,32 @@
+from indicators.BaseIndicator import BaseIndicator
+
+class RSI(BaseIndicator):
+  # Relative strength index with Wilder smoothing of the average gain and loss
+  def __init__(self, period = 14):
+    super().__init__(period)
+    self.lastPrice = None
+    self.avgGain = 0
+    self.avgLoss = 0
+
+  def updatePrice(self, price):
+    if self.lastPrice == None:
+      self.lastPrice = price
+      return
+    change = price - self.lastPrice
+    self.lastPrice = price
+    gain = change if change > 0 else 0
+    loss = -change if change < 0 else 0
+    self.count += 1
+    if self.count <= self.period:
+      # average of the first `period` changes is the seed
+      self.avgGain += gain / self.period
+      self.avgLoss += loss / self.period
+      if self.count < self.period:
+        return
+    else:
+      self.avgGain = (self.avgGain * (self.period - 1) + gain) / self.period
+      self.avgLoss = (self.avgLoss * (self.period - 1) + loss) / self.period
+    if self.avgLoss == 0:
+      self.value = 100
+    else:
+      self.value = 100 - 100 / (1 + self.avgGain / self.avgLoss)
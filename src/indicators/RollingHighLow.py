@@ -0,0 +1,37 @@
+from collections import deque
+
+from indicators.BaseIndicator import BaseIndicator
+
+class RollingHighLow(BaseIndicator):
+  # Highest high and lowest low of the last `period` candles. value is the highest high and lowest is the lowest low.
+  # Monotonic queues keep only the candidates of the window so each update is amortized constant time.
+  def __init__(self, period):
+    super().__init__(period)
+    self.highs = deque() # (update number, high) with decreasing highs
+    self.lows = deque() # (update number, low) with increasing lows
+    self.lowest = None
+
+  def update(self, high, low, close, volume = 0):
+    number = self.count
+    self.count += 1
+    while len(self.highs) > 0 and self.highs[-1][1] <= high:
+      self.highs.pop()
+    self.highs.append((number, high))
+    if self.highs[0][0] <= number - self.period:
+      self.highs.popleft()
+    while len(self.lows) > 0 and self.lows[-1][1] >= low:
+      self.lows.pop()
+    self.lows.append((number, low))
+    if self.lows[0][0] <= number - self.period:
+      self.lows.popleft()
+    if self.count >= self.period:
+      self.value = self.highs[0][1]
+      self.lowest = self.lows[0][1]
+
+  def updatePrice(self, price):
+    self.update(price, price, price)
+
+  def initialize(self, highs, lows, closes, volumes = None):
+    start = max(0, len(closes) - self.period)
+    for i in range(start, len(closes)):
+      self.update(highs[i], lows[i], closes[i])
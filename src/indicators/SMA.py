@@ -0,0 +1,23 @@
+from array import array
+
+from indicators.BaseIndicator import BaseIndicator
+
+class SMA(BaseIndicator):
+  # Simple moving average. Keeps the last `period` prices in a ring buffer and their running sum
+  def __init__(self, period):
+    super().__init__(period)
+    self.window = array('d', bytes(8 * period))
+    self.sum = 0
+
+  def updatePrice(self, price):
+    slot = self.count % self.period
+    self.sum += price - self.window[slot]
+    self.window[slot] = price
+    self.count += 1
+    if self.count >= self.period:
+      self.value = self.sum / self.period
+
+  def initialize(self, highs, lows, closes, volumes = None):
+    # Only the last `period` closes matter
+    for price in closes[-self.period:]:
+      self.updatePrice(price)
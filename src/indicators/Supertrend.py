@@ -0,0 +1,43 @@
+from indicators.ATR import ATR
+from indicators.BaseIndicator import BaseIndicator
+
+class Supertrend(BaseIndicator):
+  # value is the supertrend line and direction is 1 in up trend (line is below price) and -1 in down trend
+  def __init__(self, period = 10, multiplier = 3):
+    super().__init__(period)
+    self.multiplier = multiplier
+    self.atr = ATR(period)
+    self.upperBand = None
+    self.lowerBand = None
+    self.lastClose = None
+    self.direction = 0
+
+  def update(self, high, low, close, volume = 0):
+    self.atr.update(high, low, close)
+    self.count += 1
+    if self.atr.isReady() == False:
+      self.lastClose = close
+      return
+    middle = (high + low) / 2
+    basicUpperBand = middle + self.multiplier * self.atr.value
+    basicLowerBand = middle - self.multiplier * self.atr.value
+    # Bands only move towards the price while the previous close stays within them
+    if self.upperBand == None or basicUpperBand < self.upperBand or self.lastClose > self.upperBand:
+      upperBand = basicUpperBand
+    else:
+      upperBand = self.upperBand
+    if self.lowerBand == None or basicLowerBand > self.lowerBand or self.lastClose < self.lowerBand:
+      lowerBand = basicLowerBand
+    else:
+      lowerBand = self.lowerBand
+
+    if self.direction == 0:
+      self.direction = 1 if close > upperBand else -1
+    elif self.direction == 1 and close < lowerBand:
+      self.direction = -1
+    elif self.direction == -1 and close > upperBand:
+      self.direction = 1
+    self.upperBand = upperBand
+    self.lowerBand = lowerBand
+    self.lastClose = close
+    self.value = lowerBand if self.direction == 1 else upperBand
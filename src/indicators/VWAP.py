@@ -0,0 +1,26 @@
+from indicators.BaseIndicator import BaseIndicator
+
+class VWAP(BaseIndicator):
+  # Volume weighted average price of the day. Candles are weighted at their typical price (high + low + close) / 3
+  def __init__(self):
+    super().__init__(0)
+    self.cumulativeTurnover = 0
+    self.cumulativeVolume = 0
+
+  def reset(self):
+    # Call at the start of a new day
+    self.count = 0
+    self.value = None
+    self.cumulativeTurnover = 0
+    self.cumulativeVolume = 0
+
+  def update(self, high, low, close, volume = 0):
+    self.updatePrice((high + low + close) / 3, volume)
+
+  def updatePrice(self, price, volume = 0):
+    self.count += 1
+    if volume <= 0:
+      return
+    self.cumulativeTurnover += price * volume
+    self.cumulativeVolume += volume
+    self.value = self.cumulativeTurnover / self.cumulativeVolume
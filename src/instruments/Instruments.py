@@ -4,12 +4,13 @@ import json
 
 from config.Config import getServerConfig, getTimestampsData, saveTimestampsData
 from core.Controller import Controller
+from core.RateLimiter import RateLimiter
+from instruments.InstrumentsCache import InstrumentsCache
+from models.ApiEndpoint import ApiEndpoint
 from utils.Utils import Utils
 
 class Instruments:
-  instrumentsList = None
-  symbolToInstrumentMap = None
-  tokenToInstrumentMap = None
+  instrumentsList = None # InstrumentsCache: memory mapped instruments with lazy row lookups
 
   @staticmethod
   def shouldFetchFromServer():
@@ -30,25 +31,36 @@ class Instruments:
     saveTimestampsData(timestamps)
 
   @staticmethod
-  def loadInstruments():
+  def getInstrumentsCacheFilepath():
     serverConfig = getServerConfig()
-    instrumentsFilepath = os.path.join(serverConfig['deployDir'], 'instruments.json')
-    if os.path.exists(instrumentsFilepath) == False:
-      logging.warn('Instruments: instrumentsFilepath %s does not exist', instrumentsFilepath)
-      return [] # returns empty list
+    return os.path.join(serverConfig['deployDir'], 'instruments.cache')
+
+  @staticmethod
+  def loadInstruments():
+    instrumentsCacheFilepath = Instruments.getInstrumentsCacheFilepath()
+    if os.path.exists(instrumentsCacheFilepath) == False:
+      # Migrate from the json file saved by the older versions if it exists
+      serverConfig = getServerConfig()
+      instrumentsFilepath = os.path.join(serverConfig['deployDir'], 'instruments.json')
+      if os.path.exists(instrumentsFilepath) == False:
+        logging.warn('Instruments: instrumentsCacheFilepath %s does not exist', instrumentsCacheFilepath)
+        return [] # returns empty list
+      with open(instrumentsFilepath, 'r') as isdFile:
+        InstrumentsCache.build(json.loads(isdFile.read()), instrumentsCacheFilepath)
 
-    isdFile = open(instrumentsFilepath, 'r')
-    instruments = json.loads(isdFile.read())
-    logging.info('Instruments: loaded %d instruments from file %s', len(instruments), instrumentsFilepath)
+    try:
+      instruments = InstrumentsCache(instrumentsCacheFilepath)
+    except Exception as e:
+      logging.error('Instruments: Failed to load instruments cache file %s: Error => %s', instrumentsCacheFilepath, str(e))
+      return []
+    logging.info('Instruments: loaded %d instruments from file %s', len(instruments), instrumentsCacheFilepath)
     return instruments
 
   @staticmethod
   def saveInstruments(instruments = []):
-    serverConfig = getServerConfig()
-    instrumentsFilepath = os.path.join(serverConfig['deployDir'], 'instruments.json')
-    with open(instrumentsFilepath, 'w') as isdFile:
-      json.dump(instruments, isdFile, indent=2, default=str)
-    logging.info('Instruments: Saved %d instruments to file %s', len(instruments), instrumentsFilepath)
+    instrumentsCacheFilepath = Instruments.getInstrumentsCacheFilepath()
+    InstrumentsCache.build(instruments, instrumentsCacheFilepath)
+    logging.info('Instruments: Saved %d instruments to file %s', len(instruments), instrumentsCacheFilepath)
     # Update last save timestamp
     Instruments.updateLastSavedTimestamp()
 
@@ -58,7 +70,9 @@ class Instruments:
     try:
       brokerHandle = Controller.getBrokerLogin().getBrokerHandle()
       logging.info('Going to fetch instruments from server...')
+      RateLimiter.acquire(ApiEndpoint.OTHER)
       instrumentsList = brokerHandle.instruments('NSE')
+      RateLimiter.acquire(ApiEndpoint.OTHER)
       instrumentsListFnO = brokerHandle.instruments('NFO')
       # Add FnO instrument list to the main list
       instrumentsList.extend(instrumentsListFnO)
@@ -74,34 +88,28 @@ class Instruments:
 
     instrumentsList = Instruments.loadInstruments()
     if len(instrumentsList) == 0 or Instruments.shouldFetchFromServer() == True:
-      instrumentsList = Instruments.fetchInstrumentsFromServer()
-      # Save instruments to file locally
-      if len(instrumentsList) > 0:
-        Instruments.saveInstruments(instrumentsList)
+      serverInstrumentsList = Instruments.fetchInstrumentsFromServer()
+      # Save instruments to file locally and load them back from the cache file
+      if len(serverInstrumentsList) > 0:
+        if len(instrumentsList) > 0:
+          instrumentsList.close()
+        Instruments.saveInstruments(serverInstrumentsList)
+        instrumentsList = Instruments.loadInstruments()
 
     if len(instrumentsList) == 0:
       print("Could not fetch/load instruments data. Hence exiting the app.")
       logging.error("Could not fetch/load instruments data. Hence exiting the app.");
       exit(-2)
-    
-    Instruments.symbolToInstrumentMap = {}
-    Instruments.tokenToInstrumentMap = {}
-    for isd in instrumentsList:
-      tradingSymbol = isd['tradingsymbol']
-      instrumentToken = isd['instrument_token']
-      # logging.info('%s = %d', tradingSymbol, instrumentToken)
-      Instruments.symbolToInstrumentMap[tradingSymbol] = isd
-      Instruments.tokenToInstrumentMap[instrumentToken] = isd
-    
+
     logging.info('Fetching instruments done. Instruments count = %d', len(instrumentsList))
     Instruments.instrumentsList = instrumentsList # assign the list to static variable
     return instrumentsList
 
   @staticmethod
   def getInstrumentDataBySymbol(tradingSymbol):
-    return Instruments.symbolToInstrumentMap[tradingSymbol]
+    return Instruments.instrumentsList.getBySymbol(tradingSymbol)
 
   @staticmethod
   def getInstrumentDataByToken(instrumentToken):
-    return Instruments.tokenToInstrumentMap[instrumentToken]
+    return Instruments.instrumentsList.getByToken(instrumentToken)
     
\ No newline at end of file
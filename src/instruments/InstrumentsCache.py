@@ -0,0 +1,162 @@
+import os
+import logging
+import mmap
+import struct
+
+class InstrumentsCache:
+  # Memory mapped binary cache of the instruments dump.
+  # File layout:
+  #   header
+  #   rows: fixed width records sorted by instrument token. Strings are stored as (offset, length) into the string table
+  #   symbol index: row numbers (uint32) sorted by trading symbol
+  #   string table: utf-8 bytes of all distinct strings
+  # Token and symbol lookups are binary searches over the mapped file. A row is converted to a dict (same keys as the
+  # broker instruments dump) only when it is asked for.
+  magic = b'SDIC'
+  version = 1
+  headerFormat = '<4sHHIQQQQ' # magic, version, reserved, numRows, rowsOffset, symbolIndexOffset, stringsOffset, stringsLength
+  numericFields = ['instrument_token', 'exchange_token', 'last_price', 'strike', 'tick_size', 'lot_size']
+  stringFields = ['tradingsymbol', 'name', 'expiry', 'instrument_type', 'segment', 'exchange']
+  numericFormat = '<qqdddq'
+  rowFormat = numericFormat + 'IH' * len(stringFields)
+  symbolRefOffset = struct.calcsize(numericFormat) # tradingsymbol is the first string field
+
+  def __init__(self, filepath):
+    self.filepath = filepath
+    self.file = open(filepath, 'rb')
+    self.symbolIndex = None
+    self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+    (magic, version, _, self.numRows, self.rowsOffset, self.symbolIndexOffset, self.stringsOffset, _) = \
+      struct.unpack_from(InstrumentsCache.headerFormat, self.mm, 0)
+    if magic != InstrumentsCache.magic or version != InstrumentsCache.version:
+      self.close()
+      raise Exception('Invalid instruments cache file ' + filepath)
+    self.rowStruct = struct.Struct(InstrumentsCache.rowFormat)
+    with memoryview(self.mm) as mv:
+      self.symbolIndex = mv[self.symbolIndexOffset:self.symbolIndexOffset + 4 * self.numRows].cast('I')
+    self.rowCache = {} # row number => row dict of the rows already asked for
+
+  def close(self):
+    if self.mm != None:
+      if self.symbolIndex != None:
+        self.symbolIndex.release()
+        self.symbolIndex = None
+      self.mm.close()
+      self.mm = None
+    self.file.close()
+
+  def __len__(self):
+    return self.numRows
+
+  def __getitem__(self, rowNum):
+    if rowNum < 0 or rowNum >= self.numRows:
+      raise IndexError(rowNum)
+    return self.getRow(rowNum)
+
+  def __iter__(self):
+    # rows are not memoized while iterating so that a full scan does not keep every row in memory
+    for rowNum in range(self.numRows):
+      row = self.rowCache.get(rowNum)
+      yield row if row != None else self.readRow(rowNum)
+
+  def getRow(self, rowNum):
+    row = self.rowCache.get(rowNum)
+    if row == None:
+      row = self.readRow(rowNum)
+      self.rowCache[rowNum] = row
+    return row
+
+  def readRow(self, rowNum):
+    values = self.rowStruct.unpack_from(self.mm, self.rowsOffset + rowNum * self.rowStruct.size)
+    row = {}
+    for i in range(len(InstrumentsCache.numericFields)):
+      row[InstrumentsCache.numericFields[i]] = values[i]
+    stringRefsStart = len(InstrumentsCache.numericFields)
+    for i in range(len(InstrumentsCache.stringFields)):
+      row[InstrumentsCache.stringFields[i]] = self.getString(values[stringRefsStart + 2 * i], values[stringRefsStart + 2 * i + 1])
+    return row
+
+  def getString(self, offset, length):
+    start = self.stringsOffset + offset
+    return self.mm[start:start + length].decode('utf-8')
+
+  def getToken(self, rowNum):
+    return struct.unpack_from('<q', self.mm, self.rowsOffset + rowNum * self.rowStruct.size)[0]
+
+  def getSymbolBytes(self, rowNum):
+    offset, length = struct.unpack_from('<IH', self.mm, self.rowsOffset + rowNum * self.rowStruct.size + InstrumentsCache.symbolRefOffset)
+    start = self.stringsOffset + offset
+    return self.mm[start:start + length]
+
+  def getByToken(self, instrumentToken):
+    lo, hi = 0, self.numRows
+    while lo < hi:
+      mid = (lo + hi) // 2
+      token = self.getToken(mid)
+      if token == instrumentToken:
+        return self.getRow(mid)
+      if token < instrumentToken:
+        lo = mid + 1
+      else:
+        hi = mid
+    raise KeyError(instrumentToken)
+
+  def getBySymbol(self, tradingSymbol):
+    symbolBytes = tradingSymbol.encode('utf-8')
+    # find the last entry with this symbol (same as a dict built from the dump where later rows overwrite earlier rows)
+    lo, hi = 0, self.numRows
+    while lo < hi:
+      mid = (lo + hi) // 2
+      if symbolBytes < self.getSymbolBytes(self.symbolIndex[mid]):
+        hi = mid
+      else:
+        lo = mid + 1
+    if lo == 0 or self.getSymbolBytes(self.symbolIndex[lo - 1]) != symbolBytes:
+      raise KeyError(tradingSymbol)
+    return self.getRow(self.symbolIndex[lo - 1])
+
+  @staticmethod
+  def build(instrumentsList, filepath):
+    strings = {} # string => offset in string table
+    stringTable = bytearray()
+    def addString(value):
+      value = '' if value == None else str(value)
+      ref = strings.get(value)
+      if ref == None:
+        encoded = value.encode('utf-8')
+        ref = (len(stringTable), len(encoded))
+        stringTable.extend(encoded)
+        strings[value] = ref
+      return ref
+
+    # rows sorted by token, symbol index sorted by (symbol, position in the dump)
+    numberedRows = sorted(enumerate(instrumentsList), key=lambda x: x[1]['instrument_token'])
+    rowStruct = struct.Struct(InstrumentsCache.rowFormat)
+    rowsData = bytearray()
+    symbolKeys = []
+    for rowNum in range(len(numberedRows)):
+      (position, isd) = numberedRows[rowNum]
+      values = [int(isd['instrument_token']), int(isd['exchange_token']), float(isd['last_price'] or 0), \
+        float(isd['strike'] or 0), float(isd['tick_size'] or 0), int(isd['lot_size'] or 0)]
+      for field in InstrumentsCache.stringFields:
+        values.extend(addString(isd[field]))
+      rowsData.extend(rowStruct.pack(*values))
+      symbolKeys.append((str(isd['tradingsymbol']).encode('utf-8'), position, rowNum))
+    symbolKeys.sort()
+    symbolIndex = struct.pack('<%dI' % len(symbolKeys), *[key[2] for key in symbolKeys])
+
+    headerSize = struct.calcsize(InstrumentsCache.headerFormat)
+    rowsOffset = headerSize
+    symbolIndexOffset = rowsOffset + len(rowsData)
+    stringsOffset = symbolIndexOffset + len(symbolIndex)
+    header = struct.pack(InstrumentsCache.headerFormat, InstrumentsCache.magic, InstrumentsCache.version, 0, \
+      len(numberedRows), rowsOffset, symbolIndexOffset, stringsOffset, len(stringTable))
+
+    tmpFilepath = filepath + '.tmp'
+    with open(tmpFilepath, 'wb') as cFile:
+      cFile.write(header)
+      cFile.write(rowsData)
+      cFile.write(symbolIndex)
+      cFile.write(stringTable)
+    os.replace(tmpFilepath, filepath)
+    logging.info('InstrumentsCache: Saved %d instruments to cache file %s', len(numberedRows), filepath)
@@ -0,0 +1,123 @@
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+from instruments.Instruments import Instruments
+from utils.Clock import Clock
+from utils.Utils import Utils
+
+class OptionChain:
+  # Option chain index built once from Instruments.instrumentsList:
+  #   underlying => expiry date => option type (CE/PE) => sorted list of strikes
+  # and (underlying, expiry date, strike, option type) => trading symbol.
+  # Strike queries are bisect lookups on the sorted strikes so strategies do not need to know the symbol naming rules.
+  underlyingToExpiryMap = None
+  optionSymbolsMap = None
+  buildLock = threading.Lock()
+
+  @staticmethod
+  def build():
+    with OptionChain.buildLock:
+      if OptionChain.underlyingToExpiryMap != None:
+        return
+      underlyingToExpiryMap = {}
+      optionSymbolsMap = {}
+      for isd in Instruments.fetchInstruments():
+        if isd['segment'] != 'NFO-OPT':
+          continue
+        underlying = isd['name']
+        expiry = OptionChain.convertToExpiryDate(isd['expiry'])
+        optionType = isd['instrument_type']
+        strike = isd['strike']
+        if strike == int(strike):
+          strike = int(strike)
+        optionTypeToStrikesMap = underlyingToExpiryMap.setdefault(underlying, {}).setdefault(expiry, {})
+        optionTypeToStrikesMap.setdefault(optionType, []).append(strike)
+        optionSymbolsMap[(underlying, expiry, strike, optionType)] = isd['tradingsymbol']
+
+      for underlying in underlyingToExpiryMap:
+        for expiry in underlyingToExpiryMap[underlying]:
+          for strikes in underlyingToExpiryMap[underlying][expiry].values():
+            strikes.sort()
+      OptionChain.optionSymbolsMap = optionSymbolsMap
+      OptionChain.underlyingToExpiryMap = underlyingToExpiryMap
+      logging.info('OptionChain: Built option chain of %d options for %d underlyings', len(optionSymbolsMap), len(underlyingToExpiryMap))
+
+  @staticmethod
+  def convertToExpiryDate(expiry):
+    if isinstance(expiry, str):
+      return datetime.strptime(expiry, Utils.dateFormat).date()
+    return expiry
+
+  @staticmethod
+  def getExpiryMap(underlying):
+    if OptionChain.underlyingToExpiryMap == None:
+      OptionChain.build()
+    return OptionChain.underlyingToExpiryMap.get(underlying, {})
+
+  @staticmethod
+  def getExpiries(underlying):
+    return sorted(OptionChain.getExpiryMap(underlying))
+
+  @staticmethod
+  def getNearestExpiry(underlying, datetimeObj = None):
+    # returns the nearest expiry which is not yet over. Expiry day is considered till market end time
+    if datetimeObj == None:
+      datetimeObj = Clock.now()
+    for expiry in OptionChain.getExpiries(underlying):
+      expiryDateTime = datetime(expiry.year, expiry.month, expiry.day)
+      if datetimeObj <= Utils.getMarketEndTime(expiryDateTime):
+        return expiry
+    return None
+
+  @staticmethod
+  def getStrikes(underlying, expiry, optionType = 'CE'):
+    return OptionChain.getExpiryMap(underlying).get(expiry, {}).get(optionType.upper(), [])
+
+  @staticmethod
+  def getNearestStrike(underlying, expiry, price, optionType = 'CE'):
+    strikes = OptionChain.getStrikes(underlying, expiry, optionType)
+    if len(strikes) == 0:
+      return None
+    index = bisect_left(strikes, price)
+    if index == 0:
+      return strikes[0]
+    if index == len(strikes):
+      return strikes[-1]
+    # pick the closer of the strikes on both sides of the price
+    return strikes[index] if strikes[index] - price < price - strikes[index - 1] else strikes[index - 1]
+
+  @staticmethod
+  def getStrikeByOffset(underlying, expiry, strike, offset, optionType = 'CE'):
+    # returns the strike which is `offset` strikes away from the given strike. Ex: offset 1 => next higher strike
+    strikes = OptionChain.getStrikes(underlying, expiry, optionType)
+    index = bisect_left(strikes, strike)
+    if index == len(strikes) or strikes[index] != strike:
+      return None
+    index += offset
+    if index < 0 or index >= len(strikes):
+      return None
+    return strikes[index]
+
+  @staticmethod
+  def getStrikesAround(underlying, expiry, price, numStrikes, optionType = 'CE'):
+    # returns numStrikes strikes nearest to the price (ATM in the middle) in ascending order
+    strikes = OptionChain.getStrikes(underlying, expiry, optionType)
+    atmStrike = OptionChain.getNearestStrike(underlying, expiry, price, optionType)
+    if atmStrike == None:
+      return []
+    start = bisect_left(strikes, atmStrike) - (numStrikes - 1) // 2
+    start = max(0, min(start, len(strikes) - numStrikes))
+    return strikes[start:start + numStrikes]
+
+  @staticmethod
+  def getStrikesInRange(underlying, expiry, lowPrice, highPrice, optionType = 'CE'):
+    strikes = OptionChain.getStrikes(underlying, expiry, optionType)
+    return strikes[bisect_left(strikes, lowPrice):bisect_right(strikes, highPrice)]
+
+  @staticmethod
+  def getOptionSymbol(underlying, expiry, strike, optionType):
+    if OptionChain.optionSymbolsMap == None:
+      OptionChain.build()
+    return OptionChain.optionSymbolsMap.get((underlying, expiry, strike, optionType.upper()))
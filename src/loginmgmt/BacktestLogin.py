@@ -0,0 +1,14 @@
+import logging
+
+from loginmgmt.BaseLogin import BaseLogin
+
+class BacktestLogin(BaseLogin):
+  # Login to the simulated broker of a backtest. The broker handle is the backtest.BacktestBroker instance.
+  def __init__(self, brokerAppDetails):
+    BaseLogin.__init__(self, brokerAppDetails)
+
+  def login(self, args):
+    logging.info('==> BacktestLogin')
+    self.setBrokerHandle(args['broker'])
+    self.setAccessToken('backtest')
+    return None
@@ -11,7 +11,13 @@ class ZerodhaLogin(BaseLogin):
   def login(self, args):
     logging.info('==> ZerodhaLogin .args => %s', args);
     systemConfig = getSystemConfig()
-    brokerHandle = KiteConnect(api_key=self.brokerAppDetails.appKey)
+    # Broker handle keeps a single http session with pooled keep-alive connections which is shared by all the threads
+    httpPool = {
+      'pool_connections': self.brokerAppDetails.httpPoolConnections,
+      'pool_maxsize': self.brokerAppDetails.httpPoolMaxSize,
+      'max_retries': 0 # Never retry silently. A retried order call can place a duplicate order.
+    }
+    brokerHandle = KiteConnect(api_key=self.brokerAppDetails.appKey, timeout=self.brokerAppDetails.httpTimeout, pool=httpPool)
     redirectUrl = None
     if 'request_token' in args:
       requestToken = args['request_token']
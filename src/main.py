@@ -8,6 +8,9 @@ from restapis.BrokerLoginAPI import BrokerLoginAPI
 from restapis.StartAlgoAPI import StartAlgoAPI
 from restapis.PositionsAPI import PositionsAPI
 from restapis.HoldingsAPI import HoldingsAPI
+from restapis.MetricsAPI import MetricsAPI
+from restapis.CPUProfilerAPI import CPUProfilerAPI
+from restapis.MemoryProfilerAPI import MemoryProfilerAPI
 
 app = Flask(__name__)
 app.config['DEBUG'] = True
@@ -17,6 +20,9 @@ app.add_url_rule("/apis/broker/login/zerodha", view_func=BrokerLoginAPI.as_view(
 app.add_url_rule("/apis/algo/start", view_func=StartAlgoAPI.as_view("start_algo_api"))
 app.add_url_rule("/positions", view_func=PositionsAPI.as_view("positions_api"))
 app.add_url_rule("/holdings", view_func=HoldingsAPI.as_view("holdings_api"))
+app.add_url_rule("/metrics", view_func=MetricsAPI.as_view("metrics_api"))
+app.add_url_rule("/apis/profiler/cpu/<action>", view_func=CPUProfilerAPI.as_view("cpu_profiler_api"))
+app.add_url_rule("/apis/profiler/memory/<action>", view_func=MemoryProfilerAPI.as_view("memory_profiler_api"))
 
 def initLoggingConfg(filepath):
   format = "%(asctime)s: %(message)s"
@@ -0,0 +1,8 @@
+
+class ApiEndpoint:
+  # Broker api endpoint classes. Each class has its own rate limit
+  ORDERS = "ORDERS" # place, modify and cancel orders
+  QUOTES = "QUOTES"
+  ORDER_BOOK = "ORDER_BOOK"
+  PORTFOLIO = "PORTFOLIO" # positions and holdings
+  OTHER = "OTHER" # Ex: instruments dump
@@ -5,6 +5,9 @@ class BrokerAppDetails:
     self.broker = broker
     self.appKey = None
     self.appSecret = None
+    self.httpPoolConnections = 4 # Number of hosts for which http connections are pooled
+    self.httpPoolMaxSize = 16 # Max open http connections per host. Should cover concurrent order calls
+    self.httpTimeout = 7 # Timeout in seconds of broker http requests
 
   def setClientID(self, clientID):
     self.clientID = clientID
@@ -15,3 +18,7 @@ class BrokerAppDetails:
   def setAppSecret(self, appSecret):
     self.appSecret = appSecret
 
+  def setHttpPoolConfig(self, httpPoolConnections, httpPoolMaxSize, httpTimeout):
+    self.httpPoolConnections = httpPoolConnections
+    self.httpPoolMaxSize = httpPoolMaxSize
+    self.httpTimeout = httpTimeout
@@ -0,0 +1,5 @@
+class JobPriority:
+  # Lower value runs first when scheduled jobs are due at the same time
+  HIGH = 0 # Trade tracking and square offs
+  NORMAL = 1 # Strategy process() calls
+  LOW = 2 # Housekeeping
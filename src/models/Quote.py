@@ -12,7 +12,7 @@ class Quote:
     self.high = 0
     self.low = 0
     self.close = 0
-    self.change = 0
+    self.change = 0 # absolute change from previous close (broker net_change). See QuoteCache
     self.oiDayHigh = 0
     self.oiDayLow = 0
     self.lowerCiruitLimit = 0
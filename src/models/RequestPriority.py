@@ -0,0 +1,6 @@
+
+class RequestPriority:
+  # Lower value is served first when requests wait on a broker api rate limit
+  EXIT = 0 # SL, target, square off orders and cancellations
+  ENTRY = 1 # New entry orders
+  POLL = 2 # Quotes, order book and portfolio polling
@@ -12,4 +12,5 @@ class TickData:
     self.high = 0
     self.low = 0
     self.close = 0
-    self.change = 0
+    self.change = 0 # percentage change from previous close
+    self.timestamp = None # Epoch seconds at which the tick was received
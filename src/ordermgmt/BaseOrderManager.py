@@ -1,5 +1,8 @@
 
 from core.Controller import Controller
+from core.MetricsRegistry import MetricsRegistry
+
+from models.OrderStatus import OrderStatus
 
 class BaseOrderManager:
   def __init__(self, broker):
@@ -19,8 +22,32 @@ class BaseOrderManager:
     pass
 
   def fetchAndUpdateAllOrderDetails(self, orders):
+    # Derived class should update the given orders with broker order book and return the list of orders that changed
+    return []
+
+  def updateOrder(self, order, brokerOrder):
+    # Updates the order with the broker specific order details received from order book or order postback
     pass
 
+  def convertToOrderStatus(self, bOrder):
+    # Order status of our system from the broker order details (order book entry or order postback)
+    orderStatus = bOrder['status']
+    if orderStatus == OrderStatus.CANCELLED and bOrder['filled_quantity'] > 0:
+      # Consider this case as completed in our system as we cancel the order with pending qty when strategy stop timestamp reaches
+      orderStatus = OrderStatus.COMPLETE
+    return orderStatus
+
+  def recordOrderCall(self, action):
+    # action is place, modify or cancel
+    MetricsRegistry.inc('algo_orders_total', (self.broker, action))
+
+  def recordBrokerError(self, action, error):
+    MetricsRegistry.inc('algo_broker_errors_total', (self.broker, action, type(error).__name__))
+
+  def getConnectionStats(self):
+    # Derived class can return the http connection pool statistics of the broker session
+    return {}
+
   def convertToBrokerProductType(self, productType):
     return productType
 
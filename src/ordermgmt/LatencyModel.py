@@ -0,0 +1,14 @@
+import random
+
+class LatencyModel:
+  # Delay in seconds between placing an order and the order reaching the matching engine: fixed latency plus a random
+  # jitter of up to jitterSeconds. Derive from this class for other latency models.
+  def __init__(self, fixedSeconds = 0, jitterSeconds = 0, seed = None):
+    self.fixedSeconds = fixedSeconds
+    self.jitterSeconds = jitterSeconds
+    self.random = random.Random(seed)
+
+  def getLatency(self):
+    if self.jitterSeconds <= 0:
+      return self.fixedSeconds
+    return self.fixedSeconds + self.random.uniform(0, self.jitterSeconds)
@@ -0,0 +1,293 @@
+import heapq
+import itertools
+import logging
+import threading
+from collections import deque
+
+from models.Direction import Direction
+from models.OrderType import OrderType
+from models.OrderStatus import OrderStatus
+from ordermgmt.LatencyModel import LatencyModel
+from ordermgmt.SlippageModel import SlippageModel
+from utils.Clock import Clock
+
+class MatchingEngine:
+  # In-process exchange simulator filling orders against the ticks of a ticker (live ticker for paper trading or the
+  # backtest ticker). Orders are kept in the zerodha order book format with our own direction/order type/status values.
+  #
+  # Each symbol has its own book:
+  #   market: FIFO of market orders (and triggered SL-M orders)
+  #   buyLimits/sellLimits: heaps of limit orders (and triggered SL-LIMIT orders) with the best price on top
+  #   buyStops/sellStops: heaps of untriggered SL orders with the nearest trigger price on top
+  # so a tick only touches the orders it triggers or fills. Modified and cancelled orders are left in the heaps and
+  # skipped when they reach the top.
+  #
+  # Fills on a tick are limited to participationRate * traded quantity of the tick (partial fills). Ticks without traded
+  # quantity or participationRate 0 mean unlimited quantity. Marketable orders are filled at the last traded price
+  # adjusted by the slippage model, resting limit orders at their limit price. New orders reach the book after the
+  # delay given by the latency model. Order updates are sent as ticker order updates after processing each ticks frame.
+  def __init__(self, ticker, slippageModel = None, latencyModel = None, participationRate = 1.0):
+    self.ticker = ticker
+    self.slippageModel = slippageModel if slippageModel != None else SlippageModel()
+    self.latencyModel = latencyModel if latencyModel != None else LatencyModel()
+    self.participationRate = participationRate
+    self.orderBook = {} # orderId => order
+    self.symbolToBookMap = {} # tradingSymbol => book of the symbol's open orders
+    self.symbolToLastPriceMap = {}
+    self.symbolToLiquidityMap = {} # tradingSymbol => quantity of the latest tick still available for fills. None means unlimited
+    self.orderIdToBookEntryMap = {} # orderId => (sequence number of its live book entry, tick number when added to book)
+    self.inFlightOrders = [] # heap of (time of reaching the book, sequence number, orderId)
+    self.pendingOrderUpdates = [] # copies of the orders on every change since the last flush
+    self.sequence = itertools.count()
+    self.nextOrderId = 1
+    self.tickNumber = 0
+    self.numOrders = 0
+    self.numFills = 0
+    self.numPartialFills = 0
+    self.lock = threading.RLock()
+    # Register before TradeManager so that resting orders are matched with a tick before the strategies act on it
+    ticker.registerBatchListener(self.onTicks)
+
+  def placeOrder(self, tradingSymbol, direction, qty, orderType, price = 0, triggerPrice = 0):
+    if qty <= 0:
+      raise Exception('Invalid order quantity ' + str(qty))
+    if (orderType == OrderType.LIMIT or orderType == OrderType.SL_LIMIT) and price <= 0:
+      raise Exception('Invalid limit price ' + str(price))
+    if (orderType == OrderType.SL_MARKET or orderType == OrderType.SL_LIMIT) and triggerPrice <= 0:
+      raise Exception('Invalid trigger price ' + str(triggerPrice))
+    with self.lock:
+      orderId = 'SIM' + str(self.nextOrderId)
+      self.nextOrderId += 1
+      self.numOrders += 1
+      now = Clock.time()
+      order = {
+        'order_id': orderId, 'tradingsymbol': tradingSymbol, 'transaction_type': direction, 'order_type': orderType,
+        'status': OrderStatus.OPEN_PENDING, 'quantity': qty, 'filled_quantity': 0, 'pending_quantity': qty,
+        'price': price, 'trigger_price': triggerPrice, 'average_price': 0,
+        'order_timestamp': now, 'exchange_update_timestamp': now
+      }
+      self.orderBook[orderId] = order
+      self.addOrderUpdate(order)
+      latency = self.latencyModel.getLatency()
+      if latency > 0:
+        heapq.heappush(self.inFlightOrders, (now + latency, next(self.sequence), orderId))
+      else:
+        self.activateOrder(order)
+        self.matchSymbol(tradingSymbol)
+      return orderId
+
+  def modifyOrder(self, orderId, qty = None, price = None, triggerPrice = None, orderType = None):
+    with self.lock:
+      order = self.getOpenOrder(orderId, 'modified')
+      if qty != None:
+        if qty <= order['filled_quantity']:
+          raise Exception('Order ' + orderId + ' quantity has to be more than the filled quantity')
+        order['quantity'] = qty
+        order['pending_quantity'] = qty - order['filled_quantity']
+      if price != None:
+        order['price'] = price
+      if triggerPrice != None:
+        order['trigger_price'] = triggerPrice
+      if orderType != None:
+        order['order_type'] = orderType
+      order['exchange_update_timestamp'] = Clock.time()
+      if order['status'] != OrderStatus.OPEN_PENDING:
+        # Re-enter the book with the new values. The old book entry becomes stale.
+        if order['status'] == OrderStatus.TRIGGER_PENDING and (order['order_type'] == OrderType.MARKET or order['order_type'] == OrderType.LIMIT):
+          order['status'] = OrderStatus.OPEN
+        self.addToBook(order)
+      self.addOrderUpdate(order)
+      self.matchSymbol(order['tradingsymbol'])
+      return orderId
+
+  def cancelOrder(self, orderId):
+    with self.lock:
+      order = self.getOpenOrder(orderId, 'cancelled')
+      order['status'] = OrderStatus.CANCELLED
+      order['pending_quantity'] = 0
+      order['exchange_update_timestamp'] = Clock.time()
+      self.orderIdToBookEntryMap.pop(orderId, None)
+      self.addOrderUpdate(order)
+      return orderId
+
+  def getOpenOrder(self, orderId, action):
+    order = self.orderBook.get(orderId)
+    if order == None:
+      raise Exception('Order ' + str(orderId) + ' does not exist')
+    if order['status'] != OrderStatus.OPEN and order['status'] != OrderStatus.TRIGGER_PENDING and order['status'] != OrderStatus.OPEN_PENDING:
+      raise Exception('Order ' + orderId + ' cannot be ' + action + ' as it is ' + order['status'])
+    return order
+
+  def getOrderBook(self):
+    # Snapshot of all the orders of the day
+    with self.lock:
+      return [dict(order) for order in self.orderBook.values()]
+
+  def getOrder(self, orderId):
+    with self.lock:
+      return dict(self.orderBook[orderId])
+
+  def onTicks(self, ticks):
+    with self.lock:
+      self.tickNumber += 1
+      activatedSymbols = set()
+      now = Clock.time()
+      while len(self.inFlightOrders) > 0 and self.inFlightOrders[0][0] <= now:
+        order = self.orderBook[heapq.heappop(self.inFlightOrders)[2]]
+        if order['status'] == OrderStatus.OPEN_PENDING: # not cancelled while in flight
+          self.activateOrder(order)
+          activatedSymbols.add(order['tradingsymbol'])
+      for tick in ticks:
+        tradingSymbol = tick.tradingSymbol
+        self.symbolToLastPriceMap[tradingSymbol] = tick.lastTradedPrice
+        if self.participationRate > 0 and tick.lastTradedQuantity > 0:
+          self.symbolToLiquidityMap[tradingSymbol] = int(tick.lastTradedQuantity * self.participationRate)
+        else:
+          self.symbolToLiquidityMap[tradingSymbol] = None
+        if tradingSymbol in self.symbolToBookMap:
+          self.matchSymbol(tradingSymbol)
+        activatedSymbols.discard(tradingSymbol)
+      for tradingSymbol in activatedSymbols:
+        self.matchSymbol(tradingSymbol)
+    self.flushOrderUpdates()
+
+  def activateOrder(self, order):
+    isSLOrder = order['order_type'] == OrderType.SL_MARKET or order['order_type'] == OrderType.SL_LIMIT
+    order['status'] = OrderStatus.TRIGGER_PENDING if isSLOrder == True else OrderStatus.OPEN
+    order['exchange_update_timestamp'] = Clock.time()
+    self.addToBook(order)
+    self.addOrderUpdate(order)
+
+  def addToBook(self, order):
+    book = self.symbolToBookMap.get(order['tradingsymbol'])
+    if book == None:
+      book = {'market': deque(), 'buyLimits': [], 'sellLimits': [], 'buyStops': [], 'sellStops': []}
+      self.symbolToBookMap[order['tradingsymbol']] = book
+    sequence = next(self.sequence)
+    orderId = order['order_id']
+    self.orderIdToBookEntryMap[orderId] = (sequence, self.tickNumber)
+    isBuy = order['transaction_type'] == Direction.LONG
+    if order['status'] == OrderStatus.TRIGGER_PENDING:
+      if isBuy == True:
+        heapq.heappush(book['buyStops'], (order['trigger_price'], sequence, orderId))
+      else:
+        heapq.heappush(book['sellStops'], (-order['trigger_price'], sequence, orderId))
+    elif order['order_type'] == OrderType.MARKET or order['order_type'] == OrderType.SL_MARKET:
+      book['market'].append((sequence, orderId))
+    elif isBuy == True:
+      heapq.heappush(book['buyLimits'], (-order['price'], sequence, orderId))
+    else:
+      heapq.heappush(book['sellLimits'], (order['price'], sequence, orderId))
+
+  def isLiveEntry(self, sequence, orderId):
+    bookEntry = self.orderIdToBookEntryMap.get(orderId)
+    return bookEntry != None and bookEntry[0] == sequence
+
+  def matchSymbol(self, tradingSymbol):
+    lastPrice = self.symbolToLastPriceMap.get(tradingSymbol)
+    book = self.symbolToBookMap.get(tradingSymbol)
+    if lastPrice == None or book == None:
+      return
+
+    # Trigger the SL orders crossed by the last price
+    buyStops = book['buyStops']
+    while len(buyStops) > 0 and buyStops[0][0] <= lastPrice:
+      (_, sequence, orderId) = heapq.heappop(buyStops)
+      if self.isLiveEntry(sequence, orderId):
+        self.triggerOrder(self.orderBook[orderId])
+    sellStops = book['sellStops']
+    while len(sellStops) > 0 and -sellStops[0][0] >= lastPrice:
+      (_, sequence, orderId) = heapq.heappop(sellStops)
+      if self.isLiveEntry(sequence, orderId):
+        self.triggerOrder(self.orderBook[orderId])
+
+    marketOrders = book['market']
+    while len(marketOrders) > 0 and self.hasLiquidity(tradingSymbol):
+      (sequence, orderId) = marketOrders[0]
+      if self.isLiveEntry(sequence, orderId):
+        order = self.orderBook[orderId]
+        self.fillOrder(order, self.slippageModel.getFillPrice(order['transaction_type'], lastPrice))
+        if order['pending_quantity'] > 0:
+          break
+      marketOrders.popleft()
+
+    buyLimits = book['buyLimits']
+    while len(buyLimits) > 0 and -buyLimits[0][0] >= lastPrice and self.hasLiquidity(tradingSymbol):
+      (_, sequence, orderId) = buyLimits[0]
+      if self.isLiveEntry(sequence, orderId):
+        order = self.orderBook[orderId]
+        self.fillOrder(order, self.getLimitFillPrice(order, lastPrice))
+        if order['pending_quantity'] > 0:
+          break
+      heapq.heappop(buyLimits)
+    sellLimits = book['sellLimits']
+    while len(sellLimits) > 0 and sellLimits[0][0] <= lastPrice and self.hasLiquidity(tradingSymbol):
+      (_, sequence, orderId) = sellLimits[0]
+      if self.isLiveEntry(sequence, orderId):
+        order = self.orderBook[orderId]
+        self.fillOrder(order, self.getLimitFillPrice(order, lastPrice))
+        if order['pending_quantity'] > 0:
+          break
+      heapq.heappop(sellLimits)
+
+  def triggerOrder(self, order):
+    order['status'] = OrderStatus.OPEN
+    order['exchange_update_timestamp'] = Clock.time()
+    self.addToBook(order)
+
+  def getLimitFillPrice(self, order, lastPrice):
+    if self.orderIdToBookEntryMap[order['order_id']][1] < self.tickNumber:
+      # Resting order got crossed by a later tick
+      return order['price']
+    # Marketable on arrival. Gets the market price with slippage but never worse than the limit price
+    fillPrice = self.slippageModel.getFillPrice(order['transaction_type'], lastPrice)
+    if order['transaction_type'] == Direction.LONG:
+      return min(fillPrice, order['price'])
+    return max(fillPrice, order['price'])
+
+  def hasLiquidity(self, tradingSymbol):
+    liquidity = self.symbolToLiquidityMap.get(tradingSymbol)
+    return liquidity == None or liquidity > 0
+
+  def fillOrder(self, order, fillPrice):
+    tradingSymbol = order['tradingsymbol']
+    liquidity = self.symbolToLiquidityMap.get(tradingSymbol)
+    fillQty = order['pending_quantity'] if liquidity == None else min(order['pending_quantity'], liquidity)
+    if liquidity != None:
+      self.symbolToLiquidityMap[tradingSymbol] = liquidity - fillQty
+    filledQty = order['filled_quantity'] + fillQty
+    order['average_price'] = round((order['average_price'] * order['filled_quantity'] + fillPrice * fillQty) / filledQty, 2)
+    order['filled_quantity'] = filledQty
+    order['pending_quantity'] -= fillQty
+    order['exchange_update_timestamp'] = Clock.time()
+    self.numFills += 1
+    if order['pending_quantity'] == 0:
+      order['status'] = OrderStatus.COMPLETE
+      self.orderIdToBookEntryMap.pop(order['order_id'], None)
+    else:
+      self.numPartialFills += 1
+    self.addOrderUpdate(order)
+
+  def addOrderUpdate(self, order):
+    self.pendingOrderUpdates.append(dict(order))
+
+  def flushOrderUpdates(self):
+    # Order updates can lead to new orders (Ex: SL order placed on entry fill) whose updates are flushed in the same call
+    while True:
+      with self.lock:
+        if len(self.pendingOrderUpdates) == 0:
+          return
+        updates = self.pendingOrderUpdates
+        self.pendingOrderUpdates = []
+      for update in updates:
+        self.ticker.onOrderUpdate(update['order_id'], update)
+
+  def getStats(self):
+    with self.lock:
+      return {
+        'orders': self.numOrders,
+        'fills': self.numFills,
+        'partialFills': self.numPartialFills,
+        'openOrders': len(self.orderIdToBookEntryMap),
+        'inFlightOrders': len(self.inFlightOrders)
+      }
@@ -0,0 +1,96 @@
+import logging
+import queue
+import threading
+import time
+
+from core.MetricsRegistry import MetricsRegistry
+
+class OrderExecutionEngine:
+  # Runs broker order calls on worker threads so that the callers (Ex: tick handlers on ticker thread) never wait on
+  # broker REST apis. Jobs submitted with the same key (Ex: tradeID) always go to the same worker and hence run one
+  # after the other in submission order. Jobs of different keys run in parallel.
+  # With numWorkers = 0 jobs are run inline on the caller thread.
+  def __init__(self, name, numWorkers = 4):
+    self.name = name
+    self.numWorkers = numWorkers
+    self.queues = []
+    self.lock = threading.Lock()
+    self.numSubmitted = 0
+    self.numCompleted = 0
+    self.numFailed = 0
+    self.totalLatency = 0 # seconds from submit to completion of all completed jobs
+    self.maxLatency = 0
+    self.lastLatency = 0
+    for i in range(numWorkers):
+      jobsQueue = queue.Queue()
+      self.queues.append(jobsQueue)
+      worker = threading.Thread(target=self.runWorker, args=(jobsQueue,), name=name + '-OrderWorker-' + str(i), daemon=True)
+      worker.start()
+
+  def submit(self, key, job, callback = None):
+    # job is called without arguments on a worker thread. callback (if passed) is called on the same thread with
+    # (result, error) after the job is done, error is None when the job succeeds.
+    submitTime = time.perf_counter()
+    with self.lock:
+      self.numSubmitted += 1
+    if self.numWorkers == 0:
+      self.runJob(job, callback, submitTime)
+      return
+    self.queues[hash(key) % self.numWorkers].put((job, callback, submitTime))
+
+  def runWorker(self, jobsQueue):
+    while True:
+      (job, callback, submitTime) = jobsQueue.get()
+      if job == None:
+        break
+      self.runJob(job, callback, submitTime)
+
+  def runJob(self, job, callback, submitTime):
+    result = None
+    error = None
+    try:
+      result = job()
+    except Exception as e:
+      error = e
+      logging.error('%s OrderExecutionEngine: Job failed. Error => %s', self.name, str(e))
+    latency = time.perf_counter() - submitTime
+    with self.lock:
+      self.numCompleted += 1
+      if error != None:
+        self.numFailed += 1
+      self.totalLatency += latency
+      self.lastLatency = latency
+      self.maxLatency = max(self.maxLatency, latency)
+    if callback != None:
+      try:
+        callback(result, error)
+      except Exception as e:
+        logging.error('%s OrderExecutionEngine: Job callback failed. Error => %s', self.name, str(e))
+
+  def getQueueDepth(self):
+    return sum(jobsQueue.qsize() for jobsQueue in self.queues)
+
+  def getStats(self):
+    with self.lock:
+      return {
+        'queueDepth': self.getQueueDepth(),
+        'submitted': self.numSubmitted,
+        'completed': self.numCompleted,
+        'failed': self.numFailed,
+        'avgLatencyMillis': (self.totalLatency * 1000 / self.numCompleted) if self.numCompleted > 0 else 0,
+        'maxLatencyMillis': self.maxLatency * 1000,
+        'lastLatencyMillis': self.lastLatency * 1000
+      }
+
+  def collectMetrics(self):
+    # Sets the queue depth and latency gauges of the engine. Called by the metrics collector of the engine owner
+    stats = self.getStats()
+    MetricsRegistry.setGauge('algo_order_queue_depth', (self.name,), stats['queueDepth'])
+    for state in ['submitted', 'completed', 'failed']:
+      MetricsRegistry.setGauge('algo_order_jobs_total', (self.name, state), stats[state])
+    for stat in ['avg', 'max', 'last']:
+      MetricsRegistry.setGauge('algo_order_job_latency_seconds', (self.name, stat), stats[stat + 'LatencyMillis'] / 1000)
+
+  def stop(self):
+    for jobsQueue in self.queues:
+      jobsQueue.put((None, None, None))
@@ -1,6 +1,7 @@
 
 from models.Segment import Segment
 from models.ProductType import ProductType
+from models.RequestPriority import RequestPriority
 
 class OrderInputParams:
   def __init__(self, tradingSymbol):
@@ -14,10 +15,11 @@ class OrderInputParams:
     self.qty = 0
     self.price = 0
     self.triggerPrice = 0 # Applicable in case of SL order
+    self.priority = RequestPriority.ENTRY # Priority of the order request when broker api rate limit is hit
 
   def __str__(self):
     return "symbol=" + str(self.tradingSymbol) + ", exchange=" + self.exchange \
       + ", productType=" + self.productType + ", segment=" + self.segment \
       + ", direction=" + self.direction + ", orderType=" + self.orderType \
       + ", qty=" + str(self.qty) + ", price=" + str(self.price) + ", triggerPrice=" + str(self.triggerPrice) \
-      + ", isFnO=" + str(self.isFnO)
+      + ", isFnO=" + str(self.isFnO) + ", priority=" + str(self.priority)
@@ -1,3 +1,4 @@
+from models.RequestPriority import RequestPriority
 
 class OrderModifyParams:
   def __init__(self):
@@ -5,8 +6,9 @@ class OrderModifyParams:
     self.newTriggerPrice = 0 # Applicable in case of SL order
     self.newQty = 0
     self.newOrderType = None # Ex: Can change LIMIT order to SL order or vice versa. Not supported by all brokers
+    self.priority = RequestPriority.ENTRY # Priority of the modify request when broker api rate limit is hit
 
   def __str__(self):
     return "newPrice=" + str(self.newPrice) + ", newTriggerPrice=" + str(self.newTriggerPrice) \
-      + ", newQty=" + str(self.newQty) + ", newOrderType=" + str(self.newOrderType)
+      + ", newQty=" + str(self.newQty) + ", newOrderType=" + str(self.newOrderType) + ", priority=" + str(self.priority)
       
\ No newline at end of file
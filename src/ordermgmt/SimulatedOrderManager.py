@@ -0,0 +1,86 @@
+import logging
+
+from ordermgmt.BaseOrderManager import BaseOrderManager
+from ordermgmt.Order import Order
+
+from models.OrderType import OrderType
+
+from utils.Utils import Utils
+
+class SimulatedOrderManager(BaseOrderManager):
+  # Places the orders with the in-process matching engine instead of the broker (paper trading and backtests)
+  def __init__(self, matchingEngine):
+    super().__init__("simulated")
+    self.matchingEngine = matchingEngine
+
+  def placeOrder(self, orderInputParams):
+    logging.info('%s: Going to place order with params %s', self.broker, orderInputParams)
+    orderId = self.matchingEngine.placeOrder(orderInputParams.tradingSymbol, orderInputParams.direction, orderInputParams.qty, \
+      orderInputParams.orderType, orderInputParams.price, orderInputParams.triggerPrice)
+    logging.info('%s: Order placed successfully, orderId = %s', self.broker, orderId)
+    self.recordOrderCall('place')
+    order = Order(orderInputParams)
+    order.orderId = orderId
+    order.orderPlaceTimestamp = Utils.getEpoch()
+    order.lastOrderUpdateTimestamp = Utils.getEpoch()
+    return order
+
+  def modifyOrder(self, order, orderModifyParams):
+    logging.info('%s: Going to modify order with params %s', self.broker, orderModifyParams)
+    self.matchingEngine.modifyOrder(order.orderId,
+      qty=orderModifyParams.newQty if orderModifyParams.newQty > 0 else None,
+      price=orderModifyParams.newPrice if orderModifyParams.newPrice > 0 else None,
+      triggerPrice=orderModifyParams.newTriggerPrice if orderModifyParams.newTriggerPrice > 0 else None,
+      orderType=orderModifyParams.newOrderType)
+    logging.info('%s Order modified successfully for orderId = %s', self.broker, order.orderId)
+    self.recordOrderCall('modify')
+    order.lastOrderUpdateTimestamp = Utils.getEpoch()
+    return order
+
+  def modifyOrderToMarket(self, order):
+    logging.info('%s: Going to modify order %s to MARKET', self.broker, order.orderId)
+    self.matchingEngine.modifyOrder(order.orderId, orderType=OrderType.MARKET)
+    logging.info('%s Order modified successfully to MARKET for orderId = %s', self.broker, order.orderId)
+    self.recordOrderCall('modify')
+    order.lastOrderUpdateTimestamp = Utils.getEpoch()
+    return order
+
+  def cancelOrder(self, order):
+    logging.info('%s Going to cancel order %s', self.broker, order.orderId)
+    self.matchingEngine.cancelOrder(order.orderId)
+    logging.info('%s Order cancelled successfully, orderId = %s', self.broker, order.orderId)
+    self.recordOrderCall('cancel')
+    order.lastOrderUpdateTimestamp = Utils.getEpoch()
+    return order
+
+  def fetchAndUpdateAllOrderDetails(self, orders):
+    orderIdToOrderMap = {}
+    for order in orders:
+      orderIdToOrderMap[order.orderId] = order
+
+    changedOrders = []
+    for bOrder in self.matchingEngine.getOrderBook():
+      foundOrder = orderIdToOrderMap.get(bOrder['order_id'])
+      if foundOrder == None:
+        continue
+      if foundOrder.orderStatus == self.convertToOrderStatus(bOrder) and foundOrder.filledQty == bOrder['filled_quantity']:
+        continue
+      self.updateOrder(foundOrder, bOrder)
+      changedOrders.append(foundOrder)
+
+    logging.info('%s: %d orders updated with broker order details', self.broker, len(changedOrders))
+    return changedOrders
+
+  def getConnectionStats(self):
+    # Orders are filled by the matching engine in process, no http connections are used
+    return {'connectionsCreated': 0, 'requests': 0, 'reusedConnectionRequests': 0}
+
+  def updateOrder(self, order, bOrder):
+    order.qty = bOrder['quantity']
+    order.filledQty = bOrder['filled_quantity']
+    order.pendingQty = bOrder['pending_quantity']
+    order.orderStatus = self.convertToOrderStatus(bOrder)
+    order.price = bOrder['price']
+    order.triggerPrice = bOrder['trigger_price']
+    order.averagePrice = bOrder['average_price']
+    return order
@@ -0,0 +1,16 @@
+from models.Direction import Direction
+
+class SlippageModel:
+  # Slippage of the fills at market price in the matching engine: bps of the price plus a fixed number of ticks,
+  # always against the order. Derive from this class for other slippage models.
+  def __init__(self, bps = 0, numTicks = 0, tickSize = 0.05):
+    self.bps = bps
+    self.numTicks = numTicks
+    self.tickSize = tickSize
+
+  def getFillPrice(self, direction, price):
+    slippage = price * self.bps / 10000 + self.numTicks * self.tickSize
+    if slippage == 0:
+      return price
+    fillPrice = price + slippage if direction == Direction.LONG else price - slippage
+    return round(round(fillPrice / self.tickSize) * self.tickSize, 2)
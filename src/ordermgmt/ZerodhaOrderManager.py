@@ -2,11 +2,13 @@ import logging
 
 from ordermgmt.BaseOrderManager import BaseOrderManager
 from ordermgmt.Order import Order
+from core.RateLimiter import RateLimiter
 
 from models.ProductType import ProductType
 from models.OrderType import OrderType
 from models.Direction import Direction
-from models.OrderStatus import OrderStatus
+from models.ApiEndpoint import ApiEndpoint
+from models.RequestPriority import RequestPriority
 
 from utils.Utils import Utils
 
@@ -18,6 +20,7 @@ class ZerodhaOrderManager(BaseOrderManager):
     logging.info('%s: Going to place order with params %s', self.broker, orderInputParams)
     kite = self.brokerHandle
     try:
+      RateLimiter.acquire(ApiEndpoint.ORDERS, orderInputParams.priority)
       orderId = kite.place_order(
         variety=kite.VARIETY_REGULAR,
         exchange=kite.EXCHANGE_NFO if orderInputParams.isFnO == True else kite.EXCHANGE_NSE,
@@ -30,12 +33,14 @@ class ZerodhaOrderManager(BaseOrderManager):
         order_type=self.convertToBrokerOrderType(orderInputParams.orderType))
 
       logging.info('%s: Order placed successfully, orderId = %s', self.broker, orderId)
+      self.recordOrderCall('place')
       order = Order(orderInputParams)
       order.orderId = orderId
       order.orderPlaceTimestamp = Utils.getEpoch()
       order.lastOrderUpdateTimestamp = Utils.getEpoch()
       return order
     except Exception as e:
+      self.recordBrokerError('place', e)
       logging.info('%s Order placement failed: %s', self.broker, str(e))
       raise Exception(str(e))
 
@@ -43,6 +48,7 @@ class ZerodhaOrderManager(BaseOrderManager):
     logging.info('%s: Going to modify order with params %s', self.broker, orderModifyParams)
     kite = self.brokerHandle
     try:
+      RateLimiter.acquire(ApiEndpoint.ORDERS, orderModifyParams.priority)
       orderId = kite.modify_order(
         variety=kite.VARIETY_REGULAR,
         order_id=order.orderId,
@@ -52,9 +58,11 @@ class ZerodhaOrderManager(BaseOrderManager):
         order_type=orderModifyParams.newOrderType if orderModifyParams.newOrderType != None else None)
 
       logging.info('%s Order modified successfully for orderId = %s', self.broker, orderId)
+      self.recordOrderCall('modify')
       order.lastOrderUpdateTimestamp = Utils.getEpoch()
       return order
     except Exception as e:
+      self.recordBrokerError('modify', e)
       logging.info('%s Order modify failed: %s', self.broker, str(e))
       raise Exception(str(e))
 
@@ -62,15 +70,19 @@ class ZerodhaOrderManager(BaseOrderManager):
     logging.info('%s: Going to modify order with params %s', self.broker)
     kite = self.brokerHandle
     try:
+      # Modifying to market is done only to exit the position
+      RateLimiter.acquire(ApiEndpoint.ORDERS, RequestPriority.EXIT)
       orderId = kite.modify_order(
         variety=kite.VARIETY_REGULAR,
         order_id=order.orderId,
         order_type=kite.ORDER_TYPE_MARKET)
 
       logging.info('%s Order modified successfully to MARKET for orderId = %s', self.broker, orderId)
+      self.recordOrderCall('modify')
       order.lastOrderUpdateTimestamp = Utils.getEpoch()
       return order
     except Exception as e:
+      self.recordBrokerError('modify', e)
       logging.info('%s Order modify to market failed: %s', self.broker, str(e))
       raise Exception(str(e))
 
@@ -78,14 +90,18 @@ class ZerodhaOrderManager(BaseOrderManager):
     logging.info('%s Going to cancel order %s', self.broker, order.orderId)
     kite = self.brokerHandle
     try:
+      # Orders are cancelled on exits (Ex: SL order after target hit or open entry order on square off)
+      RateLimiter.acquire(ApiEndpoint.ORDERS, RequestPriority.EXIT)
       orderId = kite.cancel_order(
         variety=kite.VARIETY_REGULAR,
         order_id=order.orderId)
 
       logging.info('%s Order cancelled successfully, orderId = %s', self.broker, orderId)
+      self.recordOrderCall('cancel')
       order.lastOrderUpdateTimestamp = Utils.getEpoch()
       return order
     except Exception as e:
+      self.recordBrokerError('cancel', e)
       logging.info('%s Order cancel failed: %s', self.broker, str(e))
       raise Exception(str(e))
 
@@ -94,36 +110,59 @@ class ZerodhaOrderManager(BaseOrderManager):
     kite = self.brokerHandle
     orderBook = None
     try:
+      RateLimiter.acquire(ApiEndpoint.ORDER_BOOK, RequestPriority.POLL)
       orderBook = kite.orders()
     except Exception as e:
+      self.recordBrokerError('orderBook', e)
       logging.error('%s Failed to fetch order book', self.broker)
-      return
+      return []
 
     logging.info('%s Order book length = %d', self.broker, len(orderBook))
-    numOrdersUpdated = 0
+    orderIdToOrderMap = {}
+    for order in orders:
+      orderIdToOrderMap[order.orderId] = order
+
+    changedOrders = []
     for bOrder in orderBook:
-      foundOrder = None
-      for order in orders:
-        if order.orderId == bOrder['order_id']:
-          foundOrder = order
-          break
-      
-      if foundOrder != None:
-        logging.info('Found order for orderId %s', foundOrder.orderId)
-        foundOrder.qty = bOrder['quantity']
-        foundOrder.filledQty = bOrder['filled_quantity']
-        foundOrder.pendingQty = bOrder['pending_quantity']
-        foundOrder.orderStatus = bOrder['status']
-        if foundOrder.orderStatus == OrderStatus.CANCELLED and foundOrder.filledQty > 0:
-          # Consider this case as completed in our system as we cancel the order with pending qty when strategy stop timestamp reaches
-          foundOrder.orderStatus = OrderStatus.COMPLETED
-        foundOrder.price = bOrder['price']
-        foundOrder.triggerPrice = bOrder['trigger_price']
-        foundOrder.averagePrice = bOrder['average_price']
-        logging.info('%s Updated order %s', self.broker, foundOrder)
-        numOrdersUpdated += 1
-
-    logging.info('%s: %d orders updated with broker order details', self.broker, numOrdersUpdated)
+      foundOrder = orderIdToOrderMap.get(bOrder['order_id'])
+      if foundOrder == None:
+        continue
+      if foundOrder.orderStatus == self.convertToOrderStatus(bOrder) and foundOrder.filledQty == bOrder['filled_quantity']:
+        # Nothing changed since the last poll (or the last order postback)
+        continue
+      self.updateOrder(foundOrder, bOrder)
+      logging.info('%s Updated order %s', self.broker, foundOrder)
+      changedOrders.append(foundOrder)
+
+    logging.info('%s: %d orders updated with broker order details', self.broker, len(changedOrders))
+    return changedOrders
+
+  def updateOrder(self, order, bOrder):
+    order.qty = bOrder['quantity']
+    order.filledQty = bOrder['filled_quantity']
+    order.pendingQty = bOrder['pending_quantity']
+    order.orderStatus = self.convertToOrderStatus(bOrder)
+    order.price = bOrder['price']
+    order.triggerPrice = bOrder['trigger_price']
+    order.averagePrice = bOrder['average_price']
+    return order
+
+  def getConnectionStats(self):
+    # Connection pools of the broker session. Requests served on an already open connection are the reused ones.
+    numConnections = 0
+    numRequests = 0
+    session = self.brokerHandle.reqsession
+    for adapter in session.adapters.values():
+      pools = adapter.poolmanager.pools
+      for key in pools.keys():
+        pool = pools[key]
+        numConnections += pool.num_connections
+        numRequests += pool.num_requests
+    return {
+      'connectionsCreated': numConnections,
+      'requests': numRequests,
+      'reusedConnectionRequests': max(0, numRequests - numConnections)
+    }
 
   def convertToBrokerProductType(self, productType):
     kite = self.brokerHandle
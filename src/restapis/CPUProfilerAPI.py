@@ -0,0 +1,30 @@
+from flask import Response, request
+from flask.views import MethodView
+import json
+import logging
+from core.SamplingProfiler import SamplingProfiler
+
+class CPUProfilerAPI(MethodView):
+  # /apis/profiler/cpu/start?intervalMillis=10&maxSeconds=300 starts sampling the stacks of all the threads
+  # /apis/profiler/cpu/stop stops it and returns the collapsed stacks
+  # /apis/profiler/cpu/stacks returns the collapsed stacks collected so far and /apis/profiler/cpu/status the state
+  def get(self, action):
+    if action == 'stacks':
+      return Response(SamplingProfiler.getCollapsedStacks(), content_type='text/plain; charset=utf-8')
+    if action == 'status':
+      return json.dumps(SamplingProfiler.getStatus())
+    return json.dumps({'error': 'Unknown action ' + action}), 404
+
+  def post(self, action):
+    if action == 'start':
+      intervalMillis = int(request.args.get('intervalMillis', 10))
+      maxSeconds = int(request.args.get('maxSeconds', 300))
+      if SamplingProfiler.start(intervalMillis, maxSeconds) == False:
+        return json.dumps({'error': 'CPU profiler is already running'}), 409
+      logging.info('CPUProfilerAPI: CPU profiler started')
+      return json.dumps(SamplingProfiler.getStatus())
+    if action == 'stop':
+      SamplingProfiler.stop()
+      logging.info('CPUProfilerAPI: CPU profiler stopped')
+      return Response(SamplingProfiler.getCollapsedStacks(), content_type='text/plain; charset=utf-8')
+    return json.dumps({'error': 'Unknown action ' + action}), 404
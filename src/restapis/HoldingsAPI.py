@@ -2,10 +2,13 @@ from flask.views import MethodView
 import json
 import logging
 from core.Controller import Controller
+from core.RateLimiter import RateLimiter
+from models.ApiEndpoint import ApiEndpoint
 
 class HoldingsAPI(MethodView):
   def get(self):
     brokerHandle = Controller.getBrokerLogin().getBrokerHandle()
+    RateLimiter.acquire(ApiEndpoint.PORTFOLIO)
     holdings = brokerHandle.holdings()
     logging.info('User holdings => %s', holdings)
     return json.dumps(holdings)
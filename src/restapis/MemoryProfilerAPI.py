@@ -0,0 +1,36 @@
+from flask import request
+from flask.views import MethodView
+import json
+import logging
+from core.MemoryProfiler import MemoryProfiler
+
+class MemoryProfilerAPI(MethodView):
+  # /apis/profiler/memory/start?numFrames=1 starts tracemalloc tracing and takes the baseline snapshot
+  # /apis/profiler/memory/snapshot?limit=25 returns the top allocators of the memory allocated now
+  # /apis/profiler/memory/diff?limit=25 returns the top growth since the previous diff (or since start)
+  # /apis/profiler/memory/stop stops tracing and /apis/profiler/memory/status returns the state
+  def get(self, action):
+    limit = int(request.args.get('limit', 25))
+    if action == 'snapshot':
+      result = MemoryProfiler.snapshot(limit)
+    elif action == 'diff':
+      result = MemoryProfiler.diff(limit, request.args.get('resetBaseline', 'true') == 'true')
+    elif action == 'status':
+      return json.dumps(MemoryProfiler.getStatus())
+    else:
+      return json.dumps({'error': 'Unknown action ' + action}), 404
+    if result == None:
+      return json.dumps({'error': 'Memory profiler is not started'}), 409
+    return json.dumps(result)
+
+  def post(self, action):
+    if action == 'start':
+      if MemoryProfiler.start(int(request.args.get('numFrames', 1))) == False:
+        return json.dumps({'error': 'Memory profiler is already started'}), 409
+      logging.info('MemoryProfilerAPI: Memory profiler started')
+      return json.dumps(MemoryProfiler.getStatus())
+    if action == 'stop':
+      MemoryProfiler.stop()
+      logging.info('MemoryProfilerAPI: Memory profiler stopped')
+      return json.dumps(MemoryProfiler.getStatus())
+    return json.dumps({'error': 'Unknown action ' + action}), 404
@@ -0,0 +1,8 @@
+from flask import Response
+from flask.views import MethodView
+from core.MetricsRegistry import MetricsRegistry
+
+class MetricsAPI(MethodView):
+  # Prometheus scrape endpoint
+  def get(self):
+    return Response(MetricsRegistry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -2,10 +2,13 @@ from flask.views import MethodView
 import json
 import logging
 from core.Controller import Controller
+from core.RateLimiter import RateLimiter
+from models.ApiEndpoint import ApiEndpoint
 
 class PositionsAPI(MethodView):
   def get(self):
     brokerHandle = Controller.getBrokerLogin().getBrokerHandle()
+    RateLimiter.acquire(ApiEndpoint.PORTFOLIO)
     positions = brokerHandle.positions()
     logging.info('User positions => %s', positions)
     return json.dumps(positions)
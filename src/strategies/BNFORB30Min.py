@@ -1,10 +1,10 @@
 import logging
-from datetime import datetime
 
 from instruments.Instruments import Instruments
 from models.Direction import Direction
 from models.ProductType import ProductType
 from strategies.BaseStrategy import BaseStrategy
+from utils.Clock import Clock
 from utils.Utils import Utils
 from trademgmt.Trade import Trade
 from trademgmt.TradeManager import TradeManager
@@ -39,30 +39,63 @@ class BNFORB30Min(BaseStrategy):
     self.maxTradesPerDay = 1 # Max number of trades per day under this strategy
     self.isFnO = True # Does this strategy trade in FnO or not
     self.capitalPerSet = 100000 # Applicable if isFnO is True (1 set means 1CE/1PE or 2CE/2PE etc based on your strategy logic)
+    self.futureSymbol = Utils.prepareMonthlyExpiryFuturesSymbol('BANKNIFTY')
+    self.candleSymbols = [self.futureSymbol] # Opening range is taken from the 30 mins candle of the future
+    self.openingRange = None # (high, low)
+    self.candlesStartTime = None # when candles of the future started getting built. Set on subscribing to them
+    self.maxCandlesStartDelaySeconds = 60 # opening range candle is taken as complete only if candles started by this time after market open
 
   def process(self):
-    now = datetime.now()
+    now = Clock.now()
     processEndTime = Utils.getTimeOfToDay(9, 50, 0)
     if now < self.startTimestamp:
       return
     if now > processEndTime:
-      # We are interested in creating the symbol only between 09:45 and 09:50 
-      # since we are not using historical candles so not aware of exact high and low of the first 30 mins
+      # We are interested in creating the trades only between 09:45 and 09:50 right after the opening range candle closes
       return
 
     if len(self.trades) >= 2:
       return
 
-    symbol = Utils.prepareMonthlyExpiryFuturesSymbol('BANKNIFTY')
-    quote = self.getQuote(symbol)
-    if quote == None:
-        logging.error('%s: Could not get quote for %s', self.getName(), symbol)
+    if self.openingRange == None and self.hasMissedOpeningRangeCandle() == False:
+      logging.info('%s: Opening range candle of %s not yet closed', self.getName(), self.futureSymbol)
+      return
+
+    if self.openingRange == None:
+      # App started (or restarted) after market open so the opening range candle could not be built from its ticks.
+      # Fall back to the day high and low of the future from broker quote which is the opening range till ~09:45.
+      quote = self.getQuote(self.futureSymbol)
+      if quote == None:
+        logging.error('%s: Could not get quote for %s', self.getName(), self.futureSymbol)
         return
-    
-    logging.info('%s: %s => lastTradedPrice = %f', self.getName(), symbol, quote.lastTradedPrice)
-    self.generateTrade(symbol, Direction.LONG, quote.high, quote.low)
-    self.generateTrade(symbol, Direction.SHORT, quote.high, quote.low)
+      logging.warn('%s: Opening range candle of %s not built from market open (candles started at %s). Using day high %f and low %f from quote as opening range', \
+        self.getName(), self.futureSymbol, self.candlesStartTime, quote.high, quote.low)
+      self.openingRange = (quote.high, quote.low)
+
+    (high, low) = self.openingRange
+    logging.info('%s: %s => opening range high = %f, low = %f', self.getName(), self.futureSymbol, high, low)
+    self.generateTrade(self.futureSymbol, Direction.LONG, high, low)
+    self.generateTrade(self.futureSymbol, Direction.SHORT, high, low)
 
+  def subscribeCandles(self, symbols):
+    if self.candlesStartTime == None:
+      self.candlesStartTime = Clock.now()
+    super().subscribeCandles(symbols)
+
+  def hasMissedOpeningRangeCandle(self):
+    # True if candles started getting built late (restart after market open), their first 30 mins candle then misses
+    # the ticks before the restart and can not be used as opening range
+    if self.candlesStartTime == None:
+      return True
+    return (self.candlesStartTime - Utils.getMarketStartTime()).total_seconds() > self.maxCandlesStartDelaySeconds
+
+  def onCandleClose(self, tradingSymbol, timeframe, candles):
+    # First 30 mins candle (09:15 to 09:45) is the opening range
+    if timeframe == 30 and candles.getValue('timestamps') == Utils.getEpoch(Utils.getMarketStartTime()):
+      if self.hasMissedOpeningRangeCandle() == True:
+        logging.warn('%s: Ignoring opening range candle of %s as it is built only from %s', self.getName(), tradingSymbol, self.candlesStartTime)
+        return
+      self.openingRange = (candles.getValue('highs'), candles.getValue('lows'))
 
   def generateTrade(self, tradingSymbol, direction, high, low):
     trade = Trade(tradingSymbol)
@@ -1,11 +1,14 @@
 import logging
-import time
 from datetime import datetime
 
 from models.ProductType import ProductType
+from models.JobPriority import JobPriority
 from core.Quotes import Quotes
+from core.Scheduler import Scheduler
+from candles.CandleBuilder import CandleBuilder
 from trademgmt.TradeManager import TradeManager
 
+from utils.Clock import Clock
 from utils.Utils import Utils
 
 class BaseStrategy:
@@ -15,6 +18,9 @@ class BaseStrategy:
     self.enabled = True # Strategy will be run only when it is enabled
     self.productType = ProductType.MIS # MIS/NRML/CNC etc
     self.symbols = [] # List of stocks to be traded under this strategy
+    self.candleSymbols = [] # Symbols whose candles are built from market start for this strategy (see onCandleClose())
+    self.indicators = {} # name => indicator (see addIndicator())
+    self.candleIndicatorsMap = {} # (tradingSymbol, timeframe) => list of indicators updated on close of its candles
     self.slPercentage = 0
     self.targetPercentage = 0
     self.startTimestamp = Utils.getMarketStartTime() # When to start the strategy. Default is Market start time
@@ -30,6 +36,19 @@ class BaseStrategy:
     # Load all trades of this strategy into self.trades on restart of app
     self.trades = TradeManager.getAllTradesByStrategy(self.name)
 
+  def setParameters(self, parameters):
+    # Overrides the strategy settings. Ex: {'slPercentage': 40, 'startTimestamp': '10:15:00'}
+    # Timestamps are passed as HH:MM:SS of today. Used by backtests and parameter sweeps.
+    for name in parameters:
+      if hasattr(self, name) == False:
+        raise Exception(self.getName() + ': Unknown parameter ' + name)
+      value = parameters[name]
+      if isinstance(getattr(self, name), datetime) and isinstance(value, str):
+        (hour, minute, second) = [int(part) for part in value.split(':')]
+        value = Utils.getTimeOfToDay(hour, minute, second)
+      setattr(self, name, value)
+      logging.info('%s: Parameter %s set to %s', self.getName(), name, value)
+
   def getName(self):
     return self.name
 
@@ -69,34 +88,24 @@ class BaseStrategy:
       logging.warn("%s: Not going to run strategy as market is closed.", self.getName())
       return
 
-    now = datetime.now()
-    if now < Utils.getMarketStartTime():
-      Utils.waitTillMarketOpens(self.getName())
-
     if self.canTradeToday() == False:
       logging.warn("%s: Not going to run strategy as it cannot be traded today.", self.getName())
       return
 
-    now = datetime.now()
-    if now < self.startTimestamp:
-      waitSeconds = Utils.getEpoch(self.startTimestamp) - Utils.getEpoch(now)
-      logging.info("%s: Waiting for %d seconds till startegy start timestamp reaches...", self.getName(), waitSeconds)
-      if waitSeconds > 0:
-        time.sleep(waitSeconds)      
-
-    # Run in an loop and keep processing
-    while True:
-      if Utils.isMarketClosedForTheDay():
-        logging.warn("%s: Exiting the strategy as market closed.", self.getName())
-        break
-
-      # Derived class specific implementation will be called when process() is called
-      self.process()
-
-      # Sleep and wake up on every 30th second
-      now = datetime.now()
-      waitSeconds = 30 - (now.second % 30) 
-      time.sleep(waitSeconds)
+    # Declare the symbols of this strategy so that their ticks are routed to it
+    if len(self.symbols) > 0:
+      TradeManager.subscribeStrategyToSymbols(self.getName(), self.symbols)
+    if len(self.candleSymbols) > 0:
+      self.subscribeCandles(self.candleSymbols)
+
+    # Derived class specific implementation is called on every 30th second from the strategy start timestamp till
+    # market closes. process() runs on its own thread as it can fetch quotes and place orders and must not hold up the
+    # scheduler loop. A run is skipped if the previous run of the strategy is still going on.
+    startTimestamp = max(self.startTimestamp, Utils.getMarketStartTime())
+    logging.info("%s: Strategy will start processing at %s", self.getName(), startTimestamp)
+    Scheduler.addJob(self.getName(), self.process, intervalSeconds=30, startTime=Utils.getEpoch(startTimestamp), \
+      endTime=Utils.getEpoch(Utils.getMarketEndTime()), priority=JobPriority.NORMAL, alignToInterval=True, \
+      runOnThread=True, onEnd=lambda: logging.warn("%s: Exiting the strategy as market closed.", self.getName()))
 
   def shouldPlaceTrade(self, trade, tick):
     # Each strategy should call this function from its own shouldPlaceTrade() method before working on its own logic
@@ -106,7 +115,7 @@ class BaseStrategy:
       TradeManager.disableTrade(trade, 'InvalidQuantity')
       return False
 
-    now = datetime.now()
+    now = Clock.now()
     if now > self.stopTimestamp:
       TradeManager.disableTrade(trade, 'NoNewTradesCutOffTimeReached')
       return False
@@ -122,8 +131,48 @@ class BaseStrategy:
     if trade != None:
       self.trades.append(trade)
 
-  def getQuote(self, tradingSymbol):
-    return Quotes.getQuote(tradingSymbol, self.isFnO)
+  def getQuote(self, tradingSymbol, maxAgeSeconds = None):
+    return Quotes.getQuote(tradingSymbol, self.isFnO, maxAgeSeconds)
+
+  def getQuotes(self, tradingSymbols, maxAgeSeconds = None):
+    # Fetches quotes of all the symbols in one go. Returns dict of tradingSymbol => Quote
+    return Quotes.getQuotes(tradingSymbols, self.isFnO, maxAgeSeconds)
+
+  def subscribeCandles(self, symbols):
+    # Starts building the candles of the symbols. onCandleClose() is called on every candle close of these symbols
+    for symbol in symbols:
+      # Indicators are updated before onCandleClose() is called so that it sees their latest values
+      CandleBuilder.subscribe(symbol, self.updateIndicators)
+      CandleBuilder.subscribe(symbol, self.onCandleClose)
+    TradeManager.registerSymbols(symbols)
+
+  def addIndicator(self, name, indicator, tradingSymbol, timeframe):
+    # Ex: self.addIndicator('ema20', EMA(20), futureSymbol, 5) in the constructor and then
+    #     self.getIndicator('ema20').value in shouldPlaceTrade()
+    # The indicator is updated on every close of a candle of the symbol and timeframe (minutes). If candles of the
+    # symbol are already there (indicator added after market start) it is warmed up with them.
+    self.indicators[name] = indicator
+    self.candleIndicatorsMap.setdefault((tradingSymbol, timeframe), []).append(indicator)
+    candles = self.getCandles(tradingSymbol, timeframe)
+    if candles != None and len(candles) > 0:
+      indicator.initializeFromCandles(candles)
+    self.subscribeCandles([tradingSymbol])
+
+  def getIndicator(self, name):
+    return self.indicators.get(name)
+
+  def updateIndicators(self, tradingSymbol, timeframe, candles):
+    for indicator in self.candleIndicatorsMap.get((tradingSymbol, timeframe), []):
+      indicator.onCandle(candles)
+
+  def getCandles(self, tradingSymbol, timeframe):
+    # CandleSeries of the symbol and timeframe (minutes) or None if the symbol is not subscribed
+    return CandleBuilder.getSeries(tradingSymbol, timeframe)
+
+  def onCandleClose(self, tradingSymbol, timeframe, candles):
+    # Called on the ticker thread when a candle of a subscribed symbol closes. candles is the CandleSeries and the
+    # closed candle is its latest one. Derived class can override this and should return quickly.
+    pass
 
   def getTrailingSL(self, trade):
     return 0
\ No newline at end of file
@@ -1,10 +1,11 @@
 import logging
-from datetime import datetime
 
 from instruments.Instruments import Instruments
+from instruments.OptionChain import OptionChain
 from models.Direction import Direction
 from models.ProductType import ProductType
 from strategies.BaseStrategy import BaseStrategy
+from utils.Clock import Clock
 from utils.Utils import Utils
 from trademgmt.Trade import Trade
 from trademgmt.TradeManager import TradeManager
@@ -39,6 +40,7 @@ class OptionSelling(BaseStrategy):
     self.maxTradesPerDay = 2 # (1 CE + 1 PE) Max number of trades per day under this strategy
     self.isFnO = True # Does this strategy trade in FnO or not
     self.capitalPerSet = 100000 # Applicable if isFnO is True (1 set means 1CE/1PE or 2CE/2PE etc based on your strategy logic)
+    self.strikeOffset = 1 # Number of strikes away from ATM to sell. CE above and PE below ATM
 
   def canTradeToday(self):
     if Utils.isTodayOneDayBeforeWeeklyExpiryDay() == True:
@@ -51,7 +53,7 @@ class OptionSelling(BaseStrategy):
     return False
 
   def process(self):
-    now = datetime.now()
+    now = Clock.now()
     if now < self.startTimestamp:
       return
     if len(self.trades) >= self.maxTradesPerDay:
@@ -64,25 +66,36 @@ class OptionSelling(BaseStrategy):
       logging.error('%s: Could not get quote for %s', self.getName(), futureSymbol)
       return
 
-    ATMStrike = Utils.getNearestStrikePrice(quote.lastTradedPrice, 50)
+    expiry = OptionChain.getNearestExpiry("NIFTY")
+    ATMStrike = OptionChain.getNearestStrike("NIFTY", expiry, quote.lastTradedPrice)
+    if ATMStrike == None:
+      logging.error('%s: Could not find ATM strike for expiry %s', self.getName(), expiry)
+      return
     logging.info('%s: Nifty CMP = %f, ATMStrike = %d', self.getName(), quote.lastTradedPrice, ATMStrike)
 
-    ATMPlus50CESymbol = Utils.prepareWeeklyOptionsSymbol("NIFTY", ATMStrike + 50, 'CE')
-    ATMMinus50PESymbol = Utils.prepareWeeklyOptionsSymbol("NIFTY", ATMStrike - 50, 'PE')
-    logging.info('%s: ATMPlus50CE = %s, ATMMinus50PE = %s', self.getName(), ATMPlus50CESymbol, ATMMinus50PESymbol)
+    # Out of the money strikes strikeOffset strikes away from ATM: CE above ATM and PE below ATM
+    CEStrike = OptionChain.getStrikeByOffset("NIFTY", expiry, ATMStrike, self.strikeOffset, 'CE')
+    PEStrike = OptionChain.getStrikeByOffset("NIFTY", expiry, ATMStrike, -self.strikeOffset, 'PE')
+    OTMCESymbol = OptionChain.getOptionSymbol("NIFTY", expiry, CEStrike, 'CE')
+    OTMPESymbol = OptionChain.getOptionSymbol("NIFTY", expiry, PEStrike, 'PE')
+    if OTMCESymbol == None or OTMPESymbol == None:
+      logging.error('%s: Could not find option symbols around ATM strike %d expiry %s', self.getName(), ATMStrike, expiry)
+      return
+    logging.info('%s: OTMCE = %s, OTMPE = %s (%d strikes away from ATM)', self.getName(), OTMCESymbol, OTMPESymbol, self.strikeOffset)
     # create trades
-    self.generateTrades(ATMPlus50CESymbol, ATMMinus50PESymbol)
+    self.generateTrades(OTMCESymbol, OTMPESymbol)
 
-  def generateTrades(self, ATMPlus50CESymbol, ATMMinus50PESymbol):
+  def generateTrades(self, OTMCESymbol, OTMPESymbol):
     numLots = self.calculateLotsPerTrade()
-    quoteATMPlus50CESymbol = self.getQuote(ATMPlus50CESymbol)
-    quoteATMMinus50PESymbol = self.getQuote(ATMMinus50PESymbol)
-    if quoteATMPlus50CESymbol == None or quoteATMMinus50PESymbol == None:
+    quotes = self.getQuotes([OTMCESymbol, OTMPESymbol])
+    quoteOTMCESymbol = quotes.get(OTMCESymbol)
+    quoteOTMPESymbol = quotes.get(OTMPESymbol)
+    if quoteOTMCESymbol == None or quoteOTMPESymbol == None:
       logging.error('%s: Could not get quotes for option symbols', self.getName())
       return
 
-    self.generateTrade(ATMPlus50CESymbol, numLots, quoteATMPlus50CESymbol.lastTradedPrice)
-    self.generateTrade(ATMMinus50PESymbol, numLots, quoteATMMinus50PESymbol.lastTradedPrice)
+    self.generateTrade(OTMCESymbol, numLots, quoteOTMCESymbol.lastTradedPrice)
+    self.generateTrade(OTMPESymbol, numLots, quoteOTMPESymbol.lastTradedPrice)
     logging.info('%s: Trades generated.', self.getName())
 
   def generateTrade(self, optionSymbol, numLots, lastTradedPrice):
@@ -44,8 +44,9 @@ class SampleStrategy(BaseStrategy):
     # This is a sample strategy with the following logic:
     # 1. If current market price > 0.5% from previous day close then create LONG trade
     # 2. If current market price < 0.5% from previous day close then create SHORT trade
+    quotes = self.getQuotes(self.symbols)
     for symbol in self.symbols:
-      quote = self.getQuote(symbol)
+      quote = quotes.get(symbol)
       if quote == None:
         logging.error('%s: Could not get quote for %s', self.getName(), symbol)
         continue
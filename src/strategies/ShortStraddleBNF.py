@@ -1,10 +1,11 @@
 import logging
-from datetime import datetime
 
 from instruments.Instruments import Instruments
+from instruments.OptionChain import OptionChain
 from models.Direction import Direction
 from models.ProductType import ProductType
 from strategies.BaseStrategy import BaseStrategy
+from utils.Clock import Clock
 from utils.Utils import Utils
 from trademgmt.Trade import Trade
 from trademgmt.TradeManager import TradeManager
@@ -39,13 +40,14 @@ class ShortStraddleBNF(BaseStrategy):
     self.maxTradesPerDay = 2 # (1 CE + 1 PE) Max number of trades per day under this strategy
     self.isFnO = True # Does this strategy trade in FnO or not
     self.capitalPerSet = 100000 # Applicable if isFnO is True (1 set means 1CE/1PE or 2CE/2PE etc based on your strategy logic)
+    self.trailingSLStep = 5 # SL is trailed by these many points for every these many points of profit
 
   def canTradeToday(self):
     # Even if you remove this function canTradeToday() completely its same as allowing trade every day
     return True
 
   def process(self):
-    now = datetime.now()
+    now = Clock.now()
     if now < self.startTimestamp:
       return
     if len(self.trades) >= self.maxTradesPerDay:
@@ -58,19 +60,27 @@ class ShortStraddleBNF(BaseStrategy):
       logging.error('%s: Could not get quote for %s', self.getName(), futureSymbol)
       return
 
-    ATMStrike = Utils.getNearestStrikePrice(quote.lastTradedPrice, 100)
+    expiry = OptionChain.getNearestExpiry("BANKNIFTY")
+    ATMStrike = OptionChain.getNearestStrike("BANKNIFTY", expiry, quote.lastTradedPrice)
+    if ATMStrike == None:
+      logging.error('%s: Could not find ATM strike for expiry %s', self.getName(), expiry)
+      return
     logging.info('%s: Nifty CMP = %f, ATMStrike = %d', self.getName(), quote.lastTradedPrice, ATMStrike)
 
-    ATMCESymbol = Utils.prepareWeeklyOptionsSymbol("BANKNIFTY", ATMStrike, 'CE')
-    ATMPESymbol = Utils.prepareWeeklyOptionsSymbol("BANKNIFTY", ATMStrike, 'PE')
+    ATMCESymbol = OptionChain.getOptionSymbol("BANKNIFTY", expiry, ATMStrike, 'CE')
+    ATMPESymbol = OptionChain.getOptionSymbol("BANKNIFTY", expiry, ATMStrike, 'PE')
+    if ATMCESymbol == None or ATMPESymbol == None:
+      logging.error('%s: Could not find ATM option symbols for strike %d expiry %s', self.getName(), ATMStrike, expiry)
+      return
     logging.info('%s: ATMCESymbol = %s, ATMPESymbol = %s', self.getName(), ATMCESymbol, ATMPESymbol)
     # create trades
     self.generateTrades(ATMCESymbol, ATMPESymbol)
 
   def generateTrades(self, ATMCESymbol, ATMPESymbol):
     numLots = self.calculateLotsPerTrade()
-    quoteATMCESymbol = self.getQuote(ATMCESymbol)
-    quoteATMPESymbol = self.getQuote(ATMPESymbol)
+    quotes = self.getQuotes([ATMCESymbol, ATMPESymbol])
+    quoteATMCESymbol = quotes.get(ATMCESymbol)
+    quoteATMPESymbol = quotes.get(ATMPESymbol)
     if quoteATMCESymbol == None or quoteATMPESymbol == None:
       logging.error('%s: Could not get quotes for option symbols', self.getName())
       return
@@ -117,9 +127,9 @@ class ShortStraddleBNF(BaseStrategy):
 
     trailSL = 0
     profitPoints = int(trade.entry - lastTradedPrice)
-    if profitPoints >= 5:
-      factor = int(profitPoints / 5)
-      trailSL = Utils.roundToNSEPrice(trade.initialStopLoss - factor * 5)
+    if profitPoints >= self.trailingSLStep:
+      factor = int(profitPoints / self.trailingSLStep)
+      trailSL = Utils.roundToNSEPrice(trade.initialStopLoss - factor * self.trailingSLStep)
     logging.info('%s: %s Returning trail SL %f', self.getName(), trade.tradingSymbol, trailSL)
     return trailSL
 
@@ -0,0 +1,71 @@
+import logging
+
+from ticker.BaseTicker import BaseTicker
+from core.QuoteCache import QuoteCache
+from ticker.TickStore import TickStore
+from core.LatencyTracker import LatencyTracker
+from utils.Clock import Clock
+
+class BacktestTicker(BaseTicker):
+  # Ticker of a backtest. Receives the replayed ticks from backtest.BacktestBroker
+  def __init__(self):
+    super().__init__("backtest")
+    self.tickStore = TickStore()
+    # Same as live ticker, latest ticks in the tick store serve quotes to strategies
+    QuoteCache.setTickStore(self.tickStore)
+    self.subscribedSymbols = set()
+
+  def startTicker(self):
+    logging.info('BacktestTicker: Going to connect..')
+    self.brokerLogin.getBrokerHandle().connect(self.on_ticks)
+    self.onConnect()
+
+  def stopTicker(self):
+    logging.info('BacktestTicker: stopping..')
+    self.brokerLogin.getBrokerHandle().disconnect()
+
+  def registerSymbols(self, symbols):
+    logging.info('BacktestTicker Subscribing symbols %s', symbols)
+    self.subscribedSymbols.update(symbols)
+
+  def unregisterSymbols(self, symbols):
+    logging.info('BacktestTicker Unsubscribing symbols %s', symbols)
+    self.subscribedSymbols.difference_update(symbols)
+
+  def on_ticks(self, brokerTicks):
+    # Ticks of all the instruments go to the tick store so that quotes are available for any symbol (like broker
+    # quote api) but only the ticks of subscribed symbols are passed on to the listeners (like broker ticker).
+    # An instrument repeated in the frame gets copies for its earlier ticks as its view shows only the latest values.
+    if LatencyTracker.enabled == True:
+      LatencyTracker.onTicksReceived()
+    store = self.tickStore
+    timestamp = Clock.time()
+    ticks = []
+    slotToIndexMap = {} # slot => index of its view in ticks
+    for bTick in brokerTicks:
+      tradingSymbol = bTick['tradingsymbol']
+      # trading symbols are unique in backtests so they are used as the tick store keys instead of instrument tokens
+      slot = store.allocateSlot(tradingSymbol, tradingSymbol)
+      index = slotToIndexMap.get(slot)
+      if index != None:
+        # Same instrument again in this frame. The view is going to show the new values so keep a copy of the earlier tick
+        ticks[index] = store.views[slot].toTickData()
+      store.lastTradedPrice[slot] = bTick['last_price']
+      store.lastTradedQuantity[slot] = bTick['last_quantity']
+      store.avgTradedPrice[slot] = bTick['average_price']
+      store.volume[slot] = bTick['volume']
+      store.totalBuyQuantity[slot] = bTick['buy_quantity']
+      store.totalSellQuantity[slot] = bTick['sell_quantity']
+      ohlc = bTick['ohlc']
+      store.open[slot] = ohlc['open']
+      store.high[slot] = ohlc['high']
+      store.low[slot] = ohlc['low']
+      store.close[slot] = ohlc['close']
+      store.change[slot] = bTick['change']
+      store.timestamp[slot] = timestamp
+      if tradingSymbol in self.subscribedSymbols:
+        slotToIndexMap[slot] = len(ticks)
+        ticks.append(store.views[slot])
+
+    if len(ticks) > 0:
+      self.onNewTicks(ticks)
@@ -1,13 +1,17 @@
 import logging
 
 from core.Controller import Controller
+from core.MetricsRegistry import MetricsRegistry
 
 class BaseTicker:
   def __init__(self, broker):
     self.broker = broker
     self.brokerLogin = Controller.getBrokerLogin()
     self.ticker = None
-    self.tickListeners = []
+    self.tickListeners = [] # listeners interested in ticks of all symbols
+    self.symbolToTickListenersMap = {} # tradingSymbol => listeners interested only in that symbol
+    self.batchTickListeners = [] # list of (listener, latestOnly) notified once per ticks frame
+    self.orderUpdateListeners = []
 
   def startTicker(self):
     pass
@@ -15,9 +19,24 @@ class BaseTicker:
   def stopTicker(self):
     pass
 
-  def registerListener(self, listener):
-    # All registered tick listeners will be notified on new ticks
-    self.tickListeners.append(listener)
+  def registerListener(self, listener, symbols = None):
+    # All registered tick listeners will be notified on new ticks.
+    # If symbols are passed the listener will be notified only on the ticks of those symbols.
+    if symbols == None:
+      self.tickListeners.append(listener)
+      return
+    for symbol in symbols:
+      self.symbolToTickListenersMap.setdefault(symbol, []).append(listener)
+
+  def registerBatchListener(self, listener, latestOnly = False):
+    # Batch listeners are notified once per ticks frame with the list of all the ticks of that frame.
+    # If latestOnly is True the list contains only the latest tick of each symbol in the frame. Otherwise a symbol
+    # repeated in the frame has a separate tick (copy) for each of its ticks.
+    self.batchTickListeners.append((listener, latestOnly))
+
+  def registerOrderUpdateListener(self, listener):
+    # All registered order update listeners will be notified with (orderId, brokerOrderData) on every order postback
+    self.orderUpdateListeners.append(listener)
 
   def registerSymbols(self, symbols):
     pass
@@ -27,11 +46,35 @@ class BaseTicker:
 
   def onNewTicks(self, ticks):
     # logging.info('New ticks received %s', ticks)
+    latestTicks = None
+    for (listener, latestOnly) in self.batchTickListeners:
+      if latestOnly == True and latestTicks == None:
+        # keep only the latest tick of each symbol
+        latestTicks = list({tick.tradingSymbol: tick for tick in ticks}.values())
+      try:
+        listener(latestTicks if latestOnly == True else ticks)
+      except Exception as e:
+        MetricsRegistry.inc('algo_listener_exceptions_total', ('batchTick',))
+        logging.error('BaseTicker: Exception from batch listener callback function. Error => %s', str(e))
+
+    counts = MetricsRegistry.getCounts()
     for tick in ticks:
+      key = ('algo_ticks_total', (tick.tradingSymbol,))
+      counts[key] = counts.get(key, 0) + 1
       for listener in self.tickListeners:
         try:
           listener(tick)
         except Exception as e:
+          MetricsRegistry.inc('algo_listener_exceptions_total', ('tick',))
+          logging.error('BaseTicker: Exception from listener callback function. Error => %s', str(e))
+      symbolListeners = self.symbolToTickListenersMap.get(tick.tradingSymbol)
+      if symbolListeners == None:
+        continue
+      for listener in symbolListeners:
+        try:
+          listener(tick)
+        except Exception as e:
+          MetricsRegistry.inc('algo_listener_exceptions_total', ('symbolTick',))
           logging.error('BaseTicker: Exception from listener callback function. Error => %s', str(e))
 
   def onConnect(self):
@@ -49,6 +92,11 @@ class BaseTicker:
   def onMaxReconnectsAttempt(self):
     logging.error('Ticker max auto reconnects attempted and giving up..')
 
-  def onOrderUpdate(self, data):
+  def onOrderUpdate(self, orderId, data):
     #logging.info('Ticker: order update %s', data)
-    pass
+    for listener in self.orderUpdateListeners:
+      try:
+        listener(orderId, data)
+      except Exception as e:
+        MetricsRegistry.inc('algo_listener_exceptions_total', ('orderUpdate',))
+        logging.error('BaseTicker: Exception from order update listener callback function. Error => %s', str(e))
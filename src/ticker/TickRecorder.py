@@ -0,0 +1,104 @@
+import os
+import logging
+import shutil
+import struct
+import threading
+from datetime import datetime
+
+from instruments.Instruments import Instruments
+from utils.Utils import Utils
+
+class TickRecorder:
+  # Records every tick received by the ticker into per day, per instrument files so that the day can be replayed later
+  # (see backtest.RecordedTickSource). Files are deployDir/recordings/<date>/<tradingSymbol>.ticks and a copy of the
+  # instruments of the day is kept as instruments.cache in the same directory.
+  # Each tick is a fixed width 12 byte record (recordFormat) so a file is memory mapped and read without parsing:
+  #   milli seconds since midnight (uint32), price in paise (int32), traded quantity (uint32)
+  # A day of ticks of a few hundred instruments takes tens of MB.
+  # Ticker thread only packs the records into in-memory buffers. Buffers are appended to the files by the writer thread
+  # once every flushIntervalSeconds so the ticker thread never waits on disk.
+  recordFormat = '<IiI'
+  recordStruct = struct.Struct(recordFormat)
+  fileExtension = '.ticks'
+  instrumentsFilename = 'instruments.cache'
+
+  def __init__(self, ticker, recordingsDir, flushIntervalSeconds = 1):
+    self.recordingsDir = recordingsDir
+    self.flushIntervalSeconds = flushIntervalSeconds
+    self.symbolToBufferMap = {} # tradingSymbol => bytearray of the records not yet written
+    self.symbolToFileMap = {} # tradingSymbol => file opened for append. Used only by the writer thread
+    self.lock = threading.Lock()
+    self.stopEvent = threading.Event()
+    self.dayDir = None
+    self.dayStartEpoch = 0
+    self.numTicks = 0
+    self.numInstruments = 0
+    self.numBytesWritten = 0
+    self.startDay(Utils.getTodayDateStr())
+    ticker.registerBatchListener(self.onTicks)
+    self.writerThread = threading.Thread(target=self.runWriter, name='TickRecorder', daemon=True)
+    self.writerThread.start()
+    logging.info('TickRecorder: Recording ticks to %s', self.dayDir)
+
+  def startDay(self, dateStr):
+    self.dayDir = os.path.join(self.recordingsDir, dateStr)
+    if os.path.exists(self.dayDir) == False:
+      os.makedirs(self.dayDir)
+    self.dayStartEpoch = Utils.getEpoch(datetime.strptime(dateStr, Utils.dateFormat))
+    # Instruments of the day are needed to replay the day after the live instruments are refreshed
+    instrumentsCacheFilepath = Instruments.getInstrumentsCacheFilepath()
+    if os.path.exists(instrumentsCacheFilepath):
+      shutil.copyfile(instrumentsCacheFilepath, os.path.join(self.dayDir, TickRecorder.instrumentsFilename))
+
+  def onTicks(self, ticks):
+    # Called on the ticker thread with the tick views of a frame
+    pack = TickRecorder.recordStruct.pack
+    dayStartEpoch = self.dayStartEpoch
+    with self.lock:
+      for tick in ticks:
+        record = pack(int((tick.timestamp - dayStartEpoch) * 1000), round(tick.lastTradedPrice * 100), tick.lastTradedQuantity)
+        buffer = self.symbolToBufferMap.get(tick.tradingSymbol)
+        if buffer == None:
+          buffer = bytearray()
+          self.symbolToBufferMap[tick.tradingSymbol] = buffer
+        buffer += record
+      self.numTicks += len(ticks)
+
+  def runWriter(self):
+    while self.stopEvent.wait(self.flushIntervalSeconds) == False:
+      self.flush()
+    self.flush()
+    for rFile in self.symbolToFileMap.values():
+      rFile.close()
+    self.symbolToFileMap = {}
+
+  def flush(self):
+    with self.lock:
+      symbolToBufferMap = self.symbolToBufferMap
+      self.symbolToBufferMap = {}
+    for tradingSymbol in symbolToBufferMap:
+      try:
+        rFile = self.symbolToFileMap.get(tradingSymbol)
+        if rFile == None:
+          rFile = open(os.path.join(self.dayDir, tradingSymbol + TickRecorder.fileExtension), 'ab')
+          self.symbolToFileMap[tradingSymbol] = rFile
+          self.numInstruments += 1
+        rFile.write(symbolToBufferMap[tradingSymbol])
+        rFile.flush()
+        self.numBytesWritten += len(symbolToBufferMap[tradingSymbol])
+      except Exception as e:
+        logging.error('TickRecorder: Failed to write ticks of %s. Error => %s', tradingSymbol, str(e))
+
+  def stop(self):
+    # Writes the buffered ticks and closes the files
+    self.stopEvent.set()
+    self.writerThread.join()
+    logging.info('TickRecorder: Recorded %d ticks (%d bytes) to %s', self.numTicks, self.numBytesWritten, self.dayDir)
+
+  def getStats(self):
+    return {
+      'dayDir': self.dayDir,
+      'ticks': self.numTicks,
+      'bytesWritten': self.numBytesWritten,
+      'instruments': self.numInstruments
+    }
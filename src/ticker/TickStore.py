@@ -0,0 +1,140 @@
+import logging
+from array import array
+
+from instruments.Instruments import Instruments
+from models.TickData import TickData
+
+class TickStore:
+  # Column store holding the latest tick of every instrument. Each instrument gets a dense slot the first time it is seen
+  # and every tick field is a typed array column indexed by that slot. Broker ticks are copied into these preallocated
+  # columns instead of creating a new models.TickData object per tick.
+  priceFields = ['lastTradedPrice', 'avgTradedPrice', 'open', 'high', 'low', 'close', 'change']
+  quantityFields = ['lastTradedQuantity', 'volume', 'totalBuyQuantity', 'totalSellQuantity']
+
+  def __init__(self, capacity = 256):
+    self.capacity = 0
+    self.numSlots = 0
+    self.tokenToSlotMap = {} # instrument token => slot
+    self.symbolToSlotMap = {} # trading symbol => slot
+    self.tradingSymbols = [] # slot => trading symbol
+    self.exchanges = [] # slot => exchange of the instrument. None when not known (backtests)
+    self.views = [] # slot => TickView. Views are created once per slot and reused for every tick
+    for field in TickStore.priceFields:
+      setattr(self, field, array('d'))
+    for field in TickStore.quantityFields:
+      setattr(self, field, array('q'))
+    self.timestamp = array('d') # epoch seconds at which the latest tick was received
+    self.grow(capacity)
+
+  def grow(self, capacity):
+    if capacity <= self.capacity:
+      return
+    numNewSlots = capacity - self.capacity
+    for field in TickStore.priceFields:
+      getattr(self, field).extend(array('d', bytes(8 * numNewSlots)))
+    for field in TickStore.quantityFields:
+      getattr(self, field).extend(array('q', bytes(8 * numNewSlots)))
+    self.timestamp.extend(array('d', bytes(8 * numNewSlots)))
+    self.capacity = capacity
+
+  def allocateSlot(self, instrumentToken, tradingSymbol, exchange = None):
+    slot = self.tokenToSlotMap.get(instrumentToken)
+    if slot != None:
+      return slot
+    slot = self.numSlots
+    if slot >= self.capacity:
+      self.grow(self.capacity * 2 if self.capacity > 0 else 256)
+    self.numSlots += 1
+    self.tokenToSlotMap[instrumentToken] = slot
+    self.symbolToSlotMap[tradingSymbol] = slot
+    self.tradingSymbols.append(tradingSymbol)
+    self.exchanges.append(exchange)
+    self.views.append(TickView(self, slot, tradingSymbol))
+    logging.info('TickStore: allocated slot %d for %s (token = %s)', slot, tradingSymbol, instrumentToken)
+    return slot
+
+  def getSlotByToken(self, instrumentToken):
+    slot = self.tokenToSlotMap.get(instrumentToken)
+    if slot == None:
+      # Symbols are normally allocated when subscribed, this is the fallback for any other token
+      isd = Instruments.getInstrumentDataByToken(instrumentToken)
+      slot = self.allocateSlot(instrumentToken, isd['tradingsymbol'], isd['exchange'])
+    return slot
+
+  def getSlotBySymbol(self, tradingSymbol):
+    return self.symbolToSlotMap.get(tradingSymbol)
+
+  def getView(self, tradingSymbol, exchange = None):
+    # When exchange is passed the view is returned only if the instrument is of that exchange (or its exchange is not known)
+    slot = self.symbolToSlotMap.get(tradingSymbol)
+    if slot == None:
+      return None
+    if exchange != None and self.exchanges[slot] != None and self.exchanges[slot] != exchange:
+      return None
+    return self.views[slot]
+
+class TickView:
+  # Lightweight read only view of the latest tick of one instrument in the TickStore.
+  # NOTE: A view always shows the latest values of its instrument. Use toTickData() to keep a copy of the tick.
+  # Tickers pass a view only for the last tick of an instrument in a frame, its earlier ticks in the frame are passed as copies.
+  __slots__ = ('store', 'slot', 'tradingSymbol')
+
+  def __init__(self, store, slot, tradingSymbol):
+    self.store = store
+    self.slot = slot
+    self.tradingSymbol = tradingSymbol
+
+  @property
+  def lastTradedPrice(self):
+    return self.store.lastTradedPrice[self.slot]
+
+  @property
+  def lastTradedQuantity(self):
+    return self.store.lastTradedQuantity[self.slot]
+
+  @property
+  def avgTradedPrice(self):
+    return self.store.avgTradedPrice[self.slot]
+
+  @property
+  def volume(self):
+    return self.store.volume[self.slot]
+
+  @property
+  def totalBuyQuantity(self):
+    return self.store.totalBuyQuantity[self.slot]
+
+  @property
+  def totalSellQuantity(self):
+    return self.store.totalSellQuantity[self.slot]
+
+  @property
+  def open(self):
+    return self.store.open[self.slot]
+
+  @property
+  def high(self):
+    return self.store.high[self.slot]
+
+  @property
+  def low(self):
+    return self.store.low[self.slot]
+
+  @property
+  def close(self):
+    return self.store.close[self.slot]
+
+  @property
+  def change(self):
+    return self.store.change[self.slot]
+
+  @property
+  def timestamp(self):
+    return self.store.timestamp[self.slot]
+
+  def toTickData(self):
+    tick = TickData(self.tradingSymbol)
+    for field in TickStore.priceFields + TickStore.quantityFields:
+      setattr(tick, field, getattr(self.store, field)[self.slot])
+    tick.timestamp = self.timestamp
+    return tick
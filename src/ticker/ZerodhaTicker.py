@@ -5,11 +5,17 @@ from kiteconnect import KiteTicker
 
 from ticker.BaseTicker import BaseTicker
 from instruments.Instruments import Instruments
-from models.TickData import TickData
+from core.QuoteCache import QuoteCache
+from ticker.TickStore import TickStore
+from core.LatencyTracker import LatencyTracker
+from utils.Clock import Clock
 
 class ZerodhaTicker(BaseTicker):
   def __init__(self):
     super().__init__("zerodha")
+    self.tickStore = TickStore()
+    # Latest ticks in the tick store serve quotes to strategies without REST calls
+    QuoteCache.setTickStore(self.tickStore)
 
   def startTicker(self):
     brokerAppDetails = self.brokerLogin.getBrokerAppDetails()
@@ -41,6 +47,7 @@ class ZerodhaTicker(BaseTicker):
       isd = Instruments.getInstrumentDataBySymbol(symbol)
       token = isd['instrument_token']
       logging.info('ZerodhaTicker registerSymbol: %s token = %s', symbol, token)
+      self.tickStore.allocateSlot(token, symbol, isd['exchange'])
       tokens.append(token)
 
     logging.info('ZerodhaTicker Subscribing tokens %s', tokens)
@@ -58,25 +65,36 @@ class ZerodhaTicker(BaseTicker):
     self.ticker.unsubscribe(tokens)
 
   def on_ticks(self, ws, brokerTicks):
-    # convert broker specific Ticks to our system specific Ticks (models.TickData) and pass to super class function
+    # copy broker specific Ticks into the tick store and pass the views of the updated instruments to super class function.
+    # Every tick of the frame is passed on, an instrument repeated in the frame gets copies for its earlier ticks.
+    if LatencyTracker.enabled == True:
+      LatencyTracker.onTicksReceived()
+    store = self.tickStore
+    timestamp = Clock.time()
     ticks = []
+    slotToIndexMap = {} # slot => index of its view in ticks
     for bTick in brokerTicks:
-      isd = Instruments.getInstrumentDataByToken(bTick['instrument_token'])
-      tradingSymbol = isd['tradingsymbol']
-      tick = TickData(tradingSymbol)
-      tick.lastTradedPrice = bTick['last_price']
-      tick.lastTradedQuantity = bTick['last_quantity']
-      tick.avgTradedPrice = bTick['average_price']
-      tick.volume = bTick['volume']
-      tick.totalBuyQuantity = bTick['buy_quantity']
-      tick.totalSellQuantity = bTick['sell_quantity']
-      tick.open = bTick['ohlc']['open']
-      tick.high = bTick['ohlc']['high']
-      tick.low = bTick['ohlc']['low']
-      tick.close = bTick['ohlc']['close']
-      tick.change = bTick['change']
-      ticks.append(tick)
-      
+      slot = store.getSlotByToken(bTick['instrument_token'])
+      index = slotToIndexMap.get(slot)
+      if index != None:
+        # Same instrument again in this frame. The view is going to show the new values so keep a copy of the earlier tick
+        ticks[index] = store.views[slot].toTickData()
+      store.lastTradedPrice[slot] = bTick['last_price']
+      store.lastTradedQuantity[slot] = bTick['last_quantity']
+      store.avgTradedPrice[slot] = bTick['average_price']
+      store.volume[slot] = bTick['volume']
+      store.totalBuyQuantity[slot] = bTick['buy_quantity']
+      store.totalSellQuantity[slot] = bTick['sell_quantity']
+      ohlc = bTick['ohlc']
+      store.open[slot] = ohlc['open']
+      store.high[slot] = ohlc['high']
+      store.low[slot] = ohlc['low']
+      store.close[slot] = ohlc['close']
+      store.change[slot] = bTick['change']
+      store.timestamp[slot] = timestamp
+      slotToIndexMap[slot] = len(ticks)
+      ticks.append(store.views[slot])
+
     self.onNewTicks(ticks)
 
   def on_connect(self, ws, response):
@@ -95,4 +113,4 @@ class ZerodhaTicker(BaseTicker):
     self.onMaxReconnectsAttempt()
 
   def on_order_update(self, ws, data):
-    self.onOrderUpdate(data)
+    self.onOrderUpdate(data['order_id'], data)
@@ -0,0 +1,64 @@
+import logging
+import threading
+import time
+
+from utils.Clock import Clock
+
+class SquareOffBatch:
+  # Exits all the trades sharing a square off deadline together. Exit legs of every trade (cancel open entry order,
+  # cancel SL order, convert target order to MARKET or place a MARKET target order) are submitted to the order execution
+  # engine at once. Each leg has its own key so the legs of all the trades run in parallel on the engine workers.
+  # Exit latency of a trade is the time from the start of the batch till all its legs are done. How late the batch
+  # started after the deadline is recorded as delay, out of which the time spent waiting for the trades being tracked
+  # at the deadline is recorded as lock wait.
+  def __init__(self, deadline, orderExecutionEngine, onTradeDone = None):
+    self.deadline = deadline # epoch seconds
+    self.orderExecutionEngine = orderExecutionEngine
+    self.onTradeDone = onTradeDone # called with (trade, stats) once all the exit legs of the trade are done
+    self.lock = threading.Lock()
+    self.tradeToLegsMap = {} # tradeID => list of (legName, job)
+    self.pendingLegsMap = {} # tradeID => number of legs not yet done
+    self.failedLegsMap = {} # tradeID => names of the legs failed
+    self.startTime = None
+    self.delaySeconds = 0
+    self.lockWaitSeconds = 0
+
+  def addTrade(self, trade, legs):
+    if len(legs) > 0:
+      self.tradeToLegsMap[trade.tradeID] = (trade, legs)
+
+  def addLockWait(self, seconds):
+    self.lockWaitSeconds += seconds
+
+  def submit(self):
+    self.startTime = time.perf_counter()
+    self.delaySeconds = max(0, Clock.time() - self.deadline)
+    for tradeID in self.tradeToLegsMap:
+      (_, legs) = self.tradeToLegsMap[tradeID]
+      self.pendingLegsMap[tradeID] = len(legs)
+      self.failedLegsMap[tradeID] = []
+    for tradeID in list(self.tradeToLegsMap):
+      (trade, legs) = self.tradeToLegsMap[tradeID]
+      for (legName, job) in legs:
+        self.orderExecutionEngine.submit(tradeID + '-' + legName, job, \
+          lambda result, error, trade=trade, legName=legName: self.onLegDone(trade, legName, error))
+
+  def onLegDone(self, trade, legName, error):
+    with self.lock:
+      if error != None:
+        self.failedLegsMap[trade.tradeID].append(legName)
+      self.pendingLegsMap[trade.tradeID] -= 1
+      if self.pendingLegsMap[trade.tradeID] > 0:
+        return
+      stats = {
+        'deadline': self.deadline,
+        'delayMillis': round(self.delaySeconds * 1000, 3),
+        'lockWaitMillis': round(self.lockWaitSeconds * 1000, 3),
+        'exitMillis': round((time.perf_counter() - self.startTime) * 1000, 3),
+        'legs': [legName for (legName, _) in self.tradeToLegsMap[trade.tradeID][1]],
+        'failedLegs': self.failedLegsMap[trade.tradeID]
+      }
+    logging.info('SquareOffBatch: Exit legs of tradeID %s done in %.3f ms (%.3f ms after deadline, %.3f ms waiting for trade locks). Failed legs = %s', \
+      trade.tradeID, stats['exitMillis'], stats['delayMillis'], stats['lockWaitMillis'], stats['failedLegs'])
+    if self.onTradeDone != None:
+      self.onTradeDone(trade, stats)
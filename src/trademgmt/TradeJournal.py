@@ -0,0 +1,159 @@
+import os
+import logging
+import json
+import threading
+
+from trademgmt.TradeEncoder import TradeEncoder
+
+class TradeJournal:
+  # Write ahead journal of trades. Trades are marked dirty (markDirty()) by TradeManager whenever they change and on every
+  # save only the dirty trades are serialized. Trades whose record changed since the last save are appended to
+  # trades.journal as compact json records (one trade per line, orders included). The journal is compacted into the
+  # trades.json snapshot once it grows beyond compactAfterRecords. On load the snapshot is read and the journal replayed.
+  # Every compaction starts a new generation. The snapshot keeps its generation and the journal starts with a header
+  # line of the generation its records belong to, so a journal left behind by a crash in the middle of a compaction
+  # (snapshot replaced but journal not yet truncated) is of an older generation and is not replayed over the snapshot.
+  def __init__(self, tradesDir, compactAfterRecords = 1000):
+    self.snapshotFilepath = os.path.join(tradesDir, 'trades.json')
+    self.journalFilepath = os.path.join(tradesDir, 'trades.journal')
+    self.compactAfterRecords = compactAfterRecords
+    self.tradeIDToLastRecordMap = {} # tradeID => last json record written for the trade
+    self.numJournalRecords = 0
+    self.journalFile = None
+    self.generation = 0 # generation of the snapshot. 0 when there is no snapshot or it is saved by older versions as a plain list
+    self.dirtyTradeIDs = set() # tradeIDs of the trades changed since the last save
+    self.lock = threading.Lock() # Guards dirtyTradeIDs
+
+  def load(self):
+    # returns the list of trades json data from snapshot + journal
+    tradeIDToDataMap = {}
+    self.generation = 0
+    if os.path.exists(self.snapshotFilepath):
+      with open(self.snapshotFilepath, 'r') as sFile:
+        snapshotData = json.loads(sFile.read())
+      if isinstance(snapshotData, list):
+        tradesData = snapshotData # saved by older versions
+      else:
+        self.generation = snapshotData['generation']
+        tradesData = snapshotData['trades']
+      for tradeData in tradesData:
+        tradeIDToDataMap[tradeData['tradeID']] = tradeData
+
+    numReplayed = 0
+    if os.path.exists(self.journalFilepath):
+      with open(self.journalFilepath, 'r') as jFile:
+        lines = jFile.readlines()
+      journalGeneration = 0
+      numStaleRecords = 0
+      validLines = []
+      for (index, line) in enumerate(lines):
+        try:
+          data = json.loads(line)
+        except ValueError:
+          if index == len(lines) - 1:
+            # Last record can be partially written if the app crashed while writing it. It is dropped below so that new records are not appended to it.
+            logging.warn('TradeJournal: Dropping incomplete last record of journal %s', self.journalFilepath)
+          else:
+            logging.error('TradeJournal: Skipping corrupt record at line %d of journal %s', index + 1, self.journalFilepath)
+            validLines.append(line)
+          continue
+        validLines.append(line if line.endswith('\n') else line + '\n')
+        if 'tradeID' not in data:
+          journalGeneration = data['generation'] # header
+          continue
+        if journalGeneration != self.generation:
+          numStaleRecords += 1
+          continue
+        tradeIDToDataMap[data['tradeID']] = data
+        numReplayed += 1
+      if journalGeneration != self.generation:
+        # Left behind by a crash during compaction (or truncated before its header got written). Start it afresh
+        if numStaleRecords > 0:
+          logging.warn('TradeJournal: Not replaying %d records of journal %s of generation %d over snapshot of generation %d', \
+            numStaleRecords, self.journalFilepath, journalGeneration, self.generation)
+        validLines = [TradeJournal.toHeader(self.generation)]
+        numReplayed = 0
+      if len(validLines) != len(lines) or (len(lines) > 0 and lines[-1].endswith('\n') == False):
+        with open(self.journalFilepath, 'w') as jFile:
+          jFile.writelines(validLines)
+      self.numJournalRecords = numReplayed
+
+    tradesData = list(tradeIDToDataMap.values())
+    logging.info('TradeJournal: Loaded %d trades from snapshot %s after replaying %d journal records', len(tradesData), self.snapshotFilepath, numReplayed)
+    return tradesData
+
+  def markDirty(self, trade):
+    with self.lock:
+      self.dirtyTradeIDs.add(trade.tradeID)
+
+  def save(self, trades):
+    # Appends the changed trades to journal and returns the number of trades written.
+    # Only the dirty trades and the trades never saved before are serialized.
+    with self.lock:
+      dirtyTradeIDs = self.dirtyTradeIDs
+      self.dirtyTradeIDs = set()
+    numChanged = 0
+    records = []
+    for trade in trades:
+      if trade.tradeID not in dirtyTradeIDs and trade.tradeID in self.tradeIDToLastRecordMap:
+        continue
+      record = TradeJournal.toRecord(trade)
+      if self.tradeIDToLastRecordMap.get(trade.tradeID) == record:
+        continue
+      self.tradeIDToLastRecordMap[trade.tradeID] = record
+      records.append(record)
+      numChanged += 1
+
+    if numChanged == 0:
+      return 0
+
+    if self.numJournalRecords + numChanged >= self.compactAfterRecords:
+      self.compact(trades)
+      return numChanged
+
+    if self.journalFile == None:
+      self.journalFile = open(self.journalFilepath, 'a')
+      if self.journalFile.tell() == 0:
+        self.journalFile.write(TradeJournal.toHeader(self.generation))
+    self.journalFile.write('\n'.join(records) + '\n')
+    self.journalFile.flush()
+    os.fsync(self.journalFile.fileno())
+    self.numJournalRecords += numChanged
+    return numChanged
+
+  def compact(self, trades):
+    # Write full snapshot of the next generation to a temp file, atomically replace the old snapshot and then truncate
+    # the journal. If the app crashes before the journal is truncated its records are of the older generation and
+    # are ignored by load().
+    generation = self.generation + 1
+    tmpFilepath = self.snapshotFilepath + '.tmp'
+    with open(tmpFilepath, 'w') as tFile:
+      json.dump({'generation': generation, 'trades': trades}, tFile, indent=2, cls=TradeEncoder)
+      tFile.flush()
+      os.fsync(tFile.fileno())
+    os.replace(tmpFilepath, self.snapshotFilepath)
+    self.generation = generation
+
+    if self.journalFile != None:
+      self.journalFile.close()
+    self.journalFile = open(self.journalFilepath, 'w')
+    self.journalFile.write(TradeJournal.toHeader(generation))
+    self.journalFile.flush()
+    os.fsync(self.journalFile.fileno())
+    self.numJournalRecords = 0
+    for trade in trades:
+      self.tradeIDToLastRecordMap[trade.tradeID] = TradeJournal.toRecord(trade)
+    logging.info('TradeJournal: Compacted %d trades into snapshot %s', len(trades), self.snapshotFilepath)
+
+  def close(self):
+    if self.journalFile != None:
+      self.journalFile.close()
+      self.journalFile = None
+
+  @staticmethod
+  def toHeader(generation):
+    return json.dumps({'generation': generation}) + '\n'
+
+  @staticmethod
+  def toRecord(trade):
+    return json.dumps(trade, cls=TradeEncoder, separators=(',', ':'))
@@ -1,33 +1,72 @@
 import os
 import logging
+import threading
+import itertools
 import time
-import json
 from datetime import datetime
 
 from config.Config import getServerConfig
 from core.Controller import Controller
+from core.Scheduler import Scheduler
+from core.LatencyTracker import LatencyTracker
+from core.MetricsRegistry import MetricsRegistry
 from ticker.ZerodhaTicker import ZerodhaTicker
+from ticker.BacktestTicker import BacktestTicker
+from ticker.TickRecorder import TickRecorder
+from candles.CandleBuilder import CandleBuilder
 from trademgmt.Trade import Trade
 from trademgmt.TradeState import TradeState
 from trademgmt.TradeExitReason import TradeExitReason
-from trademgmt.TradeEncoder import TradeEncoder
+from trademgmt.TradeJournal import TradeJournal
+from trademgmt.SquareOffBatch import SquareOffBatch
 from ordermgmt.ZerodhaOrderManager import ZerodhaOrderManager
+from ordermgmt.SimulatedOrderManager import SimulatedOrderManager
+from ordermgmt.MatchingEngine import MatchingEngine
+from ordermgmt.OrderExecutionEngine import OrderExecutionEngine
 from ordermgmt.OrderInputParams import OrderInputParams
 from ordermgmt.OrderModifyParams import OrderModifyParams
 from ordermgmt.Order import Order
 from models.OrderType import OrderType
 from models.OrderStatus import OrderStatus
 from models.Direction import Direction
+from models.RequestPriority import RequestPriority
+from models.JobPriority import JobPriority
 
+from utils.Clock import Clock
 from utils.Utils import Utils
 
 class TradeManager:
   ticker = None
   trades = [] # to store all the trades
+  tradesIndex = {} # (tradingSymbol, strategy, direction, tradeState) => list of trades
+  strategyToTradesMap = {} # strategy => list of trades
+  strategyToStateCountMap = {} # strategy => {tradeState => number of trades}
   strategyToInstanceMap = {}
+  symbolToStrategiesMap = {} # tradingSymbol => {strategy => number of subscriptions}. Used to route ticks only to interested strategies
+  indexLock = threading.RLock() # Guards all the changes to tradesIndex, strategyToStateCountMap, symbolToStrategiesMap and squareOffDeadlines. Lookups on ticks are not locked
+  strategyToSubscribedSymbolsMap = {} # strategy => set of symbols explicitly declared by the strategy
   symbolToCMPMap = {}
+  orderIdToTradeMap = {} # orderId => trade. Used to apply order postbacks to the trade owning the order
+  tradesLock = threading.RLock() # Guards tracking of trades between TradeManager thread and ticker order updates
+  tradeIDToLockMap = {} # tradeID => lock held while the trade is tracked. Lets square off wait only for the trade and not the whole cycle
+  tradesRootDir = None # Directory under which trades of each day are saved. Default is deployDir/trades
   intradayTradesDir = None
+  tradeJournal = None
+  orderExecutionEngine = None # Places entry orders off the ticker thread
+  numOrderExecutionWorkers = 4 # 0 means entry orders are placed on the ticker thread itself (used in backtests)
+  orderManagers = {} # brokerName => order manager shared by all the threads
+  orderManagersLock = threading.Lock()
+  simulateOrders = False # True means orders are filled by the matching engine instead of broker. Set by paperTrading flag in server.json and by backtests
+  orderSimulationParams = {} # Optional slippageModel, latencyModel and participationRate of the matching engine
+  matchingEngine = None
+  tickRecorder = None # Records the live ticks of the day when recordTicks is set in server.json
   registeredSymbols = []
+  pendingSymbols = [] # Symbols asked to be registered before the ticker is connected
+  isTickerReady = False
+  symbolsLock = threading.Lock()
+  squareOffDeadlines = {} # intraday square off epoch => list of active trades to be squared off at that time
+  squareOffSequence = itertools.count()
+  squareOffStats = {} # tradeID => exit latency of the trade squared off at its deadline (see SquareOffBatch)
 
   @staticmethod
   def run():
@@ -43,48 +82,101 @@ class TradeManager:
 
     # check and create trades directory for today`s date
     serverConfig = getServerConfig()
-    tradesDir = os.path.join(serverConfig['deployDir'], 'trades')
+    tradesDir = TradeManager.tradesRootDir
+    if tradesDir == None:
+      tradesDir = os.path.join(serverConfig['deployDir'], 'trades')
     TradeManager.intradayTradesDir =  os.path.join(tradesDir, Utils.getTodayDateStr())
     if os.path.exists(TradeManager.intradayTradesDir) == False:
       logging.info('TradeManager: Intraday Trades Directory %s does not exist. Hence going to create.', TradeManager.intradayTradesDir)
       os.makedirs(TradeManager.intradayTradesDir)
+    TradeManager.tradeJournal = TradeJournal(TradeManager.intradayTradesDir)
+
+    # Entry orders triggered on ticks are placed by the order execution engine worker threads
+    TradeManager.orderExecutionEngine = OrderExecutionEngine('TradeManager', TradeManager.numOrderExecutionWorkers)
 
     # start ticker service
     brokerName = Controller.getBrokerName()
     if brokerName == "zerodha":
       TradeManager.ticker = ZerodhaTicker()
+    elif brokerName == "backtest":
+      TradeManager.ticker = BacktestTicker()
     #elif brokerName == "fyers" # not implemented
     # ticker = FyersTicker()
 
     TradeManager.ticker.startTicker()
-    TradeManager.ticker.registerListener(TradeManager.tickerListener)
+    if serverConfig.get('paperTrading', False) == True:
+      TradeManager.simulateOrders = True
+    if TradeManager.simulateOrders == True:
+      # Orders are filled against the ticks by the in-process matching engine and never sent to broker
+      logging.info('TradeManager: Orders will be simulated by the matching engine')
+      TradeManager.matchingEngine = MatchingEngine(TradeManager.ticker, **TradeManager.orderSimulationParams)
+    if serverConfig.get('latencyTracking', False) == True:
+      LatencyTracker.enable()
+    if serverConfig.get('recordTicks', False) == True and brokerName != "backtest":
+      TradeManager.tickRecorder = TickRecorder(TradeManager.ticker, os.path.join(serverConfig['deployDir'], 'recordings'))
+    # Candles are updated before the ticks are passed on to strategies
+    CandleBuilder.start(TradeManager.ticker)
+    TradeManager.ticker.registerBatchListener(TradeManager.tickerBatchListener, latestOnly=True)
+    TradeManager.ticker.registerOrderUpdateListener(TradeManager.orderUpdateListener)
+    MetricsRegistry.registerCollector(TradeManager.collectMetrics)
 
     # sleep for 2 seconds for ticker connection establishment
-    time.sleep(2)
+    Clock.sleep(2)
+    with TradeManager.symbolsLock:
+      TradeManager.isTickerReady = True
+      pendingSymbols = TradeManager.pendingSymbols
+      TradeManager.pendingSymbols = []
+    TradeManager.registerSymbols(pendingSymbols)
 
     # Load all trades from json files to app memory
     TradeManager.loadAllTradesFromFile()
 
-    # track and update trades in a loop
-    while True:
-      if Utils.isMarketClosedForTheDay():
-        logging.info('TradeManager: Stopping TradeManager as market closed.')
-        break
+    # Track and update trades every 30 seconds till market closes. Runs on its own thread as it calls broker apis
+    Scheduler.addJob('TradeManager', TradeManager.trackAllTrades, intervalSeconds=30, \
+      endTime=Utils.getEpoch(Utils.getMarketEndTime()), priority=JobPriority.HIGH, runOnThread=True, onEnd=TradeManager.stop)
 
-      try:
-        # Fetch all order details from broker and update orders in each trade
-        TradeManager.fetchAndUpdateAllTradeOrders()
-        # track each trade and take necessary action
-        TradeManager.trackAndUpdateAllTrades()
-      except Exception as e:
-        logging.exception("Exception in TradeManager Main thread")
+  @staticmethod
+  def trackAllTrades():
+    startTime = time.perf_counter()
+    try:
+      # Fetch all order details from broker and update orders in each trade.
+      # Order postbacks from ticker update the orders immediately, this is the safety net to reconcile any missed updates.
+      changedOrders = TradeManager.fetchAndUpdateAllTradeOrders()
+      # track each trade and take necessary action
+      with TradeManager.tradesLock:
+        TradeManager.trackAndUpdateAllTrades(changedOrders)
+    except Exception as e:
+      logging.exception("Exception in TradeManager tracking")
 
-      # save updated data to json file
-      TradeManager.saveAllTradesToFile()
-      
-      # sleep for 30 seconds and then continue
-      time.sleep(30)
-      logging.info('TradeManager: Main thread woke up..')
+    # save updated data to json file
+    TradeManager.saveAllTradesToFile()
+    MetricsRegistry.observe('algo_trademanager_cycle_seconds', time.perf_counter() - startTime)
+
+  @staticmethod
+  def collectMetrics():
+    MetricsRegistry.clearGauge('algo_open_trades')
+    for strategy in list(TradeManager.strategyToInstanceMap):
+      stateCountMap = TradeManager.strategyToStateCountMap.get(strategy, {})
+      MetricsRegistry.setGauge('algo_open_trades', (strategy,), stateCountMap.get(TradeState.ACTIVE, 0))
+    if TradeManager.orderExecutionEngine != None:
+      TradeManager.orderExecutionEngine.collectMetrics()
+    for orderManager in list(TradeManager.orderManagers.values()):
+      if orderManager == None:
+        continue
+      stats = orderManager.getConnectionStats()
+      if len(stats) == 0:
+        continue
+      MetricsRegistry.setGauge('algo_broker_connections_total', (orderManager.broker,), stats['connectionsCreated'])
+      MetricsRegistry.setGauge('algo_broker_requests_total', (orderManager.broker, 'new'), stats['requests'] - stats['reusedConnectionRequests'])
+      MetricsRegistry.setGauge('algo_broker_requests_total', (orderManager.broker, 'reused'), stats['reusedConnectionRequests'])
+
+  @staticmethod
+  def stop():
+    logging.info('TradeManager: Stopping TradeManager as market closed.')
+    if TradeManager.tickRecorder != None:
+      TradeManager.tickRecorder.stop()
+    if LatencyTracker.enabled == True:
+      LatencyTracker.logStats()
 
   @staticmethod
   def registerStrategy(strategyInstance):
@@ -92,29 +184,46 @@ class TradeManager:
 
   @staticmethod
   def loadAllTradesFromFile():
-    tradesFilepath = os.path.join(TradeManager.intradayTradesDir, 'trades.json')
-    if os.path.exists(tradesFilepath) == False:
-      logging.warn('TradeManager: loadAllTradesFromFile() Trades Filepath %s does not exist', tradesFilepath)
+    tradesData = TradeManager.tradeJournal.load()
+    if len(tradesData) == 0:
+      logging.warn('TradeManager: loadAllTradesFromFile() No trades found in %s', TradeManager.intradayTradesDir)
       return
     TradeManager.trades = []
-    tFile = open(tradesFilepath, 'r')
-    tradesData = json.loads(tFile.read())
+    TradeManager.orderIdToTradeMap = {}
+    with TradeManager.indexLock:
+      TradeManager.tradesIndex = {}
+      TradeManager.strategyToTradesMap = {}
+      TradeManager.strategyToStateCountMap = {}
+      TradeManager.symbolToStrategiesMap = {}
+      TradeManager.squareOffDeadlines = {}
+      for strategy in TradeManager.strategyToSubscribedSymbolsMap:
+        for symbol in TradeManager.strategyToSubscribedSymbolsMap[strategy]:
+          TradeManager.addSymbolRoute(symbol, strategy)
     for tr in tradesData:
       trade = TradeManager.convertJSONToTrade(tr)
       logging.info('loadAllTradesFromFile trade => %s', trade)
       TradeManager.trades.append(trade)
-      if trade.tradingSymbol not in TradeManager.registeredSymbols:
-        # Algo register symbols with ticker
-        TradeManager.ticker.registerSymbols([trade.tradingSymbol])
-        TradeManager.registeredSymbols.append(trade.tradingSymbol)
-    logging.info('TradeManager: Successfully loaded %d trades from json file %s', len(TradeManager.trades), tradesFilepath)
+      TradeManager.addTradeToIndex(trade)
+      TradeManager.registerTradeOrders(trade)
+      # Algo register symbols with ticker
+      TradeManager.registerSymbols([trade.tradingSymbol])
+    # Start with a fresh snapshot and an empty journal
+    TradeManager.tradeJournal.compact(TradeManager.trades)
+    logging.info('TradeManager: Successfully loaded %d trades from %s', len(TradeManager.trades), TradeManager.intradayTradesDir)
 
   @staticmethod
   def saveAllTradesToFile():
-    tradesFilepath = os.path.join(TradeManager.intradayTradesDir, 'trades.json')
-    with open(tradesFilepath, 'w') as tFile:
-      json.dump(TradeManager.trades, tFile, indent=2, cls=TradeEncoder)
-    logging.info('TradeManager: Saved %d trades to file %s', len(TradeManager.trades), tradesFilepath)
+    # Only the trades changed since the last save are appended to the trades journal
+    startTime = time.perf_counter()
+    numSaved = TradeManager.tradeJournal.save(TradeManager.trades)
+    MetricsRegistry.observe('algo_trades_save_seconds', time.perf_counter() - startTime)
+    logging.info('TradeManager: Saved %d changed trades out of %d to trades journal', numSaved, len(TradeManager.trades))
+
+  @staticmethod
+  def markTradeDirty(trade):
+    # Only the trades marked dirty since the last save are serialized to trades journal. Mark a trade whenever it changes
+    if TradeManager.tradeJournal != None:
+      TradeManager.tradeJournal.markDirty(trade)
 
   @staticmethod
   def addNewTrade(trade):
@@ -127,11 +236,11 @@ class TradeManager:
         return
     # Add the new trade to the list
     TradeManager.trades.append(trade)
+    TradeManager.addTradeToIndex(trade)
+    TradeManager.markTradeDirty(trade)
     logging.info('TradeManager: trade %s added successfully to the list', trade.tradeID)
     # Register the symbol with ticker so that we will start getting ticks for this symbol
-    if trade.tradingSymbol not in TradeManager.registeredSymbols:
-      TradeManager.ticker.registerSymbols([trade.tradingSymbol])
-      TradeManager.registeredSymbols.append(trade.tradingSymbol)
+    TradeManager.registerSymbols([trade.tradingSymbol])
     # Also add the trade to strategy trades list
     strategyInstance = TradeManager.strategyToInstanceMap[trade.strategy]
     if strategyInstance != None:
@@ -141,55 +250,197 @@ class TradeManager:
   def disableTrade(trade, reason):
     if trade != None:
       logging.info('TradeManager: Going to disable trade ID %s with the reason %s', trade.tradeID, reason)
-      trade.tradeState = TradeState.DISABLED
+      TradeManager.setTradeState(trade, TradeState.DISABLED)
+
+  @staticmethod
+  def addTradeToIndex(trade):
+    # Index the trade by strategy and by (symbol, strategy, direction, state) so that lookups on every tick do not scan all trades
+    with TradeManager.indexLock:
+      TradeManager.strategyToTradesMap.setdefault(trade.strategy, []).append(trade)
+      TradeManager.addTradeToStateIndex(trade)
+
+  @staticmethod
+  def addTradeToStateIndex(trade):
+    # NOTE: Called with indexLock held
+    key = (trade.tradingSymbol, trade.strategy, trade.direction, trade.tradeState)
+    TradeManager.tradesIndex.setdefault(key, []).append(trade)
+    stateCountMap = TradeManager.strategyToStateCountMap.setdefault(trade.strategy, {})
+    stateCountMap[trade.tradeState] = stateCountMap.get(trade.tradeState, 0) + 1
+    if trade.tradeState == TradeState.CREATED:
+      # A created trade waits for ticks of its symbol so route those ticks to its strategy
+      TradeManager.addSymbolRoute(trade.tradingSymbol, trade.strategy)
+    elif trade.tradeState == TradeState.ACTIVE and trade.intradaySquareOffTimestamp != None:
+      TradeManager.addSquareOffDeadline(trade)
+
+  @staticmethod
+  def removeTradeFromStateIndex(trade):
+    # NOTE: Called with indexLock held
+    key = (trade.tradingSymbol, trade.strategy, trade.direction, trade.tradeState)
+    indexedTrades = TradeManager.tradesIndex.get(key)
+    if indexedTrades == None or trade not in indexedTrades:
+      return
+    indexedTrades.remove(trade)
+    if len(indexedTrades) == 0:
+      del TradeManager.tradesIndex[key]
+    stateCountMap = TradeManager.strategyToStateCountMap[trade.strategy]
+    stateCountMap[trade.tradeState] -= 1
+    if trade.tradeState == TradeState.CREATED:
+      TradeManager.removeSymbolRoute(trade.tradingSymbol, trade.strategy)
+
+  @staticmethod
+  def setTradeState(trade, tradeState):
+    # NOTE: Always change the trade state through this function so that the trades index stays in sync. It is called
+    # from ticker thread, order workers and TradeManager thread so the index is changed only under indexLock.
+    with TradeManager.indexLock:
+      if trade.tradeState == tradeState:
+        return
+      TradeManager.removeTradeFromStateIndex(trade)
+      trade.tradeState = tradeState
+      TradeManager.addTradeToStateIndex(trade)
+    TradeManager.markTradeDirty(trade)
+
+  @staticmethod
+  def registerSymbols(symbols):
+    # Registers the symbols with ticker so that we start getting their ticks. Symbols asked for before the ticker is
+    # connected are registered once it is connected.
+    with TradeManager.symbolsLock:
+      newSymbols = []
+      for symbol in symbols:
+        if symbol not in TradeManager.registeredSymbols and symbol not in TradeManager.pendingSymbols and symbol not in newSymbols:
+          newSymbols.append(symbol)
+      if len(newSymbols) == 0:
+        return
+      if TradeManager.isTickerReady == False:
+        TradeManager.pendingSymbols.extend(newSymbols)
+        return
+      TradeManager.registeredSymbols.extend(newSymbols)
+    TradeManager.ticker.registerSymbols(newSymbols)
+
+  @staticmethod
+  def subscribeStrategyToSymbols(strategy, symbols):
+    # Strategies can explicitly declare the symbols they are interested in. Ticks of the other symbols are
+    # routed to a strategy only while it has CREATED trades on them.
+    with TradeManager.indexLock:
+      subscribedSymbols = TradeManager.strategyToSubscribedSymbolsMap.setdefault(strategy, set())
+      for symbol in symbols:
+        if symbol in subscribedSymbols:
+          continue
+        subscribedSymbols.add(symbol)
+        TradeManager.addSymbolRoute(symbol, strategy)
+    logging.info('TradeManager: strategy %s subscribed to symbols %s', strategy, symbols)
+
+  @staticmethod
+  def addSymbolRoute(tradingSymbol, strategy):
+    strategies = TradeManager.symbolToStrategiesMap.setdefault(tradingSymbol, {})
+    strategies[strategy] = strategies.get(strategy, 0) + 1
+
+  @staticmethod
+  def removeSymbolRoute(tradingSymbol, strategy):
+    strategies = TradeManager.symbolToStrategiesMap.get(tradingSymbol)
+    if strategies == None or strategy not in strategies:
+      return
+    strategies[strategy] -= 1
+    if strategies[strategy] <= 0:
+      del strategies[strategy]
+    if len(strategies) == 0:
+      del TradeManager.symbolToStrategiesMap[tradingSymbol]
+
+  @staticmethod
+  def getStrategiesForSymbol(tradingSymbol):
+    strategies = TradeManager.symbolToStrategiesMap.get(tradingSymbol)
+    if strategies == None:
+      return []
+    return list(strategies)
+
+  @staticmethod
+  def tickerBatchListener(ticks):
+    # ticks contains only the latest tick of each symbol received in a frame
+    TradeManager.symbolToCMPMap.update((tick.tradingSymbol, tick.lastTradedPrice) for tick in ticks) # Store the latest ticks in map
+    if LatencyTracker.enabled == True:
+      LatencyTracker.onTicksDispatched()
+    for tick in ticks:
+      try:
+        TradeManager.processTick(tick)
+      except Exception as e:
+        MetricsRegistry.inc('algo_listener_exceptions_total', ('strategyTick',))
+        logging.error('TradeManager: Exception while processing tick of %s. Error => %s', tick.tradingSymbol, str(e))
 
   @staticmethod
   def tickerListener(tick):
     # logging.info('tickerLister: new tick received for %s = %f', tick.tradingSymbol, tick.lastTradedPrice);
     TradeManager.symbolToCMPMap[tick.tradingSymbol] = tick.lastTradedPrice # Store the latest tick in map
-    # On each new tick, get a created trade and call its strategy whether to place trade or not
-    for strategy in TradeManager.strategyToInstanceMap:
+    TradeManager.processTick(tick)
+
+  @staticmethod
+  def processTick(tick):
+    # On each new tick, get a created trade and call its strategy whether to place trade or not.
+    # Only the strategies subscribed to this symbol are checked.
+    trackLatency = LatencyTracker.enabled
+    for strategy in TradeManager.getStrategiesForSymbol(tick.tradingSymbol):
       longTrade = TradeManager.getUntriggeredTrade(tick.tradingSymbol, strategy, Direction.LONG)
       shortTrade = TradeManager.getUntriggeredTrade(tick.tradingSymbol, strategy, Direction.SHORT)
       if longTrade == None and shortTrade == None:
         continue
-      strategyInstance = TradeManager.strategyToInstanceMap[strategy]
+      strategyInstance = TradeManager.strategyToInstanceMap.get(strategy)
+      if strategyInstance == None:
+        continue
+      if trackLatency == True:
+        decisionHistogram = LatencyTracker.getDecisionHistogram(strategy)
       if longTrade != None:
-        if strategyInstance.shouldPlaceTrade(longTrade, tick):
+        if trackLatency == True:
+          dispatchNanos = time.perf_counter_ns()
+        placeTrade = strategyInstance.shouldPlaceTrade(longTrade, tick)
+        if trackLatency == True:
+          decisionNanos = time.perf_counter_ns()
+          decisionHistogram.record(decisionNanos - dispatchNanos)
+        if placeTrade == True:
           # place the longTrade
-          isSuccess = TradeManager.executeTrade(longTrade)
-          if isSuccess == True:
-            # set longTrade state to ACTIVE
-            longTrade.tradeState = TradeState.ACTIVE
-            longTrade.startTimestamp = Utils.getEpoch()
-            continue
+          if trackLatency == True:
+            LatencyTracker.onTrigger(strategy, longTrade.tradeID, decisionNanos)
+          TradeManager.submitTrade(longTrade)
+          continue
       
       if shortTrade != None:
-        if strategyInstance.shouldPlaceTrade(shortTrade, tick):
+        if trackLatency == True:
+          dispatchNanos = time.perf_counter_ns()
+        placeTrade = strategyInstance.shouldPlaceTrade(shortTrade, tick)
+        if trackLatency == True:
+          decisionNanos = time.perf_counter_ns()
+          decisionHistogram.record(decisionNanos - dispatchNanos)
+        if placeTrade == True:
           # place the shortTrade
-          isSuccess = TradeManager.executeTrade(shortTrade)
-          if isSuccess == True:
-            # set shortTrade state to ACTIVE
-            shortTrade.tradeState = TradeState.ACTIVE
-            shortTrade.startTimestamp = Utils.getEpoch()
+          if trackLatency == True:
+            LatencyTracker.onTrigger(strategy, shortTrade.tradeID, decisionNanos)
+          TradeManager.submitTrade(shortTrade)
+
+  @staticmethod
+  def submitTrade(trade):
+    # Set trade state to ACTIVE right away so that the next ticks do not trigger it again and
+    # hand over the entry order placement to order execution engine without blocking the ticker thread
+    TradeManager.setTradeState(trade, TradeState.ACTIVE)
+    trade.startTimestamp = Utils.getEpoch()
+    TradeManager.orderExecutionEngine.submit(trade.tradeID, lambda: TradeManager.executeTrade(trade), \
+      lambda isSuccess, error: TradeManager.onTradeExecuted(trade, isSuccess))
+
+  @staticmethod
+  def onTradeExecuted(trade, isSuccess):
+    if isSuccess == True:
+      return
+    # Entry order could not be placed. Move the trade back to CREATED so that it gets triggered again on next ticks
+    with TradeManager.tradesLock:
+      trade.startTimestamp = None
+      TradeManager.setTradeState(trade, TradeState.CREATED)
   
   @staticmethod
   def getUntriggeredTrade(tradingSymbol, strategy, direction):
-    trade = None
-    for tr in TradeManager.trades:
-      if tr.tradeState == TradeState.DISABLED:
-        continue
-      if tr.tradeState != TradeState.CREATED:
-        continue
-      if tr.tradingSymbol != tradingSymbol:
-        continue
-      if tr.strategy != strategy:
-        continue
-      if tr.direction != direction:
-        continue
-      trade = tr
-      break
-    return trade
+    untriggeredTrades = TradeManager.tradesIndex.get((tradingSymbol, strategy, direction, TradeState.CREATED))
+    if untriggeredTrades == None:
+      return None
+    try:
+      return untriggeredTrades[0]
+    except IndexError:
+      # Looked up without indexLock so the list can get emptied by another thread right after the lookup
+      return None
 
   @staticmethod
   def executeTrade(trade):
@@ -204,11 +455,19 @@ class TradeManager:
     oip.qty = trade.qty
     if trade.isFutures == True or trade.isOptions == True:
       oip.isFnO = True
+    trackLatency = LatencyTracker.enabled
+    if trackLatency == True:
+      submitNanos = LatencyTracker.onSubmit(trade.tradeID)
     try:
       trade.entryOrder = TradeManager.getOrderManager().placeOrder(oip)
     except Exception as e:
+      if trackLatency == True:
+        LatencyTracker.onAck(trade.tradeID, submitNanos, False)
       logging.error('TradeManager: Execute trade failed for tradeID %s: Error => %s', trade.tradeID, str(e))
       return False
+    if trackLatency == True:
+      LatencyTracker.onAck(trade.tradeID, submitNanos)
+    TradeManager.registerTradeOrders(trade)
 
     logging.info('TradeManager: Execute trade successful for %s and entryOrder %s', trade, trade.entryOrder)
     return True
@@ -224,19 +483,146 @@ class TradeManager:
       if trade.targetOrder != None:
         allOrders.append(trade.targetOrder)
 
-    TradeManager.getOrderManager().fetchAndUpdateAllOrderDetails(allOrders)
+    changedOrders = TradeManager.getOrderManager().fetchAndUpdateAllOrderDetails(allOrders)
+    for order in changedOrders:
+      trade = TradeManager.orderIdToTradeMap.get(order.orderId)
+      if trade != None:
+        TradeManager.markTradeDirty(trade)
+    return changedOrders
 
   @staticmethod
-  def trackAndUpdateAllTrades():
-    for trade in TradeManager.trades:
+  def registerTradeOrders(trade):
+    for order in [trade.entryOrder, trade.slOrder, trade.targetOrder]:
+      if order != None and order.orderId != None:
+        TradeManager.orderIdToTradeMap[order.orderId] = trade
+    # Called whenever an order of the trade is placed
+    TradeManager.markTradeDirty(trade)
+
+  @staticmethod
+  def getTradeOrderById(trade, orderId):
+    for order in [trade.entryOrder, trade.slOrder, trade.targetOrder]:
+      if order != None and order.orderId == orderId:
+        return order
+    return None
+
+  @staticmethod
+  def orderUpdateListener(orderId, brokerOrder):
+    # Called from ticker thread on every order postback from broker
+    trade = TradeManager.orderIdToTradeMap.get(orderId)
+    if trade == None:
+      # Either not placed by algo or postback received before the order got registered. Periodic poll takes care of the latter.
+      return
+    order = TradeManager.getTradeOrderById(trade, orderId)
+    if order == None:
+      return
+    # Only the order fields are updated here. Acting on the update calls broker apis (place SL/target order, cancel the
+    # other leg) so it is handed over to order execution engine keyed by tradeID, which also keeps it after the entry order placement.
+    TradeManager.getOrderManager().updateOrder(order, brokerOrder)
+    TradeManager.markTradeDirty(trade)
+    logging.info('TradeManager: Order update received for tradeID %s => %s', trade.tradeID, order)
+    if trade.tradeState == TradeState.ACTIVE:
+      TradeManager.orderExecutionEngine.submit(trade.tradeID, lambda: TradeManager.trackTradeOnOrderUpdate(trade))
+
+  @staticmethod
+  def trackTradeOnOrderUpdate(trade):
+    with TradeManager.tradesLock:
       if trade.tradeState == TradeState.ACTIVE:
-        TradeManager.trackEntryOrder(trade)
-        TradeManager.trackSLOrder(trade)
-        TradeManager.trackTargetOrder(trade)
-        if trade.intradaySquareOffTimestamp != None:
-          nowEpoch = Utils.getEpoch()
-          if nowEpoch >= trade.intradaySquareOffTimestamp:
-            TradeManager.squareOffTrade(trade, TradeExitReason.SQUARE_OFF)
+        TradeManager.trackTrade(trade)
+
+  @staticmethod
+  def trackAndUpdateAllTrades(changedOrders = None):
+    # Trades whose orders changed are tracked first so that fills are acted upon before anything else.
+    # Rest of the active trades still need to be tracked on every cycle for pnl, trailing SL and square off.
+    trackedTradeIDs = set()
+    if changedOrders != None:
+      for order in changedOrders:
+        trade = TradeManager.orderIdToTradeMap.get(order.orderId)
+        if trade == None or trade.tradeID in trackedTradeIDs:
+          continue
+        trackedTradeIDs.add(trade.tradeID)
+        if trade.tradeState == TradeState.ACTIVE:
+          TradeManager.trackTrade(trade)
+
+    for trade in TradeManager.trades:
+      if trade.tradeState == TradeState.ACTIVE and trade.tradeID not in trackedTradeIDs:
+        TradeManager.trackTrade(trade)
+
+  @staticmethod
+  def trackTrade(trade):
+    if trade.entryOrder == None:
+      # Entry order is still being placed by order execution engine
+      return
+    with TradeManager.getTradeLock(trade):
+      TradeManager.trackEntryOrder(trade)
+      if trade.tradeState == TradeState.ACTIVE and trade.intradaySquareOffTimestamp != None and trade.exitReason == None:
+        # Square off is done by the deadline job (see addSquareOffDeadline()). This is the safety net if that failed.
+        # Done before tracking SL and target orders so that they see the square off in progress.
+        nowEpoch = Utils.getEpoch()
+        if nowEpoch >= trade.intradaySquareOffTimestamp:
+          TradeManager.squareOffTrade(trade, TradeExitReason.SQUARE_OFF)
+      TradeManager.trackSLOrder(trade)
+      TradeManager.trackTargetOrder(trade)
+      # cmp, pnl and trailing SL of the trade are updated on every tracking
+      TradeManager.markTradeDirty(trade)
+
+  @staticmethod
+  def getTradeLock(trade):
+    tradeLock = TradeManager.tradeIDToLockMap.get(trade.tradeID)
+    if tradeLock == None:
+      tradeLock = TradeManager.tradeIDToLockMap.setdefault(trade.tradeID, threading.RLock())
+    return tradeLock
+
+  @staticmethod
+  def addSquareOffDeadline(trade):
+    # Trades are squared off exactly at their intraday square off timestamp by a one time scheduler job per deadline.
+    # All the trades sharing a deadline are squared off together by that job. The job runs on its own thread so that
+    # the scheduler loop is not held up by it.
+    deadline = trade.intradaySquareOffTimestamp
+    with TradeManager.indexLock:
+      trades = TradeManager.squareOffDeadlines.get(deadline)
+      if trades != None:
+        if trade not in trades:
+          trades.append(trade)
+        return
+      TradeManager.squareOffDeadlines[deadline] = [trade]
+    Scheduler.addJob('SquareOff-' + str(deadline) + '-' + str(next(TradeManager.squareOffSequence)), \
+      lambda: TradeManager.squareOffTradesAtDeadline(deadline), startTime=deadline, priority=JobPriority.HIGH, runOnThread=True)
+
+  @staticmethod
+  def squareOffTradesAtDeadline(deadline):
+    with TradeManager.indexLock:
+      trades = TradeManager.squareOffDeadlines.pop(deadline, [])
+    batch = SquareOffBatch(deadline, TradeManager.orderExecutionEngine, TradeManager.onTradeSquaredOff)
+    # Only the lock of each trade is taken (not tradesLock) so a tracking cycle in progress delays the square off
+    # only when it is tracking the same trade right now. The time spent waiting for it is recorded by the batch.
+    for trade in trades:
+      waitStartTime = time.perf_counter()
+      with TradeManager.getTradeLock(trade):
+        batch.addLockWait(time.perf_counter() - waitStartTime)
+        if trade.tradeState != TradeState.ACTIVE or trade.exitReason != None:
+          continue
+        logging.info('TradeManager: Square off deadline reached for tradeID %s', trade.tradeID)
+        trade.exitReason = TradeExitReason.SQUARE_OFF
+        TradeManager.markTradeDirty(trade)
+        batch.addTrade(trade, TradeManager.getSquareOffLegs(trade))
+    if len(batch.tradeToLegsMap) == 0:
+      return
+    logging.info('TradeManager: Squaring off %d trades of deadline %s', len(batch.tradeToLegsMap), datetime.fromtimestamp(deadline))
+    batch.submit()
+
+  @staticmethod
+  def onTradeSquaredOff(trade, stats):
+    TradeManager.squareOffStats[trade.tradeID] = stats
+    if len(stats['failedLegs']) > 0:
+      # Let the next tracking cycle square off the trade again
+      with TradeManager.getTradeLock(trade):
+        if trade.tradeState == TradeState.ACTIVE:
+          trade.exitReason = None
+          TradeManager.markTradeDirty(trade)
+
+  @staticmethod
+  def getSquareOffStats():
+    return dict(TradeManager.squareOffStats)
 
   @staticmethod
   def trackEntryOrder(trade):
@@ -247,7 +633,7 @@ class TradeManager:
       return
 
     if trade.entryOrder.orderStatus == OrderStatus.CANCELLED or trade.entryOrder.orderStatus == OrderStatus.REJECTED:
-      trade.tradeState = TradeState.CANCELLED
+      TradeManager.setTradeState(trade, TradeState.CANCELLED)
 
     trade.filledQty = trade.entryOrder.filledQty
     if trade.filledQty > 0:
@@ -262,7 +648,10 @@ class TradeManager:
       return
     if trade.stopLoss == 0: # Do not place SL order if no stopLoss provided
       return
+    isExiting = trade.exitReason != None # square off in progress. SL order is being cancelled by the algo itself
     if trade.slOrder == None:
+      if isExiting == True:
+        return
       # Place SL order
       TradeManager.placeSLOrder(trade)
     else:
@@ -274,6 +663,10 @@ class TradeManager:
         # Make sure to cancel target order if exists
         TradeManager.cancelTargetOrder(trade)
 
+      elif trade.slOrder.orderStatus == OrderStatus.CANCELLED and isExiting == True:
+        # Cancelled by the square off. Trade gets completed once the exit order is filled (see trackExitOrder())
+        pass
+
       elif trade.slOrder.orderStatus == OrderStatus.CANCELLED:
         # SL order cancelled outside of algo (manually or by broker or by exchange)
         logging.error('SL order %s for tradeID %s cancelled outside of Algo. Setting the trade as completed with exit price as current market price.', trade.slOrder.orderId, trade.tradeID)
@@ -282,7 +675,7 @@ class TradeManager:
         # Cancel target order if exists
         TradeManager.cancelTargetOrder(trade)
 
-      else:
+      elif isExiting == False:
         TradeManager.checkAndUpdateTrailSL(trade)
 
   @staticmethod
@@ -302,6 +695,7 @@ class TradeManager:
     if updateSL == True:
       omp = OrderModifyParams()
       omp.newTriggerPrice = newTrailSL
+      omp.priority = RequestPriority.EXIT
       try:
         oldSL = trade.stopLoss
         TradeManager.getOrderManager().modifyOrder(trade.slOrder, omp)
@@ -314,6 +708,10 @@ class TradeManager:
   def trackTargetOrder(trade):
     if trade.tradeState != TradeState.ACTIVE:
       return
+    if trade.exitReason != None:
+      # Square off in progress. Target order is the exit order now
+      TradeManager.trackExitOrder(trade)
+      return
     if trade.target == 0: # Do not place Target order if no target provided
       return
     if trade.targetOrder == None:
@@ -335,6 +733,24 @@ class TradeManager:
         # Cancel SL order
         TradeManager.cancelSLOrder(trade)
 
+  @staticmethod
+  def trackExitOrder(trade):
+    # Tracks the MARKET target order placed (or the target order converted to MARKET) to square off the trade.
+    # No order is placed or cancelled here, the trade is completed only when the exit order is filled.
+    exitOrder = trade.targetOrder
+    if exitOrder == None:
+      # Exit order is still being placed
+      return
+    if exitOrder.orderStatus == OrderStatus.COMPLETE:
+      TradeManager.setTradeToCompleted(trade, exitOrder.averagePrice)
+      if trade.slOrder != None and trade.slOrder.orderStatus in [OrderStatus.OPEN, OrderStatus.TRIGGER_PENDING]:
+        # Position is closed, make sure SL order does not stay open if cancelling it as part of square off failed
+        TradeManager.cancelSLOrder(trade)
+    elif exitOrder.orderStatus == OrderStatus.CANCELLED or exitOrder.orderStatus == OrderStatus.REJECTED:
+      # Exit order did not go through. Let the next tracking square off the trade again with a new exit order
+      logging.error('TradeManager: Exit order %s for tradeID %s is %s. Trade will be squared off again.', exitOrder.orderId, trade.tradeID, exitOrder.orderStatus)
+      trade.exitReason = None
+
   @staticmethod
   def placeSLOrder(trade):
     oip = OrderInputParams(trade.tradingSymbol)
@@ -342,6 +758,7 @@ class TradeManager:
     oip.productType = trade.productType
     oip.orderType = OrderType.SL_MARKET
     oip.triggerPrice = trade.stopLoss
+    oip.priority = RequestPriority.EXIT
     oip.qty = trade.qty
     if trade.isFutures == True or trade.isOptions == True:
       oip.isFnO = True
@@ -350,6 +767,7 @@ class TradeManager:
     except Exception as e:
       logging.error('TradeManager: Failed to place SL order for tradeID %s: Error => %s', trade.tradeID, str(e))
       return False
+    TradeManager.registerTradeOrders(trade)
     logging.info('TradeManager: Successfully placed SL order %s for tradeID %s', trade.slOrder.orderId, trade.tradeID)
     return True
 
@@ -360,6 +778,7 @@ class TradeManager:
     oip.productType = trade.productType
     oip.orderType = OrderType.MARKET if isMarketOrder == True else OrderType.LIMIT
     oip.price = 0 if isMarketOrder == True else trade.target
+    oip.priority = RequestPriority.EXIT
     oip.qty = trade.qty
     if trade.isFutures == True or trade.isOptions == True:
       oip.isFnO = True
@@ -368,6 +787,7 @@ class TradeManager:
     except Exception as e:
       logging.error('TradeManager: Failed to place Target order for tradeID %s: Error => %s', trade.tradeID, str(e))
       return False
+    TradeManager.registerTradeOrders(trade)
     logging.info('TradeManager: Successfully placed Target order %s for tradeID %s', trade.targetOrder.orderId, trade.tradeID)
     return True
 
@@ -409,11 +829,12 @@ class TradeManager:
 
   @staticmethod
   def setTradeToCompleted(trade, exit, exitReason = None):
-    trade.tradeState = TradeState.COMPLETED
+    TradeManager.setTradeState(trade, TradeState.COMPLETED)
     trade.exit = exit
     trade.exitReason = exitReason if trade.exitReason == None else trade.exitReason
     trade.endTimestamp = Utils.getEpoch()
     trade = Utils.calculateTradePnl(trade)
+    TradeManager.markTradeDirty(trade)
     logging.info('TradeManager: setTradeToCompleted strategy = %s, symbol = %s, qty = %d, entry = %f, exit = %f, pnl = %f, exit reason = %s', trade.strategy, trade.tradingSymbol, trade.filledQty, trade.entry, trade.exit, trade.pnl, trade.exitReason)
 
   @staticmethod
@@ -423,51 +844,77 @@ class TradeManager:
       return
 
     trade.exitReason = reason
+    for (legName, leg) in TradeManager.getSquareOffLegs(trade):
+      try:
+        leg()
+      except Exception as e:
+        logging.error('TradeManager: Square off leg %s failed for tradeID %s: Error => %s', legName, trade.tradeID, str(e))
+
+  @staticmethod
+  def getSquareOffLegs(trade):
+    # Order calls to exit the trade as list of (legName, function). The legs do not depend on each other.
+    legs = []
     if trade.entryOrder != None:
       if trade.entryOrder.orderStatus == OrderStatus.OPEN:
         # Cancel entry order if it is still open (not filled or partially filled case)
-        TradeManager.cancelEntryOrder(trade)
+        legs.append(('CancelEntry', lambda: TradeManager.cancelEntryOrder(trade)))
 
     if trade.slOrder != None:
-      TradeManager.cancelSLOrder(trade)
+      legs.append(('CancelSL', lambda: TradeManager.cancelSLOrder(trade)))
 
-    if trade.targetOrder != None:
+    if trade.targetOrder != None and trade.targetOrder.orderStatus != OrderStatus.CANCELLED and trade.targetOrder.orderStatus != OrderStatus.REJECTED:
       # Change target order type to MARKET to exit position immediately
-      logging.info('TradeManager: changing target order %s to MARKET to exit position for tradeID %s', trade.targetOrder.orderId, trade.tradeID)
-      TradeManager.getOrderManager().modifyOrderToMarket(trade.targetOrder)
+      legs.append(('TargetToMarket', lambda: TradeManager.modifyTargetOrderToMarket(trade)))
     else:
       # Place new target order to exit position
-      logging.info('TradeManager: placing new target order to exit position for tradeID %s', trade.tradeID)
-      TradeManager.placeTargetOrder(trade, True)
+      legs.append(('PlaceTarget', lambda: TradeManager.placeMarketTargetOrder(trade)))
+    return legs
+
+  @staticmethod
+  def modifyTargetOrderToMarket(trade):
+    logging.info('TradeManager: changing target order %s to MARKET to exit position for tradeID %s', trade.targetOrder.orderId, trade.tradeID)
+    TradeManager.getOrderManager().modifyOrderToMarket(trade.targetOrder)
+
+  @staticmethod
+  def placeMarketTargetOrder(trade):
+    logging.info('TradeManager: placing new target order to exit position for tradeID %s', trade.tradeID)
+    if TradeManager.placeTargetOrder(trade, True) == False:
+      raise Exception('Failed to place target order to exit position for tradeID ' + trade.tradeID)
 
   @staticmethod
   def getOrderManager():
-    orderManager = None
+    # One long lived order manager per broker is shared by all the threads so that the broker session
+    # and its pooled http connections are reused for every order call
     brokerName = Controller.getBrokerName()
-    if brokerName == "zerodha":
-      orderManager = ZerodhaOrderManager()
-    #elif brokerName == "fyers": # Not implemented
+    orderManager = TradeManager.orderManagers.get(brokerName)
+    if orderManager != None and orderManager.brokerHandle is Controller.getBrokerLogin().getBrokerHandle():
+      return orderManager
+    with TradeManager.orderManagersLock:
+      orderManager = TradeManager.orderManagers.get(brokerName)
+      if orderManager != None and orderManager.brokerHandle is Controller.getBrokerLogin().getBrokerHandle():
+        return orderManager
+      # Create new order manager first time and also on re-login
+      if TradeManager.matchingEngine != None:
+        orderManager = SimulatedOrderManager(TradeManager.matchingEngine)
+      elif brokerName == "zerodha":
+        orderManager = ZerodhaOrderManager()
+      #elif brokerName == "fyers": # Not implemented
+      TradeManager.orderManagers[brokerName] = orderManager
     return orderManager
 
   @staticmethod
   def getNumberOfTradesPlacedByStrategy(strategy):
-    count = 0
-    for trade in TradeManager.trades:
-      if trade.strategy != strategy:
-        continue
-      if trade.tradeState == TradeState.CREATED or trade.tradeState == TradeState.DISABLED:
-        continue
-      # consider active/completed/cancelled trades as trades placed
-      count += 1
-    return count
+    stateCountMap = TradeManager.strategyToStateCountMap.get(strategy)
+    if stateCountMap == None:
+      return 0
+    # consider active/completed/cancelled trades as trades placed
+    return stateCountMap.get(TradeState.ACTIVE, 0) + stateCountMap.get(TradeState.COMPLETED, 0) \
+      + stateCountMap.get(TradeState.CANCELLED, 0)
 
   @staticmethod
   def getAllTradesByStrategy(strategy):
-    tradesByStrategy = []
-    for trade in TradeManager.trades:
-      if trade.strategy == strategy:
-        tradesByStrategy.append(trade)
-    return tradesByStrategy
+    # returns a copy so that the caller can keep its own list of trades
+    return list(TradeManager.strategyToTradesMap.get(strategy, []))
 
   @staticmethod
   def convertJSONToTrade(jsonData):
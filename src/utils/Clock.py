@@ -0,0 +1,59 @@
+import threading
+import time
+from datetime import datetime
+
+class Clock:
+  # Single source of current time and sleeps for the whole app. In live trading it is the system clock.
+  # In backtests a simulated clock is set so that the same code runs on the replayed market time.
+  simulatedClock = None
+
+  @staticmethod
+  def setSimulatedClock(simulatedClock):
+    Clock.simulatedClock = simulatedClock
+
+  @staticmethod
+  def isSimulated():
+    return Clock.simulatedClock != None
+
+  @staticmethod
+  def now():
+    if Clock.simulatedClock != None:
+      return Clock.simulatedClock.now()
+    return datetime.now()
+
+  @staticmethod
+  def time():
+    # epoch seconds
+    if Clock.simulatedClock != None:
+      return Clock.simulatedClock.time()
+    return time.time()
+
+  @staticmethod
+  def sleep(seconds):
+    if Clock.simulatedClock != None:
+      Clock.simulatedClock.sleep(seconds)
+    else:
+      time.sleep(seconds)
+
+  @staticmethod
+  def wait(event, seconds):
+    # Waits till the event is notified (see notify()) or the seconds pass. Returns True if the event is set.
+    if Clock.simulatedClock != None:
+      return Clock.simulatedClock.wait(event, seconds)
+    return event.wait(seconds)
+
+  @staticmethod
+  def notify(event):
+    if Clock.simulatedClock != None:
+      Clock.simulatedClock.notify(event)
+    else:
+      event.set()
+
+  @staticmethod
+  def startThread(target, name = None):
+    # Threads which sleep or wait on the Clock must be started with this so that the simulated clock knows about them
+    if Clock.simulatedClock != None:
+      return Clock.simulatedClock.startThread(target, name)
+    thread = threading.Thread(target=target, name=name, daemon=True)
+    thread.start()
+    return thread
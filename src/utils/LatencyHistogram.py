@@ -0,0 +1,89 @@
+from array import array
+
+class LatencyHistogram:
+  # HDR style histogram of latencies in nano seconds. Values below 2 * subBucketCount get a bucket each and above that
+  # every power of 2 range is split into subBucketCount equal buckets, so any value is kept within 1 / subBucketCount
+  # (~3%) of its real value with a fixed number of counters. record() is a few integer ops and one array update.
+  # NOTE: Updates are not locked. A rare lost count when two threads record into the same histogram at the same time is
+  # accepted to keep record() cheap on the hot path.
+  subBucketBits = 5
+  subBucketCount = 1 << subBucketBits # 32
+  linearBits = subBucketBits + 1
+  maxShift = 36 # values up to ~2^42 ns (~73 minutes). Larger values are counted in the last bucket
+
+  def __init__(self, name):
+    self.name = name
+    self.numBuckets = (LatencyHistogram.maxShift + 2) * LatencyHistogram.subBucketCount
+    self.counts = array('q', bytes(8 * self.numBuckets))
+    self.count = 0
+    self.total = 0
+    self.max = 0
+
+  def record(self, nanos):
+    # NOTE: Kept to the minimum of operations as it is called on the tick path. Bucket constants are inlined.
+    shift = nanos.bit_length() - 6 # linearBits
+    if shift > 0:
+      index = (shift << 5) + (nanos >> shift) # subBucketBits
+      if index >= self.numBuckets:
+        index = self.numBuckets - 1
+    elif nanos >= 0:
+      index = nanos
+    else:
+      index = 0
+    self.counts[index] += 1
+    self.count += 1
+    self.total += nanos
+    if nanos > self.max:
+      self.max = nanos
+
+  def getBucketLowerBound(self, index):
+    if index < 2 * LatencyHistogram.subBucketCount:
+      return index
+    shift = (index >> LatencyHistogram.subBucketBits) - 1
+    return (index - (shift << LatencyHistogram.subBucketBits)) << shift
+
+  def getBucketUpperBound(self, index):
+    # Highest value counted in the bucket
+    if index < 2 * LatencyHistogram.subBucketCount:
+      return index
+    shift = (index >> LatencyHistogram.subBucketBits) - 1
+    subBucket = index - (shift << LatencyHistogram.subBucketBits)
+    return ((subBucket + 1) << shift) - 1
+
+  def getMin(self):
+    for index in range(self.numBuckets):
+      if self.counts[index] > 0:
+        return self.getBucketLowerBound(index)
+    return 0
+
+  def getPercentile(self, percentile):
+    # Value in nano seconds below which the given percentile (0 - 100) of the recorded values fall
+    count = self.count
+    if count == 0:
+      return 0
+    rank = max(1, int(count * percentile / 100 + 0.5))
+    seen = 0
+    counts = self.counts
+    for index in range(self.numBuckets):
+      seen += counts[index]
+      if seen >= rank:
+        return min(self.getBucketUpperBound(index), self.max)
+    return self.max
+
+  def reset(self):
+    self.counts = array('q', bytes(8 * self.numBuckets))
+    self.count = 0
+    self.total = 0
+    self.max = 0
+
+  def getStats(self):
+    # micro seconds
+    return {
+      'count': self.count,
+      'minMicros': round(self.getMin() / 1000, 3),
+      'meanMicros': round(self.total / self.count / 1000, 3) if self.count > 0 else 0,
+      'p50Micros': round(self.getPercentile(50) / 1000, 3),
+      'p90Micros': round(self.getPercentile(90) / 1000, 3),
+      'p99Micros': round(self.getPercentile(99) / 1000, 3),
+      'maxMicros': round(self.max / 1000, 3)
+    }
@@ -1,6 +1,5 @@
 import math
 import uuid
-import time
 import logging
 import calendar
 from datetime import datetime, timedelta
@@ -8,6 +7,7 @@ from datetime import datetime, timedelta
 from config.Config import getHolidays
 from models.Direction import Direction
 from trademgmt.TradeState import TradeState
+from utils.Clock import Clock
 
 class Utils:
   dateFormat = "%Y-%m-%d"
@@ -28,7 +28,7 @@ class Utils:
   def isMarketOpen():
     if Utils.isTodayHoliday():
       return False
-    now = datetime.now()
+    now = Clock.now()
     marketStartTime = Utils.getMarketStartTime()
     marketEndTime = Utils.getMarketEndTime()
     return now >= marketStartTime and now <= marketEndTime
@@ -39,24 +39,24 @@ class Utils:
     # Please note this will not return true if current time is < marketStartTime on a trading day
     if Utils.isTodayHoliday():
       return True
-    now = datetime.now()
+    now = Clock.now()
     marketEndTime = Utils.getMarketEndTime()
     return now > marketEndTime
 
   @staticmethod
   def waitTillMarketOpens(context):
-    nowEpoch = Utils.getEpoch(datetime.now())
+    nowEpoch = Utils.getEpoch(Clock.now())
     marketStartTimeEpoch = Utils.getEpoch(Utils.getMarketStartTime())
     waitSeconds = marketStartTimeEpoch - nowEpoch
     if waitSeconds > 0:
       logging.info("%s: Waiting for %d seconds till market opens...", context, waitSeconds)
-      time.sleep(waitSeconds)
+      Clock.sleep(waitSeconds)
 
   @staticmethod
   def getEpoch(datetimeObj = None):
     # This method converts given datetimeObj to epoch seconds
     if datetimeObj == None:
-      datetimeObj = datetime.now()
+      datetimeObj = Clock.now()
     epochSeconds = datetime.timestamp(datetimeObj)
     return int(epochSeconds) # converting double to long
 
@@ -71,17 +71,17 @@ class Utils:
   @staticmethod
   def getTimeOfDay(hours, minutes, seconds, dateTimeObj = None):
     if dateTimeObj == None:
-      dateTimeObj = datetime.now()
+      dateTimeObj = Clock.now()
     dateTimeObj = dateTimeObj.replace(hour=hours, minute=minutes, second=seconds, microsecond=0)
     return dateTimeObj
 
   @staticmethod
   def getTimeOfToDay(hours, minutes, seconds):
-    return Utils.getTimeOfDay(hours, minutes, seconds, datetime.now())
+    return Utils.getTimeOfDay(hours, minutes, seconds, Clock.now())
 
   @staticmethod
   def getTodayDateStr():
-    return Utils.convertToDateStr(datetime.now())
+    return Utils.convertToDateStr(Clock.now())
 
   @staticmethod
   def convertToDateStr(datetimeObj):
@@ -102,7 +102,7 @@ class Utils:
 
   @staticmethod
   def isTodayHoliday():
-    return Utils.isHoliday(datetime.now())
+    return Utils.isHoliday(Clock.now())
     
   @staticmethod
   def generateTradeID():
@@ -131,7 +131,7 @@ class Utils:
   def prepareMonthlyExpiryFuturesSymbol(inputSymbol):
     expiryDateTime = Utils.getMonthlyExpiryDayDate()
     expiryDateMarketEndTime = Utils.getMarketEndTime(expiryDateTime)
-    now = datetime.now()
+    now = Clock.now()
     if now > expiryDateMarketEndTime:
       # increasing today date by 20 days to get some day in next month passing to getMonthlyExpiryDayDate()
       expiryDateTime = Utils.getMonthlyExpiryDayDate(now + timedelta(days=20))
@@ -181,7 +181,7 @@ class Utils:
   @staticmethod
   def getMonthlyExpiryDayDate(datetimeObj = None):
     if datetimeObj == None:
-      datetimeObj = datetime.now()
+      datetimeObj = Clock.now()
     year = datetimeObj.year
     month = datetimeObj.month
     lastDay = calendar.monthrange(year, month)[1] # 2nd entry is the last day of the month
@@ -197,7 +197,7 @@ class Utils:
   @staticmethod
   def getWeeklyExpiryDayDate(dateTimeObj = None):
     if dateTimeObj == None:
-      dateTimeObj = datetime.now()
+      dateTimeObj = Clock.now()
     daysToAdd = 0
     if dateTimeObj.weekday() >= 3:
       daysToAdd = -1 * (dateTimeObj.weekday() - 3)